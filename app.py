@@ -5,6 +5,12 @@ from discord import app_commands
 from discord import ui, Interaction, TextStyle, Embed, Color
 from cogs.ticket_system import TicketPanelView
 from cogs.interview import InterviewPanelView
+from utils.spam_filter import SpamFilter, CHANNEL_FLOOD
+from utils import metrics
+from utils import tracing
+from utils.watchdog import LoopWatchdog
+from utils.traffic_recorder import TrafficRecorder
+from utils.config import config_service
 from dotenv import load_dotenv
 import os
 from discord.ui import View, Button
@@ -14,58 +20,57 @@ import traceback
 import re
 import logging
 import json
-logging.basicConfig(level=logging.ERROR)
+from utils.logging_setup import setup_logging
 
 # === CONFIG ===
 load_dotenv()
 TOKEN = os.getenv("DISCORD_BOT_TOKEN")
-GUILD_ID = 1169251155721846855  # Replace with your server ID
-PROOF_CHANNEL_ID = 1393423615432720545  # Channel where proofs will be sent
-LOG_CHANNEL_ID = 1395449524570423387 # Channel where logs will be sent
-ALLOWED_ROLE_ID = 1346488365608079452  # Role allowed to use forwardproof
-SAY_ROLE_ID = 1346488355486961694  # Role allowed to use say commands
-ADMIN_LOG_ROLE_ID = 1346488363053482037 # Role allowed to use log commands
-TICKET_CHANNEL_PREFIX = "ticket-"
-WHITELISTED_ROLE_ID = 1346488379734491196  # 🔁 Replace with actual role ID
-
-WHITELIST_LOG_CHANNEL_ID = 1346488637537386617 # Channel where the embed should be sent
-BAN_LOG_CHANNEL_ID = 1346488664917671946
-JAIL_LOG_CHANNEL_ID = 1382895763717226516
-FC_LOG_CHANNEL_ID = 1377862821924044860
-MENTION_ROLE_ID = 1346488379734491196
-INTERVIEW_ACCEPTED_ROLE_ID = 1347946934308176013
-
-REVIEW_CHANNEL_ID = 1379753912155770941
-REVIEWER_ROLE_ID = 1346488365608079452
-THUMBNAIL_URL = "https://cdn.discordapp.com/attachments/1372059707694645360/1396061147333005343/image.png?ex=6881fcc3&is=6880ab43&hm=ae6f0295e136bc7e1a0619674cb9e8844e87fdee8ebc6a2b688ab4206234168e&"
-
-REJECTED_LOG_CHANNEL_ID = 1379763922994991195
-ACCEPTED_LOG_CHANNEL_ID = 1359919316530630918
-ACCEPTED_ROLE_ID = 1347946934308176013
-PENDING_ROLE_ID = 1346488381500166194
-REVIEW_VIDEO_CHANNEL_ID = 1346488640523472958
-
-# Ticket System Configuration
-TICKET_CATEGORY_ID = 1356589620141490218  # Open tickets category
-CLOSED_TICKET_CATEGORY_ID = 1356590186552758495  # Closed tickets category
-STAFF_ROLE_ID = 1346488365608079452  # Server staff role for ticket management
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # Lifecycle logging is cheap: records are formatted off the event loop
+setup_logging(LOG_LEVEL)
+logger = logging.getLogger("ucrp")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # Local Prometheus exporter port, 0 to disable
+# Channel, role and category IDs live in data/config.json (see utils/config.py) and hot-reload on change
+
+# Flood / spam protection
+SPAM_TIMEOUT = datetime.timedelta(minutes=5)  # Timeout applied to flooders and spammers
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 intents.members = True
+intents.presences = config_service.current.staff_presence  # Privileged; read once, so changing it needs a restart
 
-bot = commands.Bot(command_prefix="!", intents=intents, allowed_mentions=discord.AllowedMentions(everyone=False, roles=True, users=True))
+bot = commands.Bot(
+    command_prefix="!",
+    intents=intents,
+    allowed_mentions=discord.AllowedMentions(everyone=False, roles=True, users=True),
+    http_trace=tracing.install_http_trace(metrics.create_http_trace())
+)
 
 
 # Remove default help command to avoid conflict
 bot.remove_command("help")
 
+spam_filter = SpamFilter()
+watchdog = LoopWatchdog(bot)
+recorder = TrafficRecorder.from_env()  # Set RECORD_TRAFFIC=path.ndjson.gz to record for offline replay
+
 @bot.event
 async def on_ready():
+    # Start measuring event loop lag (on_ready can fire again after reconnects)
+    watchdog.start()
+
     # Initialize ticket system data
     await initialize_ticket_system()
 
+    # Check the configured IDs against the live server and watch the config for edits
+    guild = bot.get_guild(config_service.current.guild_id)
+    if guild:
+        config_service.validate(guild)
+    else:
+        logger.error("Configured guild %s is not available", config_service.current.guild_id)
+    config_service.watch(bot)
+
     await bot.change_presence(
         activity=discord.Activity(
             type=discord.ActivityType.watching,
@@ -82,9 +87,9 @@ async def on_ready():
     for cog in load_cogs:
         try:
             await bot.load_extension(f"cogs.{cog}")
-            print(f"✅ Loaded {cog} cog")
+            logger.info("Loaded %s cog", cog)
         except Exception as e:
-            print(f"Error loading {cog} cog: {e}")
+            logger.error("Error loading %s cog: %s", cog, e)
 
     # Restore panels from panels.json
     try:
@@ -101,20 +106,18 @@ async def on_ready():
                     elif panel_type == "interview_panel":
                         await message.edit(view=InterviewPanelView(bot))
                 except Exception as e:
-                    print(f"Failed to reattach {panel_type}: {e}")
+                    logger.warning("Failed to reattach %s: %s", panel_type, e)
     except FileNotFoundError:
-        print("⚠ panels.json not found — skipping panel restore")
+        logger.warning("panels.json not found — skipping panel restore")
 
-    print(f"✅ Bot ready: {bot.user}")
+    logger.info("Bot ready: %s", bot.user)
     # Sync slash commands to your guild
     try:
-        guild = discord.Object(id=GUILD_ID)
+        guild = discord.Object(id=config_service.current.guild_id)
         synced = await bot.tree.sync(guild=guild)
-        print(f"✅ Synced {len(synced)} slash commands to your server (Guild: {GUILD_ID})")
+        logger.info("Synced %d slash commands to guild %s", len(synced), guild.id)
     except Exception as e:
-        print(f"Error syncing slash commands: {e}")
-
-    print(f"Bot is ready: {bot.user}")
+        logger.error("Error syncing slash commands: %s", e)
 
 
 async def initialize_ticket_system():
@@ -127,13 +130,9 @@ async def initialize_ticket_system():
             json.dump({}, f)
 
     # Initialize config.json
-    if not os.path.exists('data/config.json'):
-        with open('data/config.json', 'w') as f:
-            json.dump({
-                "ticket_category": TICKET_CATEGORY_ID,
-                "closed_category": CLOSED_TICKET_CATEGORY_ID,
-                "ticket_counter": 0
-            }, f, indent=2)
+    if not os.path.exists(config_service.path):
+        config_service.write_defaults()
+        config_service.load()
 
 # -------------WATCHING UCRP------------
 
@@ -154,12 +153,21 @@ def resolve_emojis(message: discord.Message) -> str:
 
     return content
 
+# -------- Gateway health ---------
+@bot.event
+async def on_disconnect():
+    watchdog.note("gateway_disconnected")
+
+@bot.event
+async def on_resumed():
+    watchdog.note("gateway_resumed")
+
 # -------- force re-sync ---------
 @bot.command()
 @commands.is_owner()
 async def sync(ctx):
     try:
-        synced = await bot.tree.sync(guild=discord.Object(id=GUILD_ID))
+        synced = await bot.tree.sync(guild=discord.Object(id=config_service.current.guild_id))
         await ctx.send(f"✅ Synced {len(synced)} slash commands to this server.")
     except Exception as e:
         await ctx.send(f"❌ Sync failed.\n`{e}`")
@@ -173,12 +181,12 @@ async def on_command_error(ctx, error):
         pass  # Ignore unknown commands
     else:
         await ctx.send("❌ An unexpected error occurred.")
-        print(f"[ERROR] {error}")
+        logger.error("Command error: %s", error, exc_info=error)
 
 # ------------ SERVER WHITELIST ----------
 @bot.event
 async def on_guild_join(guild):
-    if guild.id != YOUR_SERVER_ID:
+    if guild.id != config_service.current.guild_id:
         await guild.leave()
 
 # ------------- Auto Delete Messages in Trolls and insta ---------------
@@ -187,14 +195,18 @@ async def on_message(message):
     if message.author.bot:
         return
 
-    # Channel IDs to monitor
-    monitored_channels = [1346488677441732700, 1346488679035834460]
-    # Role ID that can bypass this (staff role with /sayembed access)
-    staff_role_id = 1346488355486961694
+    if recorder and message.guild:
+        kind = channel_kind(message.channel)
+        if kind != "other":
+            recorder.record_message(message, kind, is_staff_member(message.author))
+
+    if message.guild and await handle_spam(message):
+        return
 
-    if message.channel.id in monitored_channels:
-        # Check if user has staff role
-        is_staff = any(role.id == staff_role_id for role in message.author.roles)
+    config = config_service.current
+    if message.channel.id in config.media_channel_ids:
+        # Check if user has the bypass role (staff role with /sayembed access)
+        is_staff = any(role.id == config.media_bypass_role_id for role in message.author.roles)
 
         # If not staff and message has no attachments (text-only message)
         if not is_staff and len(message.attachments) == 0:
@@ -213,5 +225,63 @@ async def on_message(message):
 
     await bot.process_commands(message)
 
+# ------------- Flood & Spam Protection ---------------
+async def handle_spam(message):
+    """Run a message through the spam filter and act on it. Returns True if the message was removed"""
+    verdict = spam_filter.check(message.author.id, message.channel.id, message.content)
+    if verdict is None:
+        return False
+
+    if verdict == CHANNEL_FLOOD:
+        logger.warning("Channel flood detected in #%s", message.channel, extra={'channel_id': message.channel.id})
+        return False
+
+    # Staff are never punished: the configured staff and bypass roles, as elsewhere in on_message
+    config = config_service.current
+    if any(role.id in (config.staff_role_id, config.media_bypass_role_id) for role in getattr(message.author, 'roles', [])):
+        return False
+
+    logger.warning(
+        "Spam (%s) by %s in #%s", verdict, message.author, message.channel,
+        extra={'channel_id': message.channel.id, 'actor': message.author.id}
+    )
+    try:
+        await message.delete()
+        await message.author.timeout(SPAM_TIMEOUT, reason=f"Automatic spam protection: {verdict}")
+    except discord.HTTPException as e:
+        logger.error("Failed to act on spammer %s: %s", message.author, e, extra={'actor': message.author.id})
+    return True
+
+# ------------- Traffic Recording ---------------
+def channel_kind(channel):
+    """Classify a channel for the traffic recorder"""
+    if channel is None:
+        return "other"
+    config = config_service.current
+    if channel.id in config.media_channel_ids:
+        return "monitored"
+    name = getattr(channel, 'name', '') or ''
+    prefix = config.ticket_channel_prefix
+    if name.startswith(prefix) or name.startswith(f"closed-{prefix}"):
+        return "ticket"
+    return "other"
+
+def is_staff_member(member):
+    staff_role_id = config_service.current.staff_role_id
+    return any(role.id == staff_role_id for role in getattr(member, 'roles', []))
+
+@bot.event
+async def on_interaction(interaction):
+    if recorder:
+        recorder.record_interaction(interaction, channel_kind(interaction.channel), is_staff_member(interaction.user))
+
 # -------- Keep Alive & Run --------
-bot.run(TOKEN)
+if __name__ == "__main__":
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT)
+    try:
+        # Logging is already routed through the queue listener, don't let discord.py add a console handler
+        bot.run(TOKEN, log_handler=None)
+    finally:
+        if recorder:
+            recorder.close()
@@ -0,0 +1,163 @@
+"""Check the incremental ticket analytics against a brute-force recomputation.
+
+Generates a random ticket history (opens, closes, reopens and re-closes over the
+last few weeks), feeds each lifecycle event to TicketAnalytics as TicketManager
+does, then recomputes every daily and weekly summary from the raw event list.
+Counts, reopen rates, busiest hours, per-staff closures (owners closing their
+own tickets excluded) and owner closures must match exactly;
+time-to-close quantiles must be within the sketch's relative accuracy. Also
+times a summary against the rescan it replaces.
+
+    python -m benchmarks.analytics_check --tickets 50000 --days 28
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analytics import SKETCH_ALPHA, TicketAnalytics
+from utils.ticket_model import Ticket
+
+
+def simulate(count, days, seed):
+    """Return (ticket, event) pairs in time order, with the ticket's fields as they were at that event"""
+    rng = random.Random(seed)
+    start = datetime.combine(date.today() - timedelta(days=days - 1), datetime.min.time())
+    end = datetime.now()
+    staff = [rng.getrandbits(60) for _ in range(8)]
+    events = []
+    for number in range(1, count + 1):
+        created = start + timedelta(seconds=rng.uniform(0, (end - start).total_seconds()))
+        ticket = Ticket(number, number, 'open', created, user_id=rng.getrandbits(60))
+        events.append((created, 'opened', snapshot(ticket)))
+        at = created
+        while rng.random() < 0.8:
+            at += timedelta(seconds=rng.choice((0, rng.expovariate(1 / 7200), rng.expovariate(1 / 86400))))
+            if at > end:
+                break
+            # Owners close some of their own tickets; those aren't staff closures
+            closer = ticket.user_id if rng.random() < 0.2 else rng.choice(staff)
+            ticket.status, ticket.closed_at, ticket.closed_by = 'closed', at, closer
+            events.append((at, 'closed', snapshot(ticket)))
+            if rng.random() > 0.15:
+                break
+            at += timedelta(seconds=rng.expovariate(1 / 3600))
+            if at > end:
+                break
+            ticket.status, ticket.reopened_at = 'open', at
+            events.append((at, 'reopened', snapshot(ticket)))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def snapshot(ticket):
+    return Ticket(**{name: getattr(ticket, name) for name in ticket.__slots__})
+
+
+def brute_force(events, first, last):
+    """Exact summary of the events dated first..last, recomputed from scratch"""
+    opened = closed = reopened = owner_closed = 0
+    hours = [0] * 24
+    staff = Counter()
+    durations = []
+    for at, kind, ticket in events:
+        if not first <= at.date() <= last:
+            continue
+        if kind == 'opened':
+            opened += 1
+            hours[at.hour] += 1
+        elif kind == 'reopened':
+            reopened += 1
+        else:
+            closed += 1
+            if ticket.closed_by == ticket.user_id:
+                owner_closed += 1
+            else:
+                staff[ticket.closed_by] += 1
+            started = ticket.reopened_at if ticket.reopened_at and ticket.reopened_at > ticket.created_at else ticket.created_at
+            durations.append(max(0.0, (ticket.closed_at - started).total_seconds()))
+    durations.sort()
+
+    def exact(q):
+        return durations[int(q * (len(durations) - 1))] if durations else None
+
+    return {
+        'opened': opened, 'closed': closed, 'reopened': reopened,
+        'reopen_rate': reopened / closed if closed else None,
+        'closed_by_owner': owner_closed,
+        'median_close_seconds': exact(0.5), 'p90_close_seconds': exact(0.9),
+        'busiest_hours': sorted(range(24), key=lambda h: (-hours[h], h))[:3] if opened else [],
+        'opened_by_hour': hours, 'closures_by_staff': dict(staff),
+    }
+
+
+def compare(label, got, want):
+    problems = []
+    for key, expected in want.items():
+        value = got[key]
+        if key.endswith('_close_seconds'):
+            if (value is None) != (expected is None) or (expected is not None and abs(value - expected) > SKETCH_ALPHA * expected + 1e-6):
+                problems.append(f"{key}: {value} vs exact {expected}")
+        elif key == 'closures_by_staff':
+            if dict(value) != expected:
+                problems.append(f"{key} differs")
+        elif value != expected:
+            problems.append(f"{key}: {value} vs exact {expected}")
+    for problem in problems:
+        print(f"MISMATCH {label}: {problem}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=28)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    events = simulate(args.tickets, args.days, args.seed)
+    with tempfile.TemporaryDirectory(prefix="ucrp-analytics-") as workdir:
+        analytics = TicketAnalytics(path=os.path.join(workdir, 'analytics.json'))
+        start = time.perf_counter()
+        for _, kind, ticket in events:
+            getattr(analytics, kind)(ticket)
+        update_us = (time.perf_counter() - start) / len(events) * 1e6
+        analytics.flush()
+        size = os.path.getsize(analytics.path)
+        reloaded = TicketAnalytics(path=analytics.path)
+
+    today = date.today()
+    ok = True
+    checked = 0
+    for offset in range(args.days):
+        day = today - timedelta(days=offset)
+        for period in (1, 7):
+            want = brute_force(events, day - timedelta(days=period - 1), day)
+            for label, source in (("live", analytics), ("reloaded", reloaded)):
+                ok &= compare(f"{label} {period}d ending {day}", source.summary(period, day), want)
+            checked += 1
+
+    start = time.perf_counter()
+    for _ in range(100):
+        analytics.summary(7)
+    summary_ms = (time.perf_counter() - start) / 100 * 1000
+    start = time.perf_counter()
+    brute_force(events, today - timedelta(days=6), today)
+    rescan_ms = (time.perf_counter() - start) * 1000
+
+    print(f"events:              {len(events)} for {args.tickets} tickets over {args.days} days")
+    print(f"summaries checked:   {checked} daily/weekly ranges, live and reloaded: {'all match' if ok else 'MISMATCHES'}")
+    print(f"update cost:         {update_us:.1f} us per lifecycle event")
+    print(f"weekly summary:      {summary_ms:.2f} ms from aggregates vs {rescan_ms:.1f} ms rescanning events")
+    print(f"persisted size:      {size / 1024:.1f} KiB")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
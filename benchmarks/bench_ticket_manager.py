@@ -0,0 +1,167 @@
+"""TicketManager lifecycle operations against a store of `size` tickets"""
+import json
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.fakes import FakeGuild, fill_channel, snowflake
+from utils.config import BotConfig, config_service
+from utils.ticket_manager import TicketManager
+from utils.ticket_model import SCHEMA_VERSION
+
+SIZES = (100, 10_000, 100_000)
+ITERATIONS = {100: 200, 10_000: 30, 100_000: 5}
+
+DEFAULTS = BotConfig()
+
+
+class State:
+    def __init__(self, size, backend=None):
+        self.guild = FakeGuild(backend)
+        self.staff_role = self.guild.add_role(DEFAULTS.staff_role_id, "Staff")
+        self.staff = self.guild.add_member(name="staffer", roles=[self.staff_role], staff=True)
+        self.open_category = self.guild.add_category(name="tickets")
+        self.closed_category = self.guild.add_category(name="closed-tickets")
+        self.guild.add_text_channel("ticket-logs", channel_id=DEFAULTS.log_channel_id)
+        self.size = size
+        self.tickets = {}
+        self.targets = []
+
+    def filler(self, count):
+        """Stored tickets whose channels are long gone, like a real store: mostly archived, a few stale open ones"""
+        base = datetime(2025, 1, 1)
+        for i in range(count):
+            channel_id = snowflake()
+            status = 'open' if i % 20 == 0 else 'archived'
+            record = {
+                'ticket_number': i + 1,
+                'user_id': snowflake(),
+                'user_name': f"player{i}",
+                'channel_id': channel_id,
+                'status': status,
+                'created_at': (base + timedelta(minutes=i)).isoformat(),
+                'reason': "I need help with my whitelist application, it has been pending for a while",
+                'added_users': []
+            }
+            if status == 'archived':
+                record['closed_at'] = (base + timedelta(minutes=i + 30)).isoformat()
+                record['closed_by_name'] = "staffer"
+                record['archived_at'] = (base + timedelta(days=3, minutes=i + 30)).isoformat()
+                record['transcript_file'] = f"data/transcripts/transcript-ticket-player{i}.html"
+            self.tickets[str(channel_id)] = record
+
+    def add_target(self, status='open', messages=30):
+        """A ticket with a live channel that an operation will act on"""
+        member = self.guild.add_member()
+        category = self.open_category if status == 'open' else self.closed_category
+        channel = self.guild.add_text_channel(f"ticket-{member.name}", category)
+        fill_channel(channel, [member, self.staff], messages)
+        record = {
+            'ticket_number': len(self.tickets) + 1,
+            'user_id': member.id,
+            'user_name': member.name,
+            'channel_id': channel.id,
+            'status': status,
+            'created_at': datetime.now().isoformat(),
+            'reason': "Benchmark ticket",
+            'added_users': []
+        }
+        if status == 'closed':
+            transcript = f"data/transcripts/transcript-{channel.name}.html"
+            with open(transcript, 'w', encoding='utf-8') as f:
+                f.write("<html>" + "x" * 20000 + "</html>")
+            record.update({'closed_at': datetime.now().isoformat(), 'closed_by_name': "staffer", 'transcript_file': transcript})
+        self.tickets[str(channel.id)] = record
+        self.targets.append((channel, member))
+
+    def write(self, **overrides):
+        config = dict(DEFAULTS.to_dict(), guild_id=self.guild.id,
+                      ticket_categories=[self.open_category.id], closed_categories=[self.closed_category.id], **overrides)
+        with open(config_service.path, 'w') as f:
+            json.dump(config, f, indent=2)
+        with open('data/state.json', 'w') as f:
+            json.dump({"ticket_counter": len(self.tickets)}, f)
+        with open('data/tickets.json', 'w') as f:
+            json.dump({'schema': SCHEMA_VERSION, 'tickets': list(self.tickets.values())}, f)
+        config_service.load()
+        self.manager = TicketManager()
+        self.manager.audit_log.start(lambda: self.guild.get_channel(DEFAULTS.log_channel_id))
+
+
+async def setup_create(size, iterations):
+    state = State(size)
+    state.filler(size)
+    state.write()
+    state.members = [state.guild.add_member() for _ in range(iterations)]
+    return state
+
+
+async def op_create(state, i):
+    channel, error = await state.manager.create_ticket(state.guild, state.members[i], "Benchmark ticket")
+    assert error is None, error
+
+
+async def setup_get_info(size, iterations):
+    state = State(size)
+    state.filler(size)
+    state.write()
+    state.ids = random.Random(1).sample(list(state.tickets), min(iterations, len(state.tickets)))
+    return state
+
+
+async def op_get_info(state, i):
+    assert state.manager.get_ticket_info(int(state.ids[i % len(state.ids)])) is not None
+
+
+async def setup_close(size, iterations):
+    state = State(size)
+    state.filler(size)
+    for _ in range(iterations):
+        state.add_target('open')
+    state.write()
+    return state
+
+
+async def op_close(state, i):
+    channel, _ = state.targets[i]
+    success, result = await state.manager.close_ticket(channel, state.staff)
+    assert success, result
+
+
+async def setup_delete(size, iterations):
+    state = State(size)
+    state.filler(size)
+    for _ in range(iterations):
+        state.add_target('closed')
+    state.write()
+    return state
+
+
+async def op_delete(state, i):
+    channel, _ = state.targets[i]
+    success, error, _ = await state.manager.delete_ticket(channel, state.staff)
+    assert success, error
+
+
+async def setup_page(size, iterations):
+    state = State(size)
+    state.filler(size)
+    state.write()
+    state.manager.store.page('open', limit=1)  # Build the listing index outside the timed loop
+    state.cursors = {'open': None, 'archived': None}
+    return state
+
+
+async def op_page(state, i):
+    # Alternate between walking open tickets (hot) and archived ones (read from the archive file)
+    status = 'open' if i % 2 else 'archived'
+    tickets, state.cursors[status] = state.manager.store.page(status, cursor=state.cursors[status], limit=10)
+    assert tickets
+
+
+SCENARIOS = {
+    'ticket_manager.create_ticket': (SIZES, ITERATIONS, setup_create, op_create),
+    'ticket_manager.get_ticket_info': (SIZES, {100: 2000, 10_000: 200, 100_000: 20}, setup_get_info, op_get_info),
+    'ticket_manager.close_ticket': (SIZES, ITERATIONS, setup_close, op_close),
+    'ticket_manager.delete_ticket': (SIZES, ITERATIONS, setup_delete, op_delete),
+    'ticket_store.page': (SIZES, {100: 2000, 10_000: 2000, 100_000: 2000}, setup_page, op_page),
+}
@@ -0,0 +1,50 @@
+"""TranscriptGenerator rendering and file output for a channel of `size` messages"""
+import os
+
+from benchmarks.fakes import FakeGuild, fill_channel
+from utils.transcript_generator import TranscriptGenerator
+
+SIZES = (100, 10_000, 100_000)
+ITERATIONS = {100: 50, 10_000: 5, 100_000: 2}
+
+
+class State:
+    def __init__(self, size):
+        self.guild = FakeGuild()
+        category = self.guild.add_category()
+        owner = self.guild.add_member(name="domzeeeeeeee")
+        staff = self.guild.add_member(name="staffer", staff=True)
+        self.channel = fill_channel(self.guild.add_text_channel("ticket-domzeeeeeeee", category), [owner, staff], size)
+        self.generator = TranscriptGenerator()
+
+
+async def setup(size, iterations):
+    return State(size)
+
+
+async def setup_saved(size, iterations):
+    state = State(size)
+    state.transcript = await state.generator.generate_transcript(state.channel)
+    return state
+
+
+async def op_render(state, i):
+    state.generator._generate_html(state.channel, state.channel.messages)
+
+
+async def op_generate(state, i):
+    assert await state.generator.generate_transcript(state.channel) is not None
+
+
+async def op_html_for(state, i):
+    # A cache miss every time: render the saved transcript
+    for entry in os.scandir(state.generator.html_dir):
+        os.remove(entry.path)
+    assert await state.generator.html_for(state.transcript) is not None
+
+
+SCENARIOS = {
+    'transcript._generate_html': (SIZES, ITERATIONS, setup, op_render),
+    'transcript.generate_transcript': (SIZES, ITERATIONS, setup, op_generate),
+    'transcript.html_for': (SIZES, ITERATIONS, setup_saved, op_html_for),
+}
@@ -0,0 +1,202 @@
+"""Check the streaming ticket export: row contents, date filters, cursor resume and memory.
+
+Builds a scratch store with archived and hot tickets that share two transcripts
+of the same conversation, one structured and one in the per-message HTML
+markup that older versions saved, then:
+
+  * compares the message rows read from each transcript with the messages they
+    were saved from (author id, timestamp, content length, attachments, embeds);
+  * checks --since/--until against a brute-force filter;
+  * interrupts exports at random ticket boundaries, archives some hot tickets
+    in between, resumes from the cursor and checks every ticket comes out once;
+  * measures the peak Python allocations of a full export at several store
+    sizes, which should not grow with the number of tickets or messages.
+
+    python -m benchmarks.export_check --tickets 2000 20000
+"""
+import argparse
+import asyncio
+import html
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeGuild, fill_channel
+from utils.ticket_export import COLUMNS, ExportWriter, export_rows, main as export_main
+from utils.ticket_model import Ticket
+from utils.ticket_store import TicketStore
+from utils.transcript_generator import TranscriptGenerator
+
+HOT = 300
+MESSAGES = 60
+
+
+class NullWriter(io.TextIOBase):
+    def write(self, text):
+        return len(text)
+
+
+def build(workdir, count, seed):
+    """A store of `count` tickets, all but HOT of them archived, and the transcript messages"""
+    rng = random.Random(seed)
+    guild = FakeGuild()
+    owner, staff = guild.add_member(name="domzeeeeeeee"), guild.add_member(name="staffer", staff=True)
+    channel = fill_channel(guild.add_text_channel("ticket-0001", guild.add_category()), [owner, staff], MESSAGES)
+    generator = TranscriptGenerator(transcript_dir=os.path.join(workdir, 'transcripts'))
+    transcripts = [asyncio.run(generator.generate_transcript(channel)), os.path.join(workdir, 'legacy.html')]
+    with open(transcripts[1], 'w', encoding='utf-8') as f:
+        f.write(legacy_html(channel.messages))
+
+    store = TicketStore(
+        hot_path=os.path.join(workdir, 'tickets.json'),
+        cold_path=os.path.join(workdir, 'archive.ndjson'),
+        snapshot_path=os.path.join(workdir, 'tickets.bin'),
+    )
+    start = datetime(2025, 1, 1)
+    for number in range(1, count + 1):
+        status = 'archived' if number <= count - HOT else rng.choice(('open', 'closed'))
+        created = start + timedelta(minutes=number * 10 + rng.randint(0, 9))
+        store.add(Ticket(number, 10**17 + number, status, created, user_id=rng.randint(1, 500), transcript_file=transcripts[number % 2]))
+        if number % 5000 == 0:
+            store.demote()
+    store.demote()
+    return store, channel.messages
+
+
+def legacy_html(messages):
+    """A transcript in the one-block-per-message markup HTML transcripts were saved with"""
+    blocks = []
+    for message in messages:
+        embeds = "".join(
+            f'<div class="embed"><div class="embed-title">{html.escape(e.title or "")}</div>'
+            f'<div class="embed-description">{html.escape(e.description or "")}</div></div>' for e in message.embeds
+        )
+        attachments = "".join(f'<div class="attachment">📎 {html.escape(a.filename)}</div>' for a in message.attachments)
+        blocks.append(f"""
+            <div class="message" data-author-id="{message.author.id}" data-timestamp="{message.created_at.isoformat()}">
+                <div class="avatar">{message.author.display_name[0].upper()}</div>
+                <div class="message-content">
+                    <div class="message-header">
+                        <span class="username">{html.escape(message.author.display_name)}</span>
+                        <span class="timestamp">{message.created_at.strftime("%m/%d/%Y %I:%M %p")}</span>
+                    </div>
+                    <div class="message-text">{html.escape(message.content)}</div>
+                    {embeds}
+                    {attachments}
+                </div>
+            </div>
+            """)
+    return f'<!DOCTYPE html><html><head><style>.message {{ display: flex; }}</style></head><body><div class="messages">{"".join(blocks)}</div></body></html>'
+
+
+def check_messages(store, messages):
+    """Both transcript formats give the same rows, matching the messages"""
+    ok = True
+    for number in (1, 2):
+        rows = [row for row in export_rows(store, 'messages') if row['ticket_number'] == number]
+        ok &= len(rows) == len(messages)
+        for row, message in zip(rows, messages):
+            ok &= (row['author_id'] == message.author.id
+                   and row['timestamp'] == message.created_at.isoformat()
+                   and row['content_length'] == len(message.content)
+                   and row['attachments'] == len(message.attachments)
+                   and row['embeds'] == len(message.embeds))
+    return ok
+
+
+def check_dates(store, rng):
+    ok = True
+    tickets = list(store.all())
+    for _ in range(20):
+        a, b = sorted(rng.sample([t.created_at for t in tickets], 2))
+        want = sorted(t.ticket_number for t in tickets if a <= t.created_at < b)
+        got = sorted(row['ticket_number'] for row in export_rows(store, 'tickets', a, b))
+        ok &= got == want
+    return ok
+
+
+def check_resume(store, rng):
+    """Export in random slices, archiving some hot tickets between slices"""
+    seen = []
+    cursor = None
+    slices = 0
+    while True:
+        stop = rng.randint(1, max(2, len(store.hot) // 3 + 50))
+        writer = ExportWriter(NullWriter(), 'ndjson', COLUMNS['tickets'])
+        numbers = []
+        for row in export_rows(store, 'tickets', cursor=cursor):
+            if writer.rows == stop:
+                break
+            writer.write(row)
+            numbers.append(row['ticket_number'])
+        else:
+            writer.finish()
+            seen.extend(numbers)
+            break
+        # One row per ticket, so every written row is a complete ticket
+        seen.extend(numbers)
+        cursor = writer.current
+        slices += 1
+        # Archive a few hot tickets while "offline", including ones not exported yet
+        for ticket in rng.sample(list(store.hot.values()), min(5, len(store.hot))):
+            ticket.status = 'archived'
+            store.update(ticket)
+        store.demote()
+    expected = sorted(t.ticket_number for t in store.all())
+    return sorted(seen) == expected, slices
+
+
+def measure(workdir, count, seed):
+    store, _ = build(workdir, count, seed)
+    store._load_index()   # The archive's offset index is the store's, not the export's
+    for kind in ('tickets', 'messages'):
+        tracemalloc.start()
+        started = time.perf_counter()
+        writer = ExportWriter(NullWriter(), 'csv', COLUMNS[kind])
+        for row in export_rows(store, kind):
+            writer.write(row)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        yield kind, writer.rows, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, nargs='+', default=[2000, 20000])
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    ok = True
+    with tempfile.TemporaryDirectory(prefix="ucrp-export-") as workdir:
+        store, messages = build(workdir, 1500, args.seed)
+        messages_ok = check_messages(store, messages)
+        dates_ok = check_dates(store, rng)
+        resume_ok, slices = check_resume(store, rng)
+        output = os.path.join(workdir, 'out.csv.gz')
+        cli_ok = export_main(['--kind', 'messages', '--format', 'csv', '-o', output,
+                              '--hot', store.hot_path, '--archive', store.cold_path, '--snapshot', store.snapshot_path]) == 0
+        ok &= messages_ok and dates_ok and resume_ok and cli_ok
+        print(f"message rows:        {'match the saved messages in both formats' if messages_ok else 'MISMATCH'}")
+        print(f"date filters:        {'match brute force' if dates_ok else 'MISMATCH'}")
+        print(f"resume:              {slices} interrupted slices: {'every ticket exactly once' if resume_ok else 'MISMATCH'}")
+        print(f"CLI:                 {'ok' if cli_ok else 'FAILED'}")
+
+    for count in args.tickets:
+        with tempfile.TemporaryDirectory(prefix="ucrp-export-") as workdir:
+            for kind, rows, elapsed, peak in measure(workdir, count, args.seed):
+                print(f"{count:>7} tickets, {kind:<8}: {rows:>9} rows in {elapsed:6.2f}s "
+                      f"({rows / elapsed:,.0f} rows/s), peak allocations {peak / 1024:.0f} KiB")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+"""Offline stand-ins for the discord.py objects the ticket system touches.
+
+Every call that would hit Discord's HTTP API goes through `FakeBackend.request`,
+which does nothing by default. Benchmarks that care about API behaviour (latency,
+rate limits) pass their own backend.
+"""
+import itertools
+import time
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+_snowflakes = itertools.count(1_400_000_000_000_000_000)
+
+
+def snowflake():
+    return next(_snowflakes)
+
+
+class FakeBackend:
+    """Records Discord API calls. Subclass and override `request` to add latency or rate limits"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def request(self, route, bucket=None):
+        """`bucket` is a rate-limit bucket key, or a tuple of them when a route counts against several"""
+        self.calls += 1
+
+
+class FakeRole:
+    def __init__(self, role_id, name="role"):
+        self.id = role_id
+        self.name = name
+        self.mention = f"<@&{role_id}>"
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+
+class FakePermissions:
+    def __init__(self, **kwargs):
+        self.read_messages = kwargs.get('read_messages', True)
+        self.manage_channels = kwargs.get('manage_channels', False)
+        self.manage_messages = kwargs.get('manage_messages', False)
+
+
+class FakeMember:
+    def __init__(self, guild, member_id=None, name=None, roles=(), staff=False):
+        self.id = member_id or snowflake()
+        self.name = name or f"user{self.id % 100000}"
+        self.display_name = self.name
+        self.guild = guild
+        self.roles = list(roles)
+        self.bot = False
+        self.mention = f"<@{self.id}>"
+        self.guild_permissions = FakePermissions(manage_channels=staff, manage_messages=staff)
+        self.display_avatar = None
+        self.status = discord.Status.online
+        self.dms = []
+
+    def __str__(self):
+        return self.name
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    async def timeout(self, until, *, reason=None):
+        await self.guild.backend.request('PATCH /guilds/:id/members/:id', bucket=f"guild:{self.guild.id}:members")
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.backend.request('POST /users/@me/channels')
+        await self.guild.backend.request('POST /channels/:id/messages', bucket=f"dm:{self.id}")
+        attachments = [FakeAttachment(f.filename) for f in [kwargs.get('file')] if f]
+        message = FakeMessage(self, None, content or "", embeds=[e for e in [kwargs.get('embed')] if e], attachments=attachments)
+        self.dms.append(message)
+        return message
+
+
+class FakeAttachment:
+    def __init__(self, filename, size=0):
+        self.filename = filename
+        self.size = size
+        self.url = f"https://cdn.discordapp.com/attachments/{snowflake()}/{snowflake()}/{filename}"
+
+
+class FakeMessage:
+    def __init__(self, author, channel, content, embeds=(), attachments=(), created_at=None):
+        self.id = snowflake()
+        self.author = author
+        self.channel = channel
+        self.content = content
+        self.embeds = list(embeds)
+        self.attachments = list(attachments)
+        self.type = discord.MessageType.default
+        self.created_at = created_at or datetime.now(timezone.utc)
+        self.mentions = []
+        # discord.ext.commands reads the connection state off messages
+        self._state = None
+
+    @property
+    def guild(self):
+        return self.channel.guild if self.channel is not None else None
+
+    async def delete(self):
+        if self.channel is not None:
+            await self.channel.guild.backend.request('DELETE /channels/:id/messages/:id', bucket=f"delete:{self.channel.id}")
+
+
+class FakeCategory(discord.CategoryChannel):
+    def __init__(self, guild, category_id=None, name="tickets"):
+        self.id = category_id or snowflake()
+        self.name = name
+        self.guild = guild
+        self.position = 0
+        self.category_id = None
+
+    @property
+    def channels(self):
+        return [c for c in self.guild.text_channels if c.category_id == self.id]
+
+    @property
+    def text_channels(self):
+        return self.channels
+
+    @property
+    def overwrites(self):
+        return {}
+
+    async def delete(self, reason=None):
+        await self.guild.backend.request('DELETE /channels/:id')
+        self.guild._remove_channel(self)
+
+
+class FakeTextChannel:
+    def __init__(self, guild, name, category=None, overwrites=None, topic=None, channel_id=None):
+        self.id = channel_id or snowflake()
+        self.name = name
+        self.guild = guild
+        self.category_id = category.id if category else None
+        self.overwrites = dict(overwrites or {})
+        self.topic = topic
+        self.messages = []
+        self.mention = f"<#{self.id}>"
+        self.created_at = datetime.now(timezone.utc)
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def category(self):
+        return self.guild.get_channel(self.category_id)
+
+    async def send(self, content=None, *, embed=None, embeds=None, view=None, file=None, files=None, **kwargs):
+        await self.guild.backend.request('POST /channels/:id/messages', bucket=f"channel:{self.id}")
+        attachments = []
+        for f in ([file] if file else []) + list(files or []):
+            attachments.append(FakeAttachment(f.filename))
+        all_embeds = ([embed] if embed else []) + list(embeds or [])
+        message = FakeMessage(self.guild.me, self, content or "", embeds=all_embeds, attachments=attachments)
+        self.messages.append(message)
+        return message
+
+    async def history(self, limit=None, oldest_first=False, **kwargs):
+        messages = self.messages if oldest_first else list(reversed(self.messages))
+        if limit is not None:
+            messages = messages[:limit]
+        # Discord pages history 100 messages per request
+        for i, message in enumerate(messages):
+            if i % 100 == 0:
+                await self.guild.backend.request('GET /channels/:id/messages', bucket=f"channel:{self.id}")
+            yield message
+
+    async def edit(self, **kwargs):
+        if 'name' in kwargs:
+            # One PATCH, but renames also count against their own much stricter bucket
+            await self.guild.backend.request('PATCH /channels/:id [rename]', bucket=(f"channel:{self.id}", f"rename:{self.id}"))
+            self.name = kwargs['name']
+        else:
+            await self.guild.backend.request('PATCH /channels/:id', bucket=f"channel:{self.id}")
+        if 'category' in kwargs:
+            category = kwargs['category']
+            self.category_id = category.id if category else None
+        if 'topic' in kwargs:
+            self.topic = kwargs['topic']
+        if 'overwrites' in kwargs:
+            self.overwrites = dict(kwargs['overwrites'])
+        return self
+
+    async def set_permissions(self, target, *, overwrite=discord.utils.MISSING, **permissions):
+        await self.guild.backend.request('PUT /channels/:id/permissions/:id', bucket=f"channel:{self.id}")
+        if overwrite is None:
+            self.overwrites.pop(target, None)
+        elif overwrite is discord.utils.MISSING:
+            self.overwrites[target] = discord.PermissionOverwrite(**permissions)
+        else:
+            self.overwrites[target] = overwrite
+
+    def permissions_for(self, member):
+        overwrite = self.overwrites.get(member)
+        allowed = overwrite is not None and overwrite.read_messages is not False
+        return FakePermissions(read_messages=allowed)
+
+    async def delete(self, reason=None):
+        await self.guild.backend.request('DELETE /channels/:id')
+        self.guild._remove_channel(self)
+
+
+class FakeGuild:
+    def __init__(self, backend=None, guild_id=None, name="UCRP"):
+        self.id = guild_id or snowflake()
+        self.name = name
+        self.backend = backend or FakeBackend()
+        self.icon = None
+        self._channels = {}
+        self._roles = {}
+        self._members = {}
+        self.default_role = self.add_role(self.id, "@everyone")
+        self.me = FakeMember(self, name="ucrp-bot")
+        self.me.bot = True
+
+    # --- Builders ---
+    def add_role(self, role_id=None, name="role"):
+        role = FakeRole(role_id or snowflake(), name)
+        self._roles[role.id] = role
+        return role
+
+    def add_member(self, member_id=None, name=None, roles=(), staff=False):
+        member = FakeMember(self, member_id, name, roles, staff)
+        self._members[member.id] = member
+        return member
+
+    def add_category(self, category_id=None, name="tickets"):
+        category = FakeCategory(self, category_id, name)
+        self._channels[category.id] = category
+        return category
+
+    def add_text_channel(self, name, category=None, channel_id=None, overwrites=None, topic=None):
+        channel = FakeTextChannel(self, name, category, overwrites, topic, channel_id)
+        self._channels[channel.id] = channel
+        return channel
+
+    def _remove_channel(self, channel):
+        self._channels.pop(channel.id, None)
+
+    # --- discord.Guild API ---
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_member(self, member_id):
+        return self._members.get(member_id)
+
+    @property
+    def channels(self):
+        return list(self._channels.values())
+
+    @property
+    def categories(self):
+        return [c for c in self._channels.values() if isinstance(c, FakeCategory)]
+
+    @property
+    def text_channels(self):
+        return [c for c in self._channels.values() if isinstance(c, FakeTextChannel)]
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    async def create_text_channel(self, name, *, category=None, overwrites=None, topic=None, **kwargs):
+        await self.backend.request('POST /guilds/:id/channels', bucket=f"guild:{self.id}:channels")
+        return self.add_text_channel(name, category, overwrites=overwrites, topic=topic)
+
+    async def create_category(self, name, *, overwrites=None, position=None, **kwargs):
+        await self.backend.request('POST /guilds/:id/channels', bucket=f"guild:{self.id}:channels")
+        return self.add_category(name=name)
+
+
+def fill_channel(channel, authors, count, start=None):
+    """Append `count` realistic messages from `authors` to a fake channel"""
+    start = start or datetime(2025, 7, 28, 6, 0, tzinfo=timezone.utc)
+    lines = [
+        "Hey, I need help with my whitelist application",
+        "Sure, what's the issue?",
+        "I submitted it yesterday but haven't heard back. My character name is John Carter and I applied for the police department.",
+        "Let me check that for you, give me a minute.",
+        "ok thanks",
+        "Can you send a screenshot of the error? <@1063813791994884147>",
+        "Here you go",
+    ]
+    for i in range(count):
+        author = authors[(i // 3) % len(authors)]
+        message = FakeMessage(author, channel, lines[i % len(lines)], created_at=start + timedelta(seconds=20 * i))
+        if i % 25 == 0:
+            message.embeds.append(discord.Embed(title="🎫 Ticket Created", description="Your support ticket has been created."))
+        if i % 40 == 0:
+            message.attachments.append(FakeAttachment(f"screenshot-{i}.png", 204800))
+        channel.messages.append(message)
+    return channel
+
+
+class FakeInteractionResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+        self.modal = None
+
+    def is_done(self):
+        return self._done
+
+    async def _ack(self):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        await self._interaction.guild.backend.request('POST /interactions/:id/:token/callback')
+        self._done = True
+        self._interaction.acked_at = time.perf_counter()
+
+    async def defer(self, *, ephemeral=False, thinking=False):
+        await self._ack()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._ack()
+        self._interaction.sent.append(content or kwargs.get('embed'))
+
+    async def send_modal(self, modal):
+        await self._ack()
+        self.modal = modal
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self._interaction.guild.backend.request('POST /webhooks/:id/:token', bucket=f"webhook:{self._interaction.id}")
+        self._interaction.sent.append(content or kwargs.get('embed'))
+
+
+class FakeInteraction:
+    """Just enough of discord.Interaction for the ticket views"""
+
+    def __init__(self, guild, user, channel=None):
+        self.id = snowflake()
+        self.guild = guild
+        self.user = user
+        self.channel = channel
+        self.channel_id = channel.id if channel else None
+        self.created = time.perf_counter()
+        self.acked_at = None
+        self.sent = []
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+
+    @property
+    def ack_latency(self):
+        return None if self.acked_at is None else self.acked_at - self.created
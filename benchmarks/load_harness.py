@@ -0,0 +1,371 @@
+"""Burst load harness: a ticket-panel stampede against a simulated Discord API.
+
+Hundreds of players click the panel button within a few seconds, fill in the
+reason modal and submit it, while staff close a share of the new tickets (some
+of them double-clicked by two staff at once, some raced by a delete). Everything runs through the real
+TicketPanelView / TicketReasonModal / TicketControlView code and a TicketManager
+on a scratch data directory. Discord is replaced by `SimulatedDiscord`, which adds
+per-request latency and enforces Discord-style rate-limit buckets, answering 429s
+that the client waits out and retries like discord.py does.
+
+    python -m benchmarks.load_harness --players 300 --spread 5
+    python -m benchmarks.load_harness --players 500 --latency 0.15 --no-rate-limits
+    python -m benchmarks.load_harness --players 40 --spread 60 --warm-pool 10
+    python -m benchmarks.load_harness --players 100 --spread 5 --guild-per-minute 60 --spammers 20
+
+The report covers sustained tickets/second, interaction ack latency and the
+correctness of the store afterwards: duplicate ticket numbers, players told their
+ticket was created but missing from the store, and channels with no ticket record,
+plus whether double clicks ran the close once and racing deletes were refused.
+The harness exits non-zero if any of those correctness counts is above zero.
+With --warm-pool the pool is filled before the rush (as it would be after a quiet
+spell) and the report shows how many tickets got a ready channel. Admission
+control is off unless --guild-per-minute is given; --spammers adds users who
+hammer the panel button.
+"""
+import argparse
+import asyncio
+import discord
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_ticket_manager import State
+from benchmarks.fakes import FakeBackend, FakeInteraction
+from utils.warm_pool import POOL_PREFIX, WARM_POOL_CLAIMS
+from views.ticket_views import DeleteConfirmationModal, TicketPanelView, TicketControlView
+
+# (requests, per seconds) keyed by the bucket prefix used in benchmarks.fakes
+DEFAULT_LIMITS = {
+    'global': (50, 1.0),
+    'guild': (10, 10.0),      # channel creation per guild
+    'channel': (5, 5.0),      # messages / edits / permission changes per channel
+    'delete': (5, 1.0),       # message deletes per channel
+    'rename': (2, 600.0),     # channel renames
+    'dm': (5, 5.0),
+    'webhook': (5, 2.0),      # interaction followups
+}
+
+
+class SimulatedDiscord(FakeBackend):
+    """Fake HTTP API with latency and fixed-window rate-limit buckets"""
+
+    def __init__(self, latency=0.08, jitter=0.04, limits=None, seed=1):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.limits = DEFAULT_LIMITS if limits is None else limits
+        self.rng = random.Random(seed)
+        self.windows = {}
+        self.rate_limited = Counter()
+        self.routes = Counter()
+
+    def _delay(self):
+        return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def _retry_after(self, key, now):
+        """Take a slot in a bucket, or return how long to wait"""
+        limit = self.limits.get(key.split(':', 1)[0])
+        if limit is None:
+            return 0.0
+        count, per = limit
+        remaining, reset_at = self.windows.get(key, (count, now + per))
+        if now >= reset_at:
+            remaining, reset_at = count, now + per
+        if remaining <= 0:
+            self.windows[key] = (remaining, reset_at)
+            return reset_at - now
+        self.windows[key] = (remaining - 1, reset_at)
+        return 0.0
+
+    async def request(self, route, bucket=None):
+        self.calls += 1
+        self.routes[route] += 1
+        # Interaction callbacks are exempt from the global limit
+        keys = [] if route.startswith('POST /interactions') else ['global']
+        if bucket:
+            keys.extend((bucket,) if isinstance(bucket, str) else bucket)
+        while True:
+            now = time.perf_counter()
+            retry_after = max((self._retry_after(key, now) for key in keys), default=0.0)
+            if retry_after <= 0:
+                break
+            # The 429 itself costs a round trip before the client sleeps
+            self.rate_limited[route] += 1
+            await asyncio.sleep(self._delay() + retry_after)
+        await asyncio.sleep(self._delay())
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        limits = {} if args.no_rate_limits else None
+        self.backend = SimulatedDiscord(args.latency, args.jitter, limits, args.seed)
+        self.state = State(args.stored, self.backend)
+        self.state.filler(args.stored)
+        self.state.write(warm_pool_size=args.warm_pool, ticket_guild_per_minute=args.guild_per_minute, staff_presence=True)
+        self.manager = self.state.manager
+        self.panel_channel = self.state.guild.add_text_channel("support")
+        self.staff = [self.state.guild.add_member(name=f"staff{i}", roles=[self.state.staff_role], staff=True) for i in range(4)]
+        self.manager.refresh_staff(self.state.guild)
+        self.reassigned = []
+        self.queued = 0            # players told to wait in line for guild capacity
+        self.spam_admitted = 0
+        self.spam_refused = 0
+        self.spam_latency = []
+
+        self.click_acks = []
+        self.submit_acks = []
+        self.create_latency = []   # modal submit until the ticket channel is ready
+        self.close_acks = []
+        self.created = []          # members who were told their ticket was created
+        self.create_errors = Counter()
+        self.closes_succeeded = Counter()
+        self.closes_requested = 0
+        self.refused = Counter()   # operation -> clicks turned away because another one was running
+        self.refusal_latency = []
+        self.deleted = set()       # members whose ticket was deleted on purpose
+        self.created_at = []
+
+    async def player(self, index):
+        await asyncio.sleep(self.rng.uniform(0, self.args.spread))
+        member = self.state.guild.add_member()
+
+        click = FakeInteraction(self.state.guild, member, self.panel_channel)
+        view = TicketPanelView(self.manager)
+        await view.create_ticket.callback(click)
+        self.click_acks.append(click.ack_latency)
+
+        modal = click.response.modal
+        modal.reason_input._value = f"Stampede ticket {index}: my whitelist application is stuck"
+        await asyncio.sleep(self.rng.uniform(0, self.args.think))
+
+        submit = FakeInteraction(self.state.guild, member, self.panel_channel)
+        await modal.on_submit(submit)
+        self.submit_acks.append(submit.ack_latency)
+        self.create_latency.append(time.perf_counter() - submit.created)
+
+        replies = [m for m in submit.sent if isinstance(m, str)]
+        if replies and replies[0].startswith("⏳"):
+            self.queued += 1
+        reply = replies[-1] if replies else ""
+        if reply.startswith("✅"):
+            self.created.append(member)
+            self.created_at.append(time.perf_counter())
+        else:
+            self.create_errors[reply[:60]] += 1
+            return
+
+        if self.rng.random() < self.args.close_fraction:
+            channel = self.state.guild.get_channel(int(reply.split('<#')[1].split('>')[0]))
+            await asyncio.sleep(self.rng.uniform(0, self.args.think))
+            closers = [self.rng.choice(self.staff)]
+            if self.rng.random() < self.args.double_click:
+                closers.append(self.rng.choice(self.staff))
+            clicks = [self.close(channel, staff) for staff in closers]
+            if self.rng.random() < self.args.delete_race:
+                clicks.append(self.delete(channel, self.rng.choice(self.staff), member))
+            self.closes_requested += 1
+            await asyncio.gather(*clicks)
+
+    async def close(self, channel, staff):
+        interaction = FakeInteraction(self.state.guild, staff, channel)
+        view = TicketControlView(self.manager)
+        await view.close_ticket.callback(interaction)
+        self.close_acks.append(interaction.ack_latency)
+        if any(getattr(m, 'title', None) == "🔒 Ticket Closed" for m in interaction.sent):
+            self.closes_succeeded[channel.id] += 1
+        self._count_refusal('close', interaction)
+
+    async def delete(self, channel, staff, owner):
+        interaction = FakeInteraction(self.state.guild, staff, channel)
+        modal = DeleteConfirmationModal(self.manager)
+        modal.confirmation_input._value = "DELETE"
+        await modal.on_submit(interaction)
+        if self.state.guild.get_channel(channel.id) is None:
+            self.deleted.add(owner.id)
+        self._count_refusal('delete', interaction)
+
+    async def spammer(self):
+        """Someone clicking the panel button over and over, as in a raid"""
+        member = self.state.guild.add_member()
+        await asyncio.sleep(self.rng.uniform(0, self.args.spread))
+        for _ in range(10):
+            click = FakeInteraction(self.state.guild, member, self.panel_channel)
+            start = time.perf_counter()
+            await TicketPanelView(self.manager).create_ticket.callback(click)
+            if click.response.modal is None:
+                self.spam_refused += 1
+                self.spam_latency.append(time.perf_counter() - start)
+            else:
+                self.spam_admitted += 1
+            await asyncio.sleep(0.1)
+
+    async def staff_leaves(self):
+        """One staffer goes offline halfway through the rush, and their open tickets move to the others"""
+        await asyncio.sleep(self.args.spread / 2)
+        self.staff[0].status = discord.Status.offline
+        self.reassigned = await self.manager.staff_unavailable(self.state.guild, self.staff[0])
+
+    def _count_refusal(self, operation, interaction):
+        if any(isinstance(m, str) and m.startswith("❌ This ticket is being") for m in interaction.sent):
+            self.refused[operation] += 1
+            self.refusal_latency.append(time.perf_counter() - interaction.created)
+
+    async def run(self):
+        if self.args.warm_pool:
+            await self.manager.warm_pool.refill(self.state.guild, target=self.args.warm_pool)
+            # The pool was filled long before the rush: start with fresh rate-limit windows and counters
+            self.backend.windows.clear()
+            self.backend.routes.clear()
+            self.backend.calls = 0
+        start = time.perf_counter()
+        await asyncio.gather(self.staff_leaves(), *(self.player(i) for i in range(self.args.players)),
+                             *(self.spammer() for _ in range(self.args.spammers)))
+        self.elapsed = time.perf_counter() - start
+        self.start = start
+
+    def report(self):
+        """Print the report; returns the correctness checks that failed"""
+        tickets = {t.key: t for t in self.manager.store.all()}
+        pools = (self.manager.open_pool, self.manager.closed_pool)
+        ticket_channels = [c for c in self.state.guild.text_channels
+                           if any(c.category_id in pool for pool in pools) and not c.name.startswith(POOL_PREFIX)]
+        # Numbers handed out, as shown in the channel topic, and numbers kept in the store
+        numbers = Counter(c.topic.rsplit('#', 1)[-1] for c in ticket_channels if c.topic and '#' in c.topic)
+        numbers.update(f"{t.ticket_number:04d}" for t in tickets.values() if self.state.guild.get_channel(t.channel_id) is None)
+        duplicates = sum(count - 1 for count in numbers.values() if count > 1)
+        stored_users = defaultdict(int)
+        for t in tickets.values():
+            stored_users[t.user_id] += 1
+        lost = sum(1 for member in self.created if not stored_users.get(member.id) and member.id not in self.deleted)
+        orphaned = [c for c in ticket_channels if str(c.id) not in tickets]
+        transcripts = sum(1 for entry in os.scandir('data/transcripts') if entry.is_file())
+        duplicate_closes = sum(count - 1 for count in self.closes_succeeded.values() if count > 1)
+
+        sustained = 0.0
+        if len(self.created_at) > 1:
+            sustained = len(self.created_at) / (max(self.created_at) - self.start)
+
+        def latency_line(label, values):
+            values = [v for v in values if v is not None]
+            over = sum(1 for v in values if v > 3.0)
+            return (f"{label:<22} p50 {percentile(values, 0.5) * 1000:8.1f} ms   p99 {percentile(values, 0.99) * 1000:8.1f} ms"
+                    f"   max {max(values, default=0) * 1000:8.1f} ms   >3s: {over}")
+
+        print(f"players:                {self.args.players} over {self.args.spread:.1f}s "
+              f"(latency {self.args.latency * 1000:.0f}±{self.args.jitter * 1000:.0f} ms, "
+              f"{'no rate limits' if self.args.no_rate_limits else 'rate limited'})")
+        print(f"wall time:              {self.elapsed:.2f}s")
+        print(f"tickets created:        {len(self.created)} (sustained {sustained:.2f} tickets/s)")
+        print(f"create rejections:      {dict(self.create_errors)}")
+        print(latency_line("panel click ack", self.click_acks))
+        print(latency_line("modal submit ack", self.submit_acks))
+        print(latency_line("ticket ready", self.create_latency))
+        print(latency_line("close ack", self.close_acks))
+        print(f"API calls:              {self.backend.calls}, 429s: {sum(self.backend.rate_limited.values())}")
+        for route, count in self.backend.rate_limited.most_common(5):
+            print(f"    429 {route}: {count}")
+        print("correctness:")
+        print(f"    duplicate ticket numbers:  {duplicates}")
+        print(f"    lost records:              {lost}")
+        print(f"    orphaned channels:         {len(orphaned)}")
+        print(f"    duplicate closes:          {duplicate_closes}")
+        print(f"    transcripts written:       {transcripts}")
+        print(f"    channel renames:           {self.backend.routes['PATCH /channels/:id [rename]']}")
+        print(f"single flight:          {self.closes_requested} closes requested, {len(self.closes_succeeded)} closed, "
+              f"{len(self.deleted)} deleted mid-close, refused {dict(self.refused)}")
+        if self.refusal_latency:
+            print(latency_line("refusal", self.refusal_latency))
+        if self.args.warm_pool:
+            hits, misses = (int(WARM_POOL_CLAIMS.labels(outcome).value) for outcome in ('hit', 'miss'))
+            print(f"warm pool:              {hits} claimed, {misses} created cold, "
+                  f"{len(self.manager.warm_pool)} left (target now {self.manager.warm_pool.target()})")
+        players = {member.id for member in self.created}
+        open_tickets = [t for t in tickets.values() if t.status == 'open' and t.user_id in players]
+        loads = Counter(t.assigned_to for t in open_tickets)
+        print(f"staff assignment:       open per staffer {[loads.get(m.id, 0) for m in self.staff]}, "
+              f"unassigned {loads.get(None, 0)}, {len(self.reassigned)} moved when {self.staff[0]} went offline")
+        print(f"admission:              {self.queued} players queued, spam clicks {self.spam_admitted} shown the modal, "
+              f"{self.spam_refused} refused, {len(self.manager.admission)} still waiting")
+        if self.spam_latency:
+            print(latency_line("spam refusal", self.spam_latency))
+        print(f"category shards:        open {self.manager.open_pool.counts()}, closed {self.manager.closed_pool.counts()}")
+        checks = {
+            'duplicate ticket numbers': duplicates,
+            'lost records': lost,
+            'orphaned channels': len(orphaned),
+            'duplicate closes': duplicate_closes,
+            # Every close request ends with the ticket closed or deleted, and one transcript either way
+            'transcripts off by': abs(transcripts - self.closes_requested),
+        }
+        return [f"{name}: {count}" for name, count in checks.items() if count]
+
+
+class _CountingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.errors = Counter()
+
+    def emit(self, record):
+        self.errors[record.getMessage()[:80]] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, default=300)
+    parser.add_argument('--spread', type=float, default=5.0, help="Seconds over which players click the panel")
+    parser.add_argument('--think', type=float, default=1.0, help="Max seconds a player/staffer waits between steps")
+    parser.add_argument('--latency', type=float, default=0.08, help="Mean API latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.04)
+    parser.add_argument('--no-rate-limits', action='store_true')
+    parser.add_argument('--stored', type=int, default=1000, help="Tickets already in the store")
+    parser.add_argument('--close-fraction', type=float, default=0.3)
+    parser.add_argument('--double-click', type=float, default=0.2, help="Share of closes clicked by two staff at once")
+    parser.add_argument('--delete-race', type=float, default=0.1, help="Share of closes raced by a delete of the same ticket")
+    parser.add_argument('--warm-pool', type=int, default=0, help="Warm pool size, pre-filled before the rush (0 disables)")
+    parser.add_argument('--guild-per-minute', type=int, default=0, help="Guild-wide ticket admission rate (0 disables)")
+    parser.add_argument('--spammers', type=int, default=0, help="Users clicking the panel button ten times each")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    handler = _CountingHandler()
+    logging.getLogger().addHandler(handler)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory(prefix="ucrp-load-") as workdir:
+        os.chdir(workdir)
+        os.makedirs('data/transcripts', exist_ok=True)
+
+        async def run():
+            harness = Harness(args)
+            await harness.run()
+            return harness.report()
+
+        failures = asyncio.run(run())
+
+    if handler.errors:
+        print("errors logged:")
+        for message, count in handler.errors.most_common(5):
+            print(f"    {count:>5} × {message}")
+    if failures:
+        print(f"FAILED: {', '.join(failures)}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+"""Replay a recorded evening of traffic against the real bot, offline.
+
+Recordings come from utils.traffic_recorder (set RECORD_TRAFFIC on the live bot).
+The replayer imports the real `app` module (its on_message pipeline), loads the
+real TicketSystem cog and drives the real views, all against fake Discord objects
+from benchmarks.fakes with a simulated HTTP backend. Pseudonymous users and
+channels from the recording are bound to fake members and channels on first use.
+
+    python -m benchmarks.replay data/recordings/friday.ndjson.gz            # as fast as possible
+    python -m benchmarks.replay friday.ndjson.gz --speed 1                  # original timing
+    python -m benchmarks.replay friday.ndjson.gz --json new.json --compare old.json
+
+Each user's interactions are replayed in order; messages are dispatched as they
+arrive. The report gives end-to-end handler latency per event kind, interaction
+ack latency, CPU time and API calls, and can be diffed against a previous run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeAttachment, FakeGuild, FakeInteraction, FakeMessage
+from benchmarks.load_harness import SimulatedDiscord, percentile
+from utils.config import BotConfig, config_service
+from utils.ticket_model import Ticket
+from utils.traffic_recorder import load_recording
+
+
+class ReplayGuild(FakeGuild):
+    """Remembers channels created during the replay so recorded ticket channels can be bound to them"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.unbound_tickets = deque()
+
+    async def create_text_channel(self, name, **kwargs):
+        channel = await super().create_text_channel(name, **kwargs)
+        self.unbound_tickets.append(channel)
+        return channel
+
+
+class Replayer:
+    def __init__(self, app, records, args):
+        self.app = app
+        self.records = records
+        self.args = args
+        self.backend = SimulatedDiscord(args.latency, args.jitter, {} if args.no_rate_limits else None)
+        config = BotConfig()
+        self.guild = ReplayGuild(self.backend, guild_id=config.guild_id)
+        self.staff_role = self.guild.add_role(config.staff_role_id, "Staff")
+        self.open_category = self.guild.add_category(config.ticket_categories[0], "tickets")
+        self.closed_category = self.guild.add_category(config.closed_categories[0], "closed-tickets")
+        self.guild.add_text_channel("ticket-logs", channel_id=config.log_channel_id)
+        self.media_channels = [self.guild.add_text_channel(f"media-{i}", channel_id=channel_id) for i, channel_id in enumerate(config.media_channel_ids)]
+        self.general = self.guild.add_text_channel("general")
+
+        self.members = {}
+        self.channels = {}
+        self.pending_modals = {}
+        self.user_chains = {}
+        self.tasks = []
+        self.latencies = defaultdict(list)
+        self.acks = defaultdict(list)
+        self.failures = defaultdict(int)
+
+    async def setup(self):
+        config_service.write_defaults()
+        config_service.load()
+        with open('data/tickets.json', 'w') as f:
+            json.dump({}, f)
+
+        bot = self.app.bot
+        bot._connection.user = self.guild.me
+        await bot.load_extension("cogs.ticket_system")
+        self.cog = bot.get_cog("TicketSystem")
+        self.manager = self.cog.ticket_manager
+
+    # --- Binding pseudonyms ---
+    def member(self, record):
+        member = self.members.get(record['u'])
+        if member is None:
+            staff = bool(record.get('s'))
+            roles = [self.staff_role] if staff else []
+            member = self.members[record['u']] = self.guild.add_member(roles=roles, staff=staff)
+        return member
+
+    def channel(self, record, member):
+        pseudonym = record.get('c')
+        channel = self.channels.get(pseudonym)
+        if channel is not None:
+            return channel
+        kind = record.get('ck')
+        if kind == 'monitored':
+            channel = self.media_channels[pseudonym % len(self.media_channels)]
+        elif kind == 'ticket':
+            channel = self.guild.unbound_tickets.popleft() if self.guild.unbound_tickets else self.existing_ticket(member)
+        else:
+            channel = self.general
+        self.channels[pseudonym] = channel
+        return channel
+
+    def existing_ticket(self, member):
+        """A ticket that was already open when the recording started"""
+        owner = member if not member.roles else self.guild.add_member()
+        channel = self.guild.add_text_channel(f"ticket-{owner.name}", self.open_category)
+        self.manager.store.add(Ticket(
+            ticket_number=len(self.manager.store.hot) + 1,
+            channel_id=channel.id,
+            user_id=owner.id,
+            user_name=owner.name,
+            status='open',
+            created_at=datetime(2025, 1, 1),
+            reason="Opened before the recording"
+        ))
+        self.manager.store.save()
+        return channel
+
+    def reference(self, pseudonym):
+        member = self.members.get(pseudonym)
+        if member is None:
+            member = self.members[pseudonym] = self.guild.add_member()
+        return member
+
+    @staticmethod
+    def placeholder(record):
+        length = record.get('n', 0)
+        seed = record.get('h', "message")
+        word = f"lorem{seed} "
+        return (word * (length // len(word) + 1))[:length]
+
+    # --- Dispatch ---
+    async def handle_message(self, record):
+        member = self.member(record)
+        channel = self.channel(record, member)
+        content = self.placeholder(record)
+        attachments = [FakeAttachment(f"image{i}.png", 250_000) for i in range(record.get('a', 0))]
+        message = FakeMessage(member, channel, content, attachments=attachments)
+        message._state = self.app.bot._connection
+        channel.messages.append(message)
+        await self.app.on_message(message)
+
+    async def handle_interaction(self, record):
+        member = self.member(record)
+        kind = record['k']
+        if kind == 'modal':
+            modal = self.pending_modals.pop(record['u'], None)
+            if modal is None:
+                self.failures['modal without a pending modal'] += 1
+                return
+            interaction = FakeInteraction(self.guild, member, self.channel(record, member))
+            inputs = [item for item in modal.children if hasattr(item, '_value')]
+            for item, field in zip(inputs, record.get('f', [])):
+                if 'v' in field:
+                    item._value = field['v']
+                elif 'ref' in field:
+                    item._value = f"<@{self.reference(field['ref']).id}>"
+                else:
+                    item._value = "x" * max(1, field.get('n', 1))
+            await modal.on_submit(interaction)
+        elif kind == 'component':
+            interaction = FakeInteraction(self.guild, member, self.channel(record, member))
+            callback = self.component_callback(record)
+            if callback is None:
+                self.failures[f"unknown component {record.get('cid') or record.get('label')}"] += 1
+                return
+            await callback(interaction)
+        elif kind == 'command':
+            interaction = FakeInteraction(self.guild, member, self.channel(record, member))
+            command = next((c for c in self.cog.__cog_app_commands__ if c.name == record['name']), None)
+            if command is None:
+                self.failures[f"unknown command {record['name']}"] += 1
+                return
+            kwargs = {}
+            for name, option in record.get('opts', {}).items():
+                if 'ref' in option:
+                    kwargs[name] = self.channels.get(option['ref']) or self.general
+                elif 'v' in option:
+                    kwargs[name] = option['v']
+                else:
+                    kwargs[name] = "x" * option.get('n', 1)
+            await command.callback(self.cog, interaction, **kwargs)
+        else:
+            return
+
+        self.acks[kind].append(interaction.ack_latency)
+        if interaction.response.modal is not None:
+            self.pending_modals[record['u']] = interaction.response.modal
+
+    def component_callback(self, record):
+        from views.ticket_views import DeleteTicketView, TicketControlView, TicketPanelView
+        custom_id = record.get('cid')
+        if custom_id == 'create_ticket':
+            return TicketPanelView(self.manager).create_ticket.callback
+        if custom_id in ('close_ticket', 'add_user', 'remove_user', 'delete_ticket'):
+            return getattr(TicketControlView(self.manager), custom_id).callback
+        label = record.get('label')
+        if label == "Reopen Ticket":
+            return DeleteTicketView(self.manager).reopen_ticket.callback
+        if label == "Delete Ticket":
+            return DeleteTicketView(self.manager).delete_ticket.callback
+        return None
+
+    async def timed(self, kind, handler, record):
+        start = time.perf_counter()
+        try:
+            await handler(record)
+        except Exception as e:
+            self.failures[f"{kind}: {type(e).__name__}: {e}"[:100]] += 1
+        self.latencies[kind].append(time.perf_counter() - start)
+
+    async def chained(self, previous, kind, record):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        await self.timed(kind, self.handle_interaction, record)
+
+    async def run(self):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        for record in self.records:
+            if self.args.speed:
+                delay = record['t'] / self.args.speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if record['e'] == 'm':
+                self.tasks.append(asyncio.create_task(self.timed(f"message/{record.get('ck')}", self.handle_message, record)))
+            elif record['e'] == 'i':
+                kind = f"interaction/{record['k']}"
+                task = asyncio.create_task(self.chained(self.user_chains.get(record['u']), kind, record))
+                self.user_chains[record['u']] = task
+                self.tasks.append(task)
+            # Let handlers make progress between dispatches, like the gateway would
+            await asyncio.sleep(0)
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.elapsed = time.perf_counter() - start
+        self.cpu = time.process_time() - cpu_start
+
+    def summary(self):
+        result = {
+            'events': len(self.records),
+            'wall_s': round(self.elapsed, 3),
+            'cpu_s': round(self.cpu, 3),
+            'api_calls': self.backend.calls,
+            'rate_limited': sum(self.backend.rate_limited.values()),
+            'latency_ms': {},
+            'ack_ms': {},
+            'failures': dict(self.failures)
+        }
+        for kind, values in sorted(self.latencies.items()):
+            result['latency_ms'][kind] = {
+                'count': len(values),
+                'p50': round(percentile(values, 0.5) * 1000, 2),
+                'p99': round(percentile(values, 0.99) * 1000, 2)
+            }
+        for kind, values in sorted(self.acks.items()):
+            values = [v for v in values if v is not None]
+            result['ack_ms'][kind] = {
+                'p50': round(percentile(values, 0.5) * 1000, 2),
+                'p99': round(percentile(values, 0.99) * 1000, 2),
+                'over_3s': sum(1 for v in values if v > 3.0)
+            }
+        return result
+
+
+def print_summary(result, previous=None):
+    def delta(new, old):
+        if old in (None, 0):
+            return ""
+        return f"  ({(new / old - 1) * 100:+.0f}%)"
+
+    prev = previous or {}
+    print(f"events:      {result['events']}")
+    print(f"wall time:   {result['wall_s']:.2f}s{delta(result['wall_s'], prev.get('wall_s'))}")
+    print(f"cpu time:    {result['cpu_s']:.2f}s{delta(result['cpu_s'], prev.get('cpu_s'))}")
+    print(f"api calls:   {result['api_calls']} ({result['rate_limited']} rate limited)")
+    print("handler latency:")
+    for kind, stats in result['latency_ms'].items():
+        old = prev.get('latency_ms', {}).get(kind, {})
+        print(f"    {kind:<26} n={stats['count']:<6} p50 {stats['p50']:8.1f} ms{delta(stats['p50'], old.get('p50'))}"
+              f"   p99 {stats['p99']:8.1f} ms{delta(stats['p99'], old.get('p99'))}")
+    print("ack latency:")
+    for kind, stats in result['ack_ms'].items():
+        print(f"    {kind:<26} p50 {stats['p50']:8.1f} ms   p99 {stats['p99']:8.1f} ms   >3s: {stats['over_3s']}")
+    if result['failures']:
+        print("failures:")
+        for message, count in result['failures'].items():
+            print(f"    {count:>5} × {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=0, help="Playback speed factor (1 = original timing, 0 = as fast as possible)")
+    parser.add_argument('--latency', type=float, default=0.08)
+    parser.add_argument('--jitter', type=float, default=0.04)
+    parser.add_argument('--no-rate-limits', action='store_true')
+    parser.add_argument('--json', help="Write the summary to this file")
+    parser.add_argument('--compare', help="Summary JSON of a previous run to diff against")
+    args = parser.parse_args()
+
+    records = list(load_recording(args.recording))
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+
+    # Never record while replaying, and keep the replay's data files out of the repo
+    os.environ.pop("RECORD_TRAFFIC", None)
+    os.environ.setdefault("METRICS_PORT", "0")
+    with tempfile.TemporaryDirectory(prefix="ucrp-replay-") as workdir:
+        os.chdir(workdir)
+        os.makedirs('data/transcripts', exist_ok=True)
+        import app
+
+        async def run():
+            replayer = Replayer(app, records, args)
+            await replayer.setup()
+            await replayer.run()
+            return replayer.summary()
+
+        result = asyncio.run(run())
+
+    print_summary(result, previous)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Offline benchmark suite for the ticket system.
+
+Every scenario runs in its own subprocess inside a scratch data directory, with
+fake Discord objects and no network. For each scenario and size it reports
+throughput, p50/p99 latency, peak RSS and peak Python allocations per operation,
+and compares against a saved baseline.
+
+    python -m benchmarks.run                        # run everything
+    python -m benchmarks.run --only create --quick  # subset, fewer iterations
+    python -m benchmarks.run --save-baseline        # record benchmarks/baseline.json
+
+Exits with status 1 when a metric regresses by more than --tolerance, and with
+status 2 when there is no baseline to compare against. --save-baseline with
+--only updates just those scenarios' entries.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+MODULES = ('benchmarks.bench_ticket_manager', 'benchmarks.bench_transcript')
+# Metrics where bigger is worse, and the one where smaller is worse
+LOWER_IS_BETTER = ('p50_ms', 'p99_ms', 'peak_rss_mb', 'alloc_peak_kb')
+HIGHER_IS_BETTER = ('ops_per_sec',)
+NOISE_FLOOR_MS = 0.5   # Latency changes smaller than this are timer and scheduler noise, not regressions
+
+
+def load_scenarios():
+    import importlib
+    scenarios = {}
+    for module_name in MODULES:
+        scenarios.update(importlib.import_module(module_name).SCENARIOS)
+    return scenarios
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+async def measure(name, size, iterations, alloc_iterations):
+    sizes, _, setup, operation = load_scenarios()[name]
+    state = await setup(size, iterations + alloc_iterations)
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        op_start = time.perf_counter()
+        await operation(state, i)
+        latencies.append(time.perf_counter() - op_start)
+    elapsed = time.perf_counter() - start
+
+    # Allocation peaks are measured on separate iterations, tracemalloc skews timing
+    alloc_peaks = []
+    tracemalloc.start()
+    for i in range(iterations, iterations + alloc_iterations):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        await operation(state, i)
+        _, peak = tracemalloc.get_traced_memory()
+        alloc_peaks.append(peak - before)
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'scenario': name,
+        'size': size,
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'alloc_peak_kb': round(sorted(alloc_peaks)[len(alloc_peaks) // 2] / 1024, 1) if alloc_peaks else None
+    }
+
+
+def run_child(name, size, iterations, alloc_iterations):
+    """Entry point of the per-scenario subprocess"""
+    with tempfile.TemporaryDirectory(prefix="ucrp-bench-") as workdir:
+        os.chdir(workdir)
+        os.makedirs('data/transcripts', exist_ok=True)
+        result = asyncio.run(measure(name, size, iterations, alloc_iterations))
+    print(json.dumps(result))
+
+
+def run_scenario(name, size, iterations, alloc_iterations):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.run', '--child', name, str(size), str(iterations), str(alloc_iterations)],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if output.returncode != 0:
+        raise RuntimeError(f"{name}@{size} failed:\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def compare(result, baseline, tolerance):
+    """Return a list of human-readable regressions against the baseline entry"""
+    regressions = []
+    for key in LOWER_IS_BETTER:
+        old, new = baseline.get(key), result.get(key)
+        if key.endswith('_ms') and new is not None and old is not None and new - old < NOISE_FLOOR_MS:
+            continue
+        if old and new is not None and new > old * (1 + tolerance):
+            regressions.append(f"{key} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    for key in HIGHER_IS_BETTER:
+        old, new = baseline.get(key), result.get(key)
+        if old and new is not None and new < old * (1 - tolerance):
+            regressions.append(f"{key} {old} -> {new} ({(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', help="Only run scenarios whose name contains this string")
+    parser.add_argument('--sizes', help="Comma-separated sizes to run instead of each scenario's defaults")
+    parser.add_argument('--quick', action='store_true', help="Run a fifth of the iterations")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative regression (default 0.25)")
+    parser.add_argument('--child', nargs=4, metavar=('NAME', 'SIZE', 'ITERATIONS', 'ALLOC_ITERATIONS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        name, size, iterations, alloc_iterations = args.child
+        run_child(name, int(size), int(iterations), int(alloc_iterations))
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}, so nothing can be compared.\n"
+              f"Record one on this machine first with: python -m benchmarks.run --save-baseline", file=sys.stderr)
+        sys.exit(2)
+
+    results = {}
+    failed = []
+    print(f"{'scenario':<36}{'size':>8}{'ops/s':>12}{'p50 ms':>11}{'p99 ms':>11}{'rss MB':>9}{'alloc KB':>11}")
+    for name, (sizes, iterations, _, _) in load_scenarios().items():
+        if args.only and args.only not in name:
+            continue
+        for size in ([int(s) for s in args.sizes.split(',')] if args.sizes else sizes):
+            count = iterations.get(size, min(iterations.values()))
+            if args.quick:
+                count = max(1, count // 5)
+            result = run_scenario(name, size, count, max(1, min(count, 3)))
+            key = f"{name}@{size}"
+            results[key] = result
+            print(
+                f"{name:<36}{size:>8}{result['ops_per_sec']:>12,.1f}{result['p50_ms']:>11.2f}"
+                f"{result['p99_ms']:>11.2f}{result['peak_rss_mb']:>9.1f}{result['alloc_peak_kb'] or 0:>11.1f}"
+            )
+            if args.save_baseline:
+                continue
+            if key not in baseline:
+                print(f"    no baseline for {key}, run with --save-baseline to record it")
+                continue
+            for regression in compare(result, baseline[key], args.tolerance):
+                failed.append(f"{key}: {regression}")
+                print(f"    ⚠ REGRESSION {regression}")
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif failed:
+        print(f"\n{len(failed)} regression(s) against {args.baseline}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Replay a recorded message stream through SpamFilter and measure throughput.
+
+The stream is newline-delimited JSON, one message per line:
+
+    {"ts": 1722150000.12, "user_id": 1, "channel_id": 2, "content": "hello"}
+
+Without --stream a synthetic stream is generated with a large member base,
+a handful of flooders and a cross-channel copy/paste raid.
+
+    python -m benchmarks.spam_replay --messages 1000000 --users 150000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.spam_filter import SpamFilter
+
+
+def load_stream(path):
+    """Yield (ts, user_id, channel_id, content) tuples from an NDJSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['ts'], record['user_id'], record['channel_id'], record.get('content', '')
+
+
+def synthetic_stream(messages, users, channels, seed=1):
+    """Generate a realistic stream with a few flooders and a copy/paste raid"""
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 9))) for _ in range(3000)]
+    flooders = [rng.randrange(users) for _ in range(20)]
+    raid_text = "JOIN discord.gg/free-nitro NOW free nitro giveaway"
+    ts = 1_700_000_000.0
+    stream = []
+    while len(stream) < messages:
+        ts += rng.expovariate(200)  # ~200 msg/s across the guild
+        roll = rng.random()
+        if roll < 0.001:
+            # A flooder fires a burst of short messages
+            user = rng.choice(flooders)
+            channel = rng.randrange(channels)
+            for _ in range(10):
+                ts += rng.uniform(0.1, 0.4)
+                stream.append((ts, user, channel, rng.choice(vocabulary)))
+            continue
+        if roll < 0.004:
+            user = rng.randrange(users)
+            content = raid_text
+        else:
+            user = rng.randrange(users)
+            content = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 12)))
+        stream.append((ts, user, rng.randrange(channels), content))
+    return stream
+
+
+def run(stream, spam_filter):
+    verdicts = {}
+    count = 0
+    start = time.perf_counter()
+    for ts, user_id, channel_id, content in stream:
+        verdict = spam_filter.check(user_id, channel_id, content, now=ts)
+        if verdict:
+            verdicts[verdict] = verdicts.get(verdict, 0) + 1
+        count += 1
+    elapsed = time.perf_counter() - start
+    return count, elapsed, verdicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stream', help="NDJSON file with recorded messages")
+    parser.add_argument('--messages', type=int, default=500_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--channels', type=int, default=80)
+    parser.add_argument('--memory', action='store_true', help="Trace allocations (slower)")
+    args = parser.parse_args()
+
+    if args.stream:
+        stream = list(load_stream(args.stream))
+    else:
+        stream = synthetic_stream(args.messages, args.users, args.channels)
+
+    spam_filter = SpamFilter()
+    if args.memory:
+        tracemalloc.start()
+    count, elapsed, verdicts = run(stream, spam_filter)
+    if args.memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"messages:    {count}")
+    print(f"elapsed:     {elapsed:.3f}s")
+    print(f"throughput:  {count / elapsed:,.0f} msg/s")
+    print(f"per message: {elapsed / count * 1e6:.2f} µs")
+    print(f"state:       {spam_filter.stats()}")
+    print(f"verdicts:    {verdicts}")
+    if args.memory:
+        print(f"peak memory: {peak / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
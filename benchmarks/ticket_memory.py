@@ -0,0 +1,105 @@
+"""Compare ticket records held as dicts (schema 1) with Ticket objects (schema 2).
+
+Reports resident memory per record and the time to save and load the hot set
+in each on-disk format: the old indented JSON, compact schema 2 JSON and the
+binary snapshot.
+
+    python -m benchmarks.ticket_memory --tickets 100000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ticket_model import Ticket
+from utils.ticket_store import TicketStore
+
+
+def v1_record(i, base=datetime(2025, 1, 1)):
+    """A closed ticket as the bot used to store it"""
+    created = base + timedelta(minutes=i)
+    return {
+        'ticket_number': i + 1,
+        'user_id': 100_000_000_000_000_000 + i,
+        'user_name': f"player{i}",
+        'channel_id': 1_395_000_000_000_000_000 + i,
+        'category_id': 1356590186552758495,
+        'status': 'closed',
+        'created_at': created.isoformat(),
+        'reason': "Need help with my whitelist application",
+        'added_users': [],
+        'closed_at': (created + timedelta(hours=2)).isoformat(),
+        'closed_by': f"staff{i % 7}",
+        'transcript_file': f"data/transcripts/ticket-player{i}.html",
+    }
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    records = build()
+    size = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, 'filename'))
+    tracemalloc.stop()
+    return records, size
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=100_000)
+    args = parser.parse_args()
+    n = args.tickets
+
+    # Decode from JSON on both sides, as the store does, so neither shares strings with a template
+    encoded = json.dumps([v1_record(i) for i in range(n)])
+    dicts, dict_bytes = measure(lambda: {str(r['channel_id']): r for r in json.loads(encoded)})
+    tickets, ticket_bytes = measure(lambda: {str(r['channel_id']): Ticket.from_dict(r, 1) for r in json.loads(encoded)})
+    del encoded
+
+    print(f"{n} tickets in memory")
+    print(f"  dict records:     {dict_bytes / n:8.0f} B/ticket   {dict_bytes / 2**20:8.1f} MiB")
+    print(f"  Ticket records:   {ticket_bytes / n:8.0f} B/ticket   {ticket_bytes / 2**20:8.1f} MiB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n{'format':<20} {'size':>10} {'save':>10} {'load':>10}")
+
+        # The old store: the whole dict dumped with indent=2 and loaded back as dicts
+        path = os.path.join(tmp, 'v1.json')
+        with open(path, 'w') as f:
+            _, save_seconds = timed(lambda: json.dump(dicts, f, indent=2))
+        with open(path, 'r') as f:
+            _, load_seconds = timed(lambda: json.load(f))
+        report('json v1 (indent=2)', path, save_seconds, load_seconds)
+
+        for name, binary in (('json v2 (compact)', False), ('binary snapshot', True)):
+            paths = {
+                'hot_path': os.path.join(tmp, f'{binary}.json'),
+                'cold_path': os.path.join(tmp, f'{binary}.ndjson'),
+                'snapshot_path': os.path.join(tmp, f'{binary}.bin'),
+            }
+            store = TicketStore(binary=binary, **paths)
+            store.hot = tickets
+            _, save_seconds = timed(store.save)
+            loaded, load_seconds = timed(lambda: TicketStore(binary=binary, **paths))
+            assert len(loaded.hot) == n
+            report(name, paths['snapshot_path' if binary else 'hot_path'], save_seconds, load_seconds)
+
+
+def report(name, path, save_seconds, load_seconds):
+    size = os.path.getsize(path)
+    print(f"{name:<20} {size / 2**20:7.1f} MiB {save_seconds * 1000:7.0f} ms {load_seconds * 1000:7.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Size and render time of transcript HTML on realistic conversations.
+
+Saves a structured transcript for channels of several sizes (two to four
+people taking turns in short bursts, with the occasional embed and
+attachment, as fill_channel writes them), then renders each one to HTML
+through the cache-miss path and reports page size, gzipped size, bytes per
+message and render time.
+
+    python -m benchmarks.transcript_size --sizes 100 1000 10000
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeGuild, fill_channel
+from utils.transcript_generator import TranscriptGenerator
+
+
+def conversation(size, people):
+    guild = FakeGuild()
+    category = guild.add_category()
+    authors = [guild.add_member(name=f"player{i}") for i in range(people - 1)]
+    authors.append(guild.add_member(name="staffer", staff=True))
+    return fill_channel(guild.add_text_channel("ticket-player0", category), authors, size)
+
+
+def measure(workdir, size, people, repeat):
+    generator = TranscriptGenerator(transcript_dir=workdir)
+    transcript = asyncio.run(generator.generate_transcript(conversation(size, people)))
+    times = []
+    for _ in range(repeat):
+        for entry in os.scandir(generator.html_dir):
+            os.remove(entry.path)
+        start = time.perf_counter()
+        page = asyncio.run(generator.html_for(transcript))
+        times.append(time.perf_counter() - start)
+    with open(page, 'rb') as f:
+        data = f.read()
+    return len(data), len(gzip.compress(data)), statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--people', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'messages':>9} {'html KiB':>10} {'gzip KiB':>10} {'bytes/msg':>10} {'render ms':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="ucrp-transcript-") as workdir:
+            raw, packed, seconds = measure(workdir, size, args.people, args.repeat)
+        print(f"{size:>9} {raw / 1024:>10.1f} {packed / 1024:>10.1f} {raw / size:>10.0f} {seconds * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,129 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
+import io
 import json
 import logging
+import os
+import tempfile
+from datetime import datetime
 from utils.ticket_manager import TicketManager
-from views.ticket_views import TicketPanelView, TicketControlView
+from utils import tracing
+from utils.config import config_service
+from utils.analytics import format_duration
+from utils.reconciler import TicketReconciler
+from utils.staff_scheduler import is_available
+from utils.ticket_export import export_to_file
+from utils.tracing import traced
+from views.ticket_views import TicketPanelView, TicketControlView, TicketListView
 
 logger = logging.getLogger(__name__)
 
+ARCHIVE_SWEEP_MINUTES = 15
+RECONCILE_MINUTES = 30
+WARM_POOL_SECONDS = 60
+ANALYTICS_FLUSH_SECONDS = 60
+EXPORT_MAX_BYTES = 7 * 1024 * 1024   # Stay under Discord's 8 MiB upload limit; larger exports continue from a cursor
+
 class TicketSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.ticket_manager = TicketManager()
+        self.reconciler = TicketReconciler(self.ticket_manager)
+
+    async def cog_load(self):
+        self.reconcile_loop.start()
+        self.archive_sweep.start()
+        self.warm_pool_loop.start()
+        self.analytics_flush.start()
+        self.ticket_manager.audit_log.start(self._log_channel)
+        # Index the archive for /tickets and /tickethistory now rather than on their first use
+        self.ticket_manager.store.build_listing()
+
+    async def cog_unload(self):
+        self.reconcile_loop.cancel()
+        self.archive_sweep.cancel()
+        self.warm_pool_loop.cancel()
+        self.analytics_flush.cancel()
+        self.ticket_manager.analytics.flush()
+        # Post what is queued so deliveries waiting on the log upload can finish, then let them
+        await self.ticket_manager.audit_log.stop(self._log_channel)
+        await self.ticket_manager.drain()
+
+    def _log_channel(self):
+        return self.bot.get_channel(config_service.current.log_channel_id)
+
+    @tasks.loop(minutes=RECONCILE_MINUTES)
+    async def reconcile_loop(self):
+        """Repair drift between the ticket store and the guild, first right after startup"""
+        guild = self.bot.get_guild(config_service.current.guild_id)
+        if guild is None:
+            return
+        report = self.reconciler.reconcile(guild)
+        self.ticket_manager.refresh_staff(guild)
+        if report.changed:
+            logger.warning(
+                "Ticket reconciliation: %s (stale %s, moved %s, adopted %s)",
+                report.summary(), report.stale, report.moved, report.adopted
+            )
+        else:
+            logger.info("Ticket reconciliation: %s", report.summary())
+
+    @reconcile_loop.before_loop
+    async def before_reconcile(self):
+        await self.bot.wait_until_ready()
+
+    @reconcile_loop.error
+    async def reconcile_error(self, error):
+        logger.error("Ticket reconciliation failed: %s", error, exc_info=error)
+
+    @tasks.loop(minutes=ARCHIVE_SWEEP_MINUTES)
+    async def archive_sweep(self):
+        """Delete the channels of closed tickets past the grace period, a few at a time"""
+        guild = self.bot.get_guild(config_service.current.guild_id)
+        if guild is None:
+            return
+        archived = await self.ticket_manager.archive_expired_tickets(guild)
+        if archived:
+            logger.info("Archival sweep archived %d tickets", archived)
+
+    @archive_sweep.before_loop
+    async def before_archive_sweep(self):
+        await self.bot.wait_until_ready()
+
+    @archive_sweep.error
+    async def archive_sweep_error(self, error):
+        logger.error("Archival sweep failed: %s", error, exc_info=error)
+
+    @tasks.loop(seconds=WARM_POOL_SECONDS)
+    async def warm_pool_loop(self):
+        """Keep the warm channel pool at its target, and shrink it again once tickets slow down"""
+        guild = self.bot.get_guild(config_service.current.guild_id)
+        if guild is None:
+            return
+        await self.ticket_manager.warm_pool.refill(guild)
+
+    @warm_pool_loop.before_loop
+    async def before_warm_pool(self):
+        await self.bot.wait_until_ready()
+
+    @warm_pool_loop.error
+    async def warm_pool_error(self, error):
+        logger.error("Warm pool refill failed: %s", error, exc_info=error)
+
+    @tasks.loop(seconds=ANALYTICS_FLUSH_SECONDS)
+    async def analytics_flush(self):
+        """Persist the ticket analytics if any lifecycle event changed them"""
+        self.ticket_manager.analytics.flush()
+
+    @analytics_flush.error
+    async def analytics_flush_error(self, error):
+        logger.error("Saving ticket analytics failed: %s", error, exc_info=error)
 
     @app_commands.command(name="ticket", description="Send a ticket panel to a channel")
     @app_commands.describe(channel="The channel to send the ticket panel to")
-    @app_commands.guilds(1169251155721846855)  # Your guild ID for instant syncing
+    @app_commands.guilds(config_service.current.guild_id)  # Guild-scoped for instant syncing (read at load time)
+    @traced
     async def ticket_panel(self, interaction: discord.Interaction, channel: discord.TextChannel):
         """Send a ticket panel to the specified channel"""
 
@@ -60,7 +168,7 @@ class TicketSystem(commands.Cog):
                 f"✅ Ticket panel has been sent to {channel.mention}!",
                 ephemeral=True
             )
-            logger.info(f"Ticket panel sent to {channel.name} by {interaction.user}")
+            logger.info("Ticket panel sent to %s by %s", channel.name, interaction.user, extra={'channel_id': channel.id, 'actor': interaction.user.id})
 
         except discord.Forbidden:
             await interaction.response.send_message(
@@ -68,12 +176,287 @@ class TicketSystem(commands.Cog):
                 ephemeral=True
             )
         except Exception as e:
-            logger.error(f"Error sending ticket panel: {e}")
+            logger.exception("Error sending ticket panel: %s", e)
             await interaction.response.send_message(
                 "❌ An error occurred while sending the ticket panel!",
                 ephemeral=True
             )
 
+    @app_commands.command(name="tracedump", description="Dump recent interaction traces")
+    @app_commands.describe(slow_only="Only include slow, failed or expired interactions")
+    @app_commands.guilds(config_service.current.guild_id)
+    @traced
+    async def trace_dump(self, interaction: discord.Interaction, slow_only: bool = False):
+        """Send the buffered interaction traces as a JSON file"""
+
+        # Permission check
+        if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.manage_channels:
+            await interaction.response.send_message(
+                "❌ You need `Manage Channels` permission to use this command!",
+                ephemeral=True
+            )
+            return
+
+        traces = tracing.dump(slow_only=slow_only)
+        if not traces:
+            await interaction.response.send_message("ℹ️ No traces recorded yet.", ephemeral=True)
+            return
+
+        data = json.dumps(traces, indent=2).encode('utf-8')
+        file = discord.File(io.BytesIO(data), filename="interaction-traces.json")
+        await interaction.response.send_message(
+            f"🧭 {len(traces)} interaction traces",
+            file=file,
+            ephemeral=True
+        )
+
+    @app_commands.command(name="reopenticket", description="Reopen an archived ticket in a new channel")
+    @app_commands.describe(ticket_number="The number of the archived ticket")
+    @app_commands.guilds(config_service.current.guild_id)
+    @traced
+    async def reopen_archived(self, interaction: discord.Interaction, ticket_number: int):
+        """Recreate the channel of an archived ticket"""
+
+        # Permission check
+        if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.manage_channels:
+            await interaction.response.send_message(
+                "❌ You need `Manage Channels` permission to use this command!",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.defer(ephemeral=True)
+
+        joined = self.ticket_manager.operations.running(('archived', ticket_number)) == 'reopen'
+        channel, error = await self.ticket_manager.reopen_archived_ticket(interaction.guild, ticket_number, interaction.user)
+        if error:
+            await interaction.followup.send(f"❌ {error}", ephemeral=True)
+            return
+        if joined:
+            await interaction.followup.send(f"✅ Ticket #{ticket_number:04d} was just reopened in {channel.mention}", ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title="🔓 Ticket Reopened",
+            description=f"This ticket has been reopened by {interaction.user.mention}",
+            color=0x00ff88
+        )
+        embed.add_field(
+            name="📋 What happened?",
+            value="• The archived ticket was restored in a new channel\n• User access restored\n• Ticket is now active again",
+            inline=False
+        )
+        embed.set_footer(text="Ticket System")
+        await channel.send(embed=embed, view=TicketControlView(self.ticket_manager))
+
+        await interaction.followup.send(f"✅ Ticket #{ticket_number:04d} reopened in {channel.mention}", ephemeral=True)
+
+    @app_commands.command(name="tickets", description="List tickets by status")
+    @app_commands.describe(
+        status="Which tickets to list (default: open)",
+        before="Only tickets created before this date, YYYY-MM-DD"
+    )
+    @app_commands.choices(status=[
+        app_commands.Choice(name="Open", value="open"),
+        app_commands.Choice(name="Closed", value="closed"),
+        app_commands.Choice(name="Archived", value="archived"),
+    ])
+    @app_commands.guilds(config_service.current.guild_id)
+    @traced
+    async def list_tickets(self, interaction: discord.Interaction, status: str = "open", before: str = None):
+        """Page through open tickets oldest first, or closed/archived ones newest first"""
+
+        # Permission check
+        if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.manage_channels:
+            await interaction.response.send_message(
+                "❌ You need `Manage Channels` permission to use this command!",
+                ephemeral=True
+            )
+            return
+
+        start = None
+        if before:
+            try:
+                start = (datetime.strptime(before, "%Y-%m-%d"),)
+            except ValueError:
+                await interaction.response.send_message("❌ Use the date format YYYY-MM-DD, e.g. 2025-07-01.", ephemeral=True)
+                return
+
+        # Open tickets that have waited longest come first; otherwise the most recent
+        newest_first = status != 'open' or start is not None
+        title = f"{TicketListView.STATUS_EMOJI[status]} {status.capitalize()} Tickets" + (f" before {before}" if before else "")
+        view = TicketListView(self.ticket_manager, title, status=status, start=start, newest_first=newest_first)
+        # The listing index may still be building, which can take longer than the 3s to respond
+        await interaction.response.defer(ephemeral=True)
+        await self.ticket_manager.store.listing_ready()
+        await interaction.followup.send(embed=view.render(), view=view, ephemeral=True)
+
+    @app_commands.command(name="tickethistory", description="Show a member's tickets")
+    @app_commands.describe(user="The member whose tickets to show")
+    @app_commands.guilds(config_service.current.guild_id)
+    @traced
+    async def ticket_history(self, interaction: discord.Interaction, user: discord.User):
+        """Page through every ticket a member opened, newest first, including archived ones"""
+
+        # Permission check
+        if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.manage_channels:
+            await interaction.response.send_message(
+                "❌ You need `Manage Channels` permission to use this command!",
+                ephemeral=True
+            )
+            return
+
+        view = TicketListView(self.ticket_manager, f"🗂️ Tickets of {user}", user_id=user.id)
+        await interaction.response.defer(ephemeral=True)
+        await self.ticket_manager.store.listing_ready()
+        await interaction.followup.send(embed=view.render(), view=view, ephemeral=True)
+
+    @app_commands.command(name="ticketstats", description="Show ticket statistics")
+    @app_commands.describe(
+        period="The period to summarise (default: today)",
+        export="Attach every day of the last 90 as JSON"
+    )
+    @app_commands.choices(period=[
+        app_commands.Choice(name="Today", value=1),
+        app_commands.Choice(name="Last 7 days", value=7),
+        app_commands.Choice(name="Last 30 days", value=30),
+    ])
+    @app_commands.guilds(config_service.current.guild_id)
+    @traced
+    async def ticket_stats(self, interaction: discord.Interaction, period: int = 1, export: bool = False):
+        """Summarise the maintained ticket aggregates; no ticket records are read"""
+
+        # Permission check
+        if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.manage_channels:
+            await interaction.response.send_message(
+                "❌ You need `Manage Channels` permission to use this command!",
+                ephemeral=True
+            )
+            return
+
+        analytics = self.ticket_manager.analytics
+        stats = analytics.summary(period)
+        embed = discord.Embed(
+            title="📊 Ticket Statistics",
+            description=f"{stats['start']} to {stats['end']}" if period > 1 else f"Today, {stats['end']}",
+            color=0x00aaff
+        )
+        embed.add_field(name="📥 Opened", value=str(stats['opened']), inline=True)
+        embed.add_field(
+            name="🔒 Closed",
+            value=f"{stats['closed']} ({stats['closed_by_owner']} by owners)" if stats['closed_by_owner'] else str(stats['closed']),
+            inline=True
+        )
+        reopen_rate = stats['reopen_rate']
+        embed.add_field(
+            name="🔁 Reopened",
+            value=f"{stats['reopened']} ({reopen_rate:.0%})" if reopen_rate is not None else str(stats['reopened']),
+            inline=True
+        )
+        embed.add_field(name="⏱️ Median time to close", value=format_duration(stats['median_close_seconds']), inline=True)
+        embed.add_field(name="⏱️ p90 time to close", value=format_duration(stats['p90_close_seconds']), inline=True)
+        embed.add_field(
+            name="🕒 Busiest hours",
+            value=", ".join(f"{hour:02d}:00" for hour in stats['busiest_hours']) or "n/a",
+            inline=True
+        )
+        closers = list(stats['closures_by_staff'].items())[:5]
+        embed.add_field(
+            name="🧑‍💼 Closures by staff",
+            value="\n".join(f"<@{staff_id}>: {count}" for staff_id, count in closers) or "None",
+            inline=False
+        )
+        embed.set_footer(text="Ticket System")
+
+        if export:
+            data = json.dumps(analytics.export(), indent=2).encode('utf-8')
+            file = discord.File(io.BytesIO(data), filename="ticket-stats.json")
+            await interaction.response.send_message(embed=embed, file=file, ephemeral=True)
+        else:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="ticketexport", description="Export tickets or transcript messages for analysis")
+    @app_commands.describe(
+        kind="Ticket records, or one row per transcript message",
+        format="NDJSON (one JSON object per line) or CSV",
+        since="Only tickets created on or after this date, YYYY-MM-DD",
+        until="Only tickets created before this date, YYYY-MM-DD",
+        cursor="Continue a previous export from the cursor it gave"
+    )
+    @app_commands.choices(
+        kind=[
+            app_commands.Choice(name="Tickets", value="tickets"),
+            app_commands.Choice(name="Transcript messages", value="messages"),
+        ],
+        format=[
+            app_commands.Choice(name="NDJSON", value="ndjson"),
+            app_commands.Choice(name="CSV", value="csv"),
+        ]
+    )
+    @app_commands.guilds(config_service.current.guild_id)
+    @traced
+    async def ticket_export(self, interaction: discord.Interaction, kind: str = "tickets", format: str = "ndjson",
+                            since: str = None, until: str = None, cursor: str = None):
+        """Stream an export into a gzipped file; exports past the upload limit continue from a cursor"""
+
+        # Permission check
+        if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.manage_channels:
+            await interaction.response.send_message(
+                "❌ You need `Manage Channels` permission to use this command!",
+                ephemeral=True
+            )
+            return
+
+        try:
+            start = datetime.strptime(since, "%Y-%m-%d") if since else None
+            end = datetime.strptime(until, "%Y-%m-%d") if until else None
+        except ValueError:
+            await interaction.response.send_message("❌ Use the date format YYYY-MM-DD, e.g. 2025-07-01.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        filename = f"ticket-{kind}.{format}.gz"
+        with tempfile.TemporaryDirectory(prefix="ticket-export-") as workdir:
+            path = os.path.join(workdir, filename)
+            try:
+                rows, resume = await export_to_file(
+                    self.ticket_manager.store, path, kind, format, start, end, cursor, max_bytes=EXPORT_MAX_BYTES
+                )
+            except ValueError as e:
+                await interaction.followup.send(f"❌ {e}", ephemeral=True)
+                return
+            message = f"📦 Exported {rows} {'ticket' if kind == 'tickets' else 'message'} rows."
+            if resume:
+                message += f"\nThe file size limit was reached; run the export again with `cursor: {resume}` for the rest."
+            await interaction.followup.send(message, file=discord.File(path, filename=filename), ephemeral=True)
+
+    def _is_staff(self, member):
+        staff_role_id = config_service.current.staff_role_id
+        return any(role.id == staff_role_id for role in member.roles)
+
+    async def _staff_changed(self, member, available):
+        if available:
+            await self.ticket_manager.staff_available(member.guild, member)
+        else:
+            await self.ticket_manager.staff_unavailable(member.guild, member)
+
+    @commands.Cog.listener()
+    async def on_presence_update(self, before, after):
+        """Rebalance ticket assignments as staff go offline or come back"""
+        if after.guild.id != config_service.current.guild_id or not self._is_staff(after):
+            return
+        if is_available(before) != is_available(after):
+            await self._staff_changed(after, is_available(after))
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        """Start or stop assigning tickets when someone gains or loses the staff role"""
+        if after.guild.id != config_service.current.guild_id:
+            return
+        was_staff, is_staff = self._is_staff(before), self._is_staff(after)
+        if was_staff != is_staff and is_available(after):
+            await self._staff_changed(after, is_staff)
+
     @commands.Cog.listener()
     async def on_ready(self):
         """Re-add views when bot restarts"""
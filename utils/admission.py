@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+from utils import metrics
+from utils.config import config_service
+
+logger = logging.getLogger(__name__)
+
+MAX_USERS = 20000        # Per-user buckets kept; the least recently used are dropped first
+MAX_WAIT = 600.0         # Seconds a queued request may wait, well inside the 15 minute interaction token
+
+ADMISSIONS = metrics.Counter(
+    "ucrp_ticket_admissions", "Ticket creation attempts by admission outcome", ("stage", "outcome")
+)
+ADMISSION_QUEUE = metrics.Gauge(
+    "ucrp_ticket_admission_queue", "Ticket requests waiting for guild capacity"
+)
+
+
+class TokenBucket:
+    """`capacity` tokens, refilled continuously at `rate` per second"""
+
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, capacity, now):
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def _refill(self, capacity, rate, now):
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def take(self, capacity, rate, now):
+        """Take a token if there is one; otherwise return the seconds until there will be"""
+        self._refill(capacity, rate, now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate if rate > 0 else float('inf')
+
+
+class Rejected(Exception):
+    """A ticket request turned away by admission control; the message is shown to the user"""
+
+
+class AdmissionControl:
+    """Rate limits ticket creation per user and guild-wide, before any real work is done.
+
+    Each user has a small token bucket (`ticket_attempts_per_user` tokens, one
+    back every `ticket_user_cooldown_seconds`), checked when the panel button is
+    clicked, so open/close/open cycling and button spam are refused before the
+    modal is even shown. Submitted requests then need a token from the guild
+    bucket (`ticket_guild_per_minute`). When it is empty, requests wait in a
+    FIFO queue, one place per user, up to `ticket_queue_size`; a background
+    task lets them through in order as tokens come back. All checks are in
+    memory and O(1).
+    """
+
+    def __init__(self, max_users=MAX_USERS, max_wait=MAX_WAIT):
+        self.max_users = max_users
+        self.max_wait = max_wait
+        self._users = OrderedDict()   # user id -> TokenBucket, least recently used first
+        self._guild = None
+        self._queue = deque()         # (user id, future) in arrival order
+        self._queued = set()
+        self._dispatcher = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def check_user(self, user_id, now=None):
+        """Spend one of the user's attempts. Raises Rejected while they are cooling down"""
+        config = config_service.current
+        if config.ticket_attempts_per_user <= 0:
+            return
+        if user_id in self._queued:
+            ADMISSIONS.labels("click", "already_queued").inc()
+            raise Rejected("Your ticket request is already waiting in line.")
+        now = time.monotonic() if now is None else now
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(config.ticket_attempts_per_user, now)
+            self._users[user_id] = bucket
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        wait = bucket.take(config.ticket_attempts_per_user, 1 / max(1, config.ticket_user_cooldown_seconds), now)
+        if wait:
+            ADMISSIONS.labels("click", "user_limited").inc()
+            raise Rejected(f"You're opening tickets too quickly. Try again in {_duration(wait)}.")
+        ADMISSIONS.labels("click", "admitted").inc()
+
+    async def admit(self, user_id, on_queued=None):
+        """Wait for guild capacity. `on_queued(position)` is awaited if the request has to queue.
+
+        Raises Rejected when the queue is full, the user already has a request
+        waiting, or the wait runs past `max_wait`.
+        """
+        config = config_service.current
+        capacity = config.ticket_guild_per_minute
+        if capacity <= 0:
+            return
+        now = time.monotonic()
+        if self._guild is None:
+            self._guild = TokenBucket(capacity, now)
+        # Nobody may jump the queue, even if a token just came back
+        if not self._queue and not self._guild.take(capacity, capacity / 60, now):
+            ADMISSIONS.labels("submit", "admitted").inc()
+            return
+        if user_id in self._queued:
+            ADMISSIONS.labels("submit", "already_queued").inc()
+            raise Rejected("Your ticket request is already waiting in line.")
+        if len(self._queue) >= config.ticket_queue_size:
+            ADMISSIONS.labels("submit", "queue_full").inc()
+            raise Rejected("Too many tickets are being opened right now. Please try again in a few minutes.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.append((user_id, waiter))
+        self._queued.add(user_id)
+        ADMISSION_QUEUE.set(len(self._queue))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        ADMISSIONS.labels("submit", "queued").inc()
+        try:
+            if on_queued is not None:
+                await on_queued(len(self._queue))
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            ADMISSIONS.labels("submit", "timed_out").inc()
+            raise Rejected("Waited too long for a free slot. Please try again.") from None
+        finally:
+            # A request that gave up leaves its place; the dispatcher skips it
+            if not waiter.done():
+                waiter.cancel()
+            self._queued.discard(user_id)
+
+    async def _dispatch(self):
+        """Let queued requests through in order, one per guild token"""
+        while self._queue:
+            config = config_service.current
+            capacity = config.ticket_guild_per_minute
+            user_id, waiter = self._queue[0]
+            if waiter.done():
+                self._queue.popleft()
+                ADMISSION_QUEUE.set(len(self._queue))
+                continue
+            if capacity <= 0:
+                wait = 0.0   # Cap turned off while requests were waiting
+            else:
+                wait = self._guild.take(capacity, capacity / 60, time.monotonic())
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+            self._queue.popleft()
+            ADMISSION_QUEUE.set(len(self._queue))
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+def _duration(seconds):
+    seconds = max(1, round(seconds))
+    return f"{seconds // 60}m {seconds % 60}s" if seconds >= 60 else f"{seconds}s"
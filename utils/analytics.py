@@ -0,0 +1,261 @@
+import json
+import logging
+import math
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from utils import metrics
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_PATH = 'data/analytics.json'
+RETENTION_DAYS = 90      # Days of aggregates kept; older days are dropped as new ones start
+SKETCH_ALPHA = 0.01      # Relative accuracy of the time-to-close quantiles
+
+
+class QuantileSketch:
+    """Streaming quantiles with bounded relative error (the DDSketch idea).
+
+    Values are counted in logarithmic buckets that each span a factor of
+    gamma = (1 + alpha) / (1 - alpha), so any quantile comes back within
+    `alpha` of the true value relative to it. Memory grows with the log of
+    the value range, not the number of values, and sketches merge by adding
+    counts, which is how daily sketches become weekly ones.
+    """
+
+    __slots__ = ('alpha', 'gamma', '_log_gamma', 'bins', 'zero', 'count')
+
+    def __init__(self, alpha=SKETCH_ALPHA, bins=None, zero=0):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = Counter(bins or {})
+        self.zero = zero   # Values of (practically) zero, which have no logarithm
+        self.count = zero + sum(self.bins.values())
+
+    def add(self, value):
+        if value <= 1e-9:
+            self.zero += 1
+        else:
+            self.bins[math.ceil(math.log(value) / self._log_gamma)] += 1
+        self.count += 1
+
+    def merge(self, other):
+        self.bins.update(other.bins)
+        self.zero += other.zero
+        self.count += other.count
+
+    def quantile(self, q):
+        """The value at rank floor(q * (count - 1)) in sorted order, or None when empty"""
+        if not self.count:
+            return None
+        rank = int(q * (self.count - 1))
+        if rank < self.zero:
+            return 0.0
+        seen = self.zero
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {'zero': self.zero, 'bins': {str(k): v for k, v in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data, alpha=SKETCH_ALPHA):
+        return cls(alpha, {int(k): v for k, v in data.get('bins', {}).items()}, data.get('zero', 0))
+
+
+class _Day:
+    """One day's aggregates"""
+
+    __slots__ = ('opened', 'closed', 'reopened', 'owner_closed', 'hours', 'staff', 'close_seconds')
+
+    def __init__(self):
+        self.opened = 0
+        self.closed = 0
+        self.reopened = 0
+        self.owner_closed = 0          # Closures by the ticket's owner, who aren't counted as staff
+        self.hours = [0] * 24          # Tickets opened per hour of day
+        self.staff = Counter()         # Closures per staff member id
+        self.close_seconds = QuantileSketch()
+
+    def to_dict(self):
+        return {
+            'opened': self.opened, 'closed': self.closed, 'reopened': self.reopened,
+            'owner_closed': self.owner_closed, 'hours': self.hours, 'staff': {str(k): v for k, v in self.staff.items()},
+            'close_seconds': self.close_seconds.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        day = cls()
+        day.opened = data.get('opened', 0)
+        day.closed = data.get('closed', 0)
+        day.reopened = data.get('reopened', 0)
+        day.owner_closed = data.get('owner_closed', 0)
+        day.hours = list(data.get('hours', day.hours))
+        day.staff = Counter({int(k): v for k, v in data.get('staff', {}).items()})
+        day.close_seconds = QuantileSketch.from_dict(data.get('close_seconds', {}))
+        return day
+
+
+class TicketAnalytics:
+    """Per-day ticket aggregates, updated as lifecycle events happen.
+
+    Each day keeps counts of tickets opened, closed and reopened, openings per
+    hour, closures per staff member (owners closing their own tickets are
+    counted apart) and a time-to-close sketch, so a summary
+    over any range of days merges at most RETENTION_DAYS small records and
+    never looks at ticket records. Time to close runs from creation, or from
+    the last reopen for tickets closed again. Aggregates are persisted to
+    data/analytics.json by `flush()`; without that file they are rebuilt once
+    from the stored tickets, as far as the records allow (only a ticket's
+    latest close and reopen are kept on it).
+    """
+
+    def __init__(self, path=ANALYTICS_PATH, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self._days = {}     # ISO date -> _Day
+        self._dirty = False
+        self.loaded = self._load()
+
+    # --- Lifecycle events ---
+    def opened(self, ticket):
+        day = self._day(ticket.created_at)
+        if day is not None:
+            day.opened += 1
+            day.hours[ticket.created_at.hour] += 1
+
+    def closed(self, ticket, by_staff=None):
+        """Count a closure. Only staff closures are credited per member; `by_staff`
+        defaults to whether someone other than the owner closed it"""
+        if ticket.closed_at is None:
+            return
+        day = self._day(ticket.closed_at)
+        if day is None:
+            return
+        day.closed += 1
+        if by_staff is None:
+            by_staff = ticket.closed_by != ticket.user_id
+        if not by_staff:
+            day.owner_closed += 1
+        elif ticket.closed_by is not None:
+            day.staff[ticket.closed_by] += 1
+        started = ticket.reopened_at if ticket.reopened_at and ticket.reopened_at > ticket.created_at else ticket.created_at
+        day.close_seconds.add(max(0.0, (ticket.closed_at - started).total_seconds()))
+
+    def reopened(self, ticket):
+        if ticket.reopened_at is None:
+            return
+        day = self._day(ticket.reopened_at)
+        if day is not None:
+            day.reopened += 1
+
+    def rebuild(self, tickets):
+        """Start over from ticket records: each counts as opened, and as closed/reopened if it was"""
+        self._days = {}
+        for ticket in tickets:
+            self.opened(ticket)
+            if ticket.reopened_at is not None:
+                self.reopened(ticket)
+            if ticket.status != 'open':
+                self.closed(ticket)
+        self._dirty = True
+
+    # --- Queries ---
+    def summary(self, days=1, end=None):
+        """Aggregate the `days` days ending with `end` (default today)"""
+        end = end or date.today()
+        start = end - timedelta(days=days - 1)
+        total = _Day()
+        for offset in range(days):
+            day = self._days.get((start + timedelta(days=offset)).isoformat())
+            if day is None:
+                continue
+            total.opened += day.opened
+            total.closed += day.closed
+            total.reopened += day.reopened
+            total.owner_closed += day.owner_closed
+            total.hours = [a + b for a, b in zip(total.hours, day.hours)]
+            total.staff.update(day.staff)
+            total.close_seconds.merge(day.close_seconds)
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'opened': total.opened,
+            'closed': total.closed,
+            'reopened': total.reopened,
+            'reopen_rate': total.reopened / total.closed if total.closed else None,
+            'closed_by_owner': total.owner_closed,
+            'median_close_seconds': total.close_seconds.quantile(0.5),
+            'p90_close_seconds': total.close_seconds.quantile(0.9),
+            'busiest_hours': sorted(range(24), key=lambda h: (-total.hours[h], h))[:3] if total.opened else [],
+            'opened_by_hour': total.hours,
+            'closures_by_staff': dict(total.staff.most_common()),
+        }
+
+    def export(self, days=RETENTION_DAYS, end=None):
+        """One summary per day, oldest first"""
+        end = end or date.today()
+        return [self.summary(1, end - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+
+    # --- Persistence ---
+    def _day(self, when):
+        key = when.date().isoformat()
+        day = self._days.get(key)
+        if day is None:
+            if key < (date.today() - timedelta(days=self.retention_days)).isoformat():
+                return None
+            day = self._days[key] = _Day()
+            self._expire()
+        self._dirty = True
+        return day
+
+    def _expire(self):
+        cutoff = (date.today() - timedelta(days=self.retention_days)).isoformat()
+        for key in [key for key in self._days if key < cutoff]:
+            del self._days[key]
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._days = {key: _Day.from_dict(value) for key, value in data.get('days', {}).items()}
+            return True
+        except FileNotFoundError:
+            return False
+        except (ValueError, AttributeError) as e:
+            logger.error("Error loading analytics, rebuilding them from the ticket store: %s", e)
+            return False
+
+    def flush(self):
+        """Write the aggregates if anything changed since the last flush"""
+        if not self._dirty:
+            return
+        try:
+            start = time.perf_counter()
+            with span('save_analytics'):
+                data = json.dumps({'days': {key: day.to_dict() for key, day in sorted(self._days.items())}}, separators=(',', ':'))
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+            self._dirty = False
+            metrics.STORE_SECONDS.labels('analytics', 'save').observe(time.perf_counter() - start)
+        except OSError as e:
+            logger.error("Error saving analytics: %s", e)
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "n/a"
+    minutes = round(seconds / 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 48:
+        return f"{hours}h {minutes}m"
+    return f"{hours // 24}d {hours % 24}h"
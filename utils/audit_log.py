@@ -0,0 +1,229 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+
+import discord
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = 'data/audit_queue.ndjson'
+FLUSH_SECONDS = 2.0           # Longest an entry waits before it is posted
+MAX_EMBEDS = 10               # Discord's limit per message
+MAX_FILES = 10                # Discord's limit per message
+MAX_UPLOAD_BYTES = 8 * 2**20  # Stay under the smallest per-message upload limit
+MAX_BACKOFF = 60.0
+
+AUDIT_ENTRIES = metrics.Counter(
+    "ucrp_audit_entries", "Audit log entries by outcome", ("outcome",)
+)
+AUDIT_MESSAGES = metrics.Counter(
+    "ucrp_audit_messages", "Messages posted to the log channel by the audit log"
+)
+AUDIT_QUEUE = metrics.Gauge(
+    "ucrp_audit_queue", "Audit log entries waiting to be posted"
+)
+
+
+class _Entry:
+    __slots__ = ('id', 'embed', 'file', 'filename', 'future')
+
+    def __init__(self, entry_id, embed, file=None, filename=None, future=None):
+        self.id = entry_id
+        self.embed = embed            # Embed as a dict, so it can be persisted as-is
+        self.file = file              # Path of a file to attach, read when the batch is sent
+        self.filename = filename
+        self.future = future          # Resolves to the attachment URL (or None) once posted
+
+    def size(self):
+        try:
+            return os.path.getsize(self.file) if self.file else 0
+        except OSError:
+            return 0
+
+
+class AuditLog:
+    """Batches lifecycle events into multi-embed messages in the log channel.
+
+    Entries are appended to data/audit_queue.ndjson as they are submitted and
+    marked done once posted, so a crash only delays them. A batch is sent when
+    10 embeds are waiting or FLUSH_SECONDS after the oldest arrived, with the
+    entries' files attached to the same message while they fit. Transient send
+    errors keep the batch queued and back off; a batch Discord rejects outright
+    is dropped and logged.
+
+        {"id": 7, "embed": {...}, "file": "data/transcripts/...", "filename": "transcript-ticket-x.html"}
+        {"id": 7, "done": 1}
+    """
+
+    def __init__(self, path=QUEUE_PATH, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self._pending = deque()
+        self._ids = itertools.count(1)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._load()
+
+    def _load(self):
+        entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning("Skipping a corrupt line in %s", self.path)
+                        continue
+                    if record.get('done'):
+                        entries.pop(record['id'], None)
+                    else:
+                        entries[record['id']] = _Entry(record['id'], record['embed'], record.get('file'), record.get('filename'))
+        except FileNotFoundError:
+            pass
+        self._pending.extend(entries.values())
+        self._ids = itertools.count(max(entries, default=0) + 1)
+        AUDIT_QUEUE.set(len(self._pending))
+        if self._pending:
+            logger.info("Restored %d queued audit log entries", len(self._pending))
+
+    def submit(self, embed: discord.Embed, file: str = None, filename: str = None):
+        """Queue an embed (and optionally a file to attach); returns a future for the attachment URL"""
+        entry = _Entry(next(self._ids), embed.to_dict(), file, filename or (os.path.basename(file) if file else None),
+                       asyncio.get_running_loop().create_future())
+        self._append([{'id': entry.id, 'embed': entry.embed, 'file': entry.file, 'filename': entry.filename}])
+        self._pending.append(entry)
+        AUDIT_QUEUE.set(len(self._pending))
+        if len(self._pending) >= MAX_EMBEDS:
+            self._wakeup.set()
+        return entry.future
+
+    def start(self, get_channel):
+        """Start posting; `get_channel` returns the log channel, or None while it isn't available"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(get_channel))
+
+    async def stop(self, get_channel=None):
+        """Stop the background task and post what is still queued, if the channel is available"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        channel = get_channel() if get_channel else None
+        while channel is not None and self._pending:
+            if not await self.flush(channel):
+                break
+
+    async def _run(self, get_channel):
+        delay = self.flush_seconds
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            channel = get_channel()
+            if channel is None or not self._pending:
+                continue
+            ok = True
+            while ok and self._pending:
+                ok = await self.flush(channel)
+                # Only keep draining while full batches are waiting; stragglers wait for the timer
+                if len(self._pending) < MAX_EMBEDS:
+                    break
+            delay = self.flush_seconds if ok else min(delay * 2, MAX_BACKOFF)
+
+    async def flush(self, channel):
+        """Post one batch from the front of the queue. Returns False if it should be retried later"""
+        batch = self._next_batch()
+        files = []
+        try:
+            for entry in batch:
+                if entry.file and _attachable(entry):
+                    files.append((entry, discord.File(entry.file, filename=entry.filename)))
+            message = await channel.send(
+                embeds=[discord.Embed.from_dict(entry.embed) for entry in batch],
+                files=[file for _, file in files]
+            )
+        except discord.HTTPException as e:
+            _close(files)
+            if e.status >= 500 or e.status == 429:
+                logger.warning("Audit log post failed, will retry: %s", e)
+                AUDIT_ENTRIES.labels("retried").inc(len(batch))
+                return False
+            logger.error("Audit log channel rejected %d entries, dropping them: %s", len(batch), e)
+            self._finish(batch, {}, "dropped")
+            return True
+        except OSError as e:
+            _close(files)
+            logger.warning("Audit log post failed, will retry: %s", e)
+            AUDIT_ENTRIES.labels("retried").inc(len(batch))
+            return False
+        _close(files)
+
+        urls = {entry.id: attachment.url for (entry, _), attachment in zip(files, message.attachments)}
+        self._finish(batch, urls, "posted")
+        AUDIT_MESSAGES.inc()
+        return True
+
+    def _next_batch(self):
+        batch, files, size = [], 0, 0
+        for entry in self._pending:
+            if len(batch) == MAX_EMBEDS:
+                break
+            entry_size = entry.size() if entry.file else 0
+            if entry.file and entry_size <= MAX_UPLOAD_BYTES:
+                if batch and (files == MAX_FILES or size + entry_size > MAX_UPLOAD_BYTES):
+                    break
+                files += 1
+                size += entry_size
+            batch.append(entry)
+        return batch
+
+    def _finish(self, batch, urls, outcome):
+        for _ in batch:
+            self._pending.popleft()
+        self._append([{'id': entry.id, 'done': 1} for entry in batch])
+        for entry in batch:
+            if entry.future is not None and not entry.future.done():
+                entry.future.set_result(urls.get(entry.id))
+        AUDIT_ENTRIES.labels(outcome).inc(len(batch))
+        AUDIT_QUEUE.set(len(self._pending))
+        if not self._pending:
+            # Nothing outstanding: start the file over instead of letting it grow
+            open(self.path, 'w').close()
+
+    def _append(self, records):
+        start = time.perf_counter()
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(record, separators=(',', ':')) + "\n" for record in records))
+        except OSError as e:
+            logger.error("Failed to persist audit log queue: %s", e)
+        metrics.STORE_SECONDS.labels('audit_queue', 'append').observe(time.perf_counter() - start)
+
+
+def _attachable(entry):
+    size = entry.size()
+    if not os.path.exists(entry.file):
+        logger.warning("Audit log attachment %s is gone, posting without it", entry.file)
+        return False
+    if size > MAX_UPLOAD_BYTES:
+        logger.warning("Audit log attachment %s is too large to upload (%d bytes)", entry.file, size)
+        return False
+    return True
+
+
+def _close(files):
+    for _, file in files:
+        file.close()
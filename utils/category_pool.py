@@ -0,0 +1,128 @@
+import asyncio
+import logging
+
+import discord
+
+from utils.config import config_service
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_CHANNEL_LIMIT = 50  # Discord's hard limit on channels per category
+
+
+class CategoryPool:
+    """Open or closed ticket categories, sharded past Discord's 50-channels-per-category limit.
+
+    The configured categories are always kept. When all of them are full an
+    overflow category is created next to them, and removed again once it empties.
+    Overflow ids are persisted in the ticket manager's state so they survive restarts.
+    Channel counts are cached and updated as tickets move, so picking a category
+    never walks the guild's channel list.
+    """
+
+    def __init__(self, kind, state, save_state, limit=CATEGORY_CHANNEL_LIMIT):
+        self.kind = kind  # 'open' or 'closed'
+        self.limit = limit
+        self._state = state
+        self._save_state = save_state
+        self._counts = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def configured_ids(self):
+        config = config_service.current
+        return config.ticket_categories if self.kind == 'open' else config.closed_categories
+
+    @property
+    def overflow_ids(self):
+        return self._state.setdefault('overflow_categories', {}).setdefault(self.kind, [])
+
+    @property
+    def category_ids(self):
+        return list(self.configured_ids) + [c for c in self.overflow_ids if c not in self.configured_ids]
+
+    def __contains__(self, category_id):
+        return category_id in self.configured_ids or category_id in self.overflow_ids
+
+    def refresh(self, guild, counts=None):
+        """Recount channels per category and forget overflow categories deleted by hand.
+
+        `counts` maps category id to channel count when the caller already walked the guild's channels.
+        """
+        missing = [c for c in self.overflow_ids if not isinstance(guild.get_channel(c), discord.CategoryChannel)]
+        for category_id in missing:
+            self.overflow_ids.remove(category_id)
+        if missing:
+            self._save_state(self._state)
+        self._counts = {}
+        for category in self._categories(guild):
+            self._counts[category.id] = counts.get(category.id, 0) if counts is not None else len(category.channels)
+
+    def counts(self):
+        return dict(self._counts)
+
+    async def acquire(self, guild):
+        """Reserve a slot in the least-full category, creating an overflow category if all are full"""
+        async with self._lock:
+            categories = self._categories(guild)
+            if not categories:
+                return None
+            for category in categories:
+                if category.id not in self._counts:
+                    self._counts[category.id] = len(category.channels)
+
+            category = min(categories, key=lambda c: self._counts[c.id])
+            if self._counts[category.id] >= self.limit:
+                category = await self._create_overflow(guild, categories)
+                if category is None:
+                    return None
+            self._counts[category.id] += 1
+            return category
+
+    async def release(self, guild, category_id):
+        """Give back a slot after a channel left a category; removes overflow categories that emptied"""
+        if category_id not in self._counts:
+            return
+        async with self._lock:
+            self._counts[category_id] = max(0, self._counts[category_id] - 1)
+            if self._counts[category_id] == 0 and category_id in self.overflow_ids and category_id not in self.configured_ids:
+                await self._remove_overflow(guild, category_id)
+
+    async def _create_overflow(self, guild, categories):
+        base = categories[0]
+        name = f"{base.name} {len(categories) + 1}"
+        try:
+            category = await guild.create_category(
+                name,
+                overwrites=base.overwrites,
+                position=max(c.position for c in categories) + 1
+            )
+        except discord.HTTPException as e:
+            logger.error("Failed to create overflow %s ticket category: %s", self.kind, e)
+            return None
+        self.overflow_ids.append(category.id)
+        self._counts[category.id] = 0
+        self._save_state(self._state)
+        logger.info("All %s ticket categories are full, created overflow category %s", self.kind, name, extra={'channel_id': category.id})
+        return category
+
+    async def _remove_overflow(self, guild, category_id):
+        self.overflow_ids.remove(category_id)
+        self._counts.pop(category_id, None)
+        self._save_state(self._state)
+        category = guild.get_channel(category_id)
+        if category is None:
+            return
+        try:
+            await category.delete(reason="Empty overflow ticket category")
+            logger.info("Removed empty overflow %s ticket category %s", self.kind, category.name, extra={'channel_id': category_id})
+        except discord.HTTPException as e:
+            logger.warning("Failed to remove overflow category %s: %s", category.name, e, extra={'channel_id': category_id})
+
+    def _categories(self, guild):
+        categories = []
+        for category_id in self.category_ids:
+            category = guild.get_channel(category_id)
+            if isinstance(category, discord.CategoryChannel):
+                categories.append(category)
+        return categories
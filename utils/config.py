@@ -0,0 +1,263 @@
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+
+import discord
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = 'data/config.json'
+POLL_INTERVAL = 2.0  # Seconds between mtime checks of the config file
+
+# Keys older config files carry that are no longer configuration
+_LEGACY_KEYS = {'ticket_counter'}
+# Single-category keys that became category lists
+_SINGULAR_KEYS = {'ticket_category': 'ticket_categories', 'closed_category': 'closed_categories'}
+
+CONFIG_LOADS = metrics.Counter(
+    "ucrp_config_loads", "Config file loads by outcome", ("outcome",)
+)
+
+
+def _channel(default, required=False):
+    return field(default=default, metadata={'kind': 'channel', 'required': required})
+
+
+def _category(default, required=False):
+    return field(default=default, metadata={'kind': 'category', 'required': required})
+
+
+def _role(default, required=False):
+    return field(default=default, metadata={'kind': 'role', 'required': required})
+
+
+@dataclass(frozen=True)
+class BotConfig:
+    """Immutable snapshot of data/config.json. Defaults are the live UCRP server's IDs"""
+
+    guild_id: int = 1169251155721846855
+
+    # Ticket system
+    # Open and closed tickets are spread over these categories (plus automatic overflow ones)
+    ticket_categories: tuple = _category((1356589620141490218,), required=True)
+    closed_categories: tuple = _category((1356590186552758495,), required=True)
+    staff_role_id: int = _role(1346488365608079452, required=True)
+    log_channel_id: int = _channel(1395449524570423387)
+    ticket_channel_prefix: str = "ticket-"
+    archive_after_hours: int = 72   # Closed tickets older than this lose their channel (0 disables archival)
+    archive_batch_size: int = 10    # Channels deleted per archival sweep
+    ticket_store_format: str = "json"  # "json", or "binary" for a pickled snapshot that loads faster
+    dm_transcript_to_added_users: bool = False  # Deleted tickets DM their transcript to added users too, not just the owner
+    compress_transcripts: bool = True  # Gzip the structured transcripts; HTML is rendered from them when needed
+    warm_pool_size: int = 0  # Most hidden channels kept pre-created for new tickets, sized to demand (0 disables)
+    ticket_attempts_per_user: int = 3  # Panel clicks a user can make in a row (0 disables the per-user limit)
+    ticket_user_cooldown_seconds: int = 120  # ...after which they get one more every this many seconds
+    ticket_guild_per_minute: int = 30  # Tickets created guild-wide per minute before requests queue (0 disables)
+    ticket_queue_size: int = 100  # Requests that can wait for guild capacity before more are turned away
+    # Assign tickets only to staff shown online. Needs the privileged Presence Intent enabled in the
+    # developer portal and a restart; when off, everyone with the staff role takes tickets
+    staff_presence: bool = False
+
+    # Media-only channels (text messages from anyone without the bypass role are removed)
+    media_channel_ids: tuple = field(default=(1346488677441732700, 1346488679035834460), metadata={'kind': 'channel'})
+    media_bypass_role_id: int = _role(1346488355486961694)
+
+    # Roles and channels used by the other cogs
+    proof_channel_id: int = _channel(1393423615432720545)
+    allowed_role_id: int = _role(1346488365608079452)
+    say_role_id: int = _role(1346488355486961694)
+    admin_log_role_id: int = _role(1346488363053482037)
+    whitelisted_role_id: int = _role(1346488379734491196)
+    whitelist_log_channel_id: int = _channel(1346488637537386617)
+    ban_log_channel_id: int = _channel(1346488664917671946)
+    jail_log_channel_id: int = _channel(1382895763717226516)
+    fc_log_channel_id: int = _channel(1377862821924044860)
+    mention_role_id: int = _role(1346488379734491196)
+    interview_accepted_role_id: int = _role(1347946934308176013)
+    review_channel_id: int = _channel(1379753912155770941)
+    reviewer_role_id: int = _role(1346488365608079452)
+    rejected_log_channel_id: int = _channel(1379763922994991195)
+    accepted_log_channel_id: int = _channel(1359919316530630918)
+    accepted_role_id: int = _role(1347946934308176013)
+    pending_role_id: int = _role(1346488381500166194)
+    review_video_channel_id: int = _channel(1346488640523472958)
+    thumbnail_url: str = "https://cdn.discordapp.com/attachments/1372059707694645360/1396061147333005343/image.png?ex=6881fcc3&is=6880ab43&hm=ae6f0295e136bc7e1a0619674cb9e8844e87fdee8ebc6a2b688ab4206234168e&"
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a snapshot from parsed JSON, raising ValueError on bad values"""
+        if not isinstance(data, dict):
+            raise ValueError("config must be a JSON object")
+        data = dict(data)
+        for old, new in _SINGULAR_KEYS.items():
+            if old in data:
+                value = data.pop(old)
+                data.setdefault(new, [value])
+        known = {f.name: f for f in dataclasses.fields(cls)}
+        unknown = set(data) - set(known) - _LEGACY_KEYS
+        if unknown:
+            logger.warning("Ignoring unknown config keys: %s", ", ".join(sorted(unknown)))
+
+        values = {}
+        for name, value in data.items():
+            f = known.get(name)
+            if f is None:
+                continue
+            try:
+                if f.type is tuple:
+                    if not isinstance(value, (list, tuple)):
+                        raise TypeError
+                    values[name] = tuple(int(v) for v in value)
+                    if f.metadata.get('required') and not values[name]:
+                        raise ValueError
+                elif f.type is bool:
+                    if not isinstance(value, bool):
+                        raise TypeError
+                    values[name] = value
+                elif f.type is int:
+                    if isinstance(value, bool):
+                        raise TypeError
+                    values[name] = int(value)
+                else:
+                    values[name] = str(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name}: expected {f.type.__name__}, got {value!r}") from None
+        return cls(**values)
+
+    def to_dict(self):
+        data = dataclasses.asdict(self)
+        for name, value in data.items():
+            if isinstance(value, tuple):
+                data[name] = list(value)
+        return data
+
+    def problems(self, guild):
+        """List IDs that don't resolve in the guild, as (required, message) pairs"""
+        found = []
+        for f in dataclasses.fields(self):
+            kind = f.metadata.get('kind')
+            if kind is None:
+                continue
+            value = getattr(self, f.name)
+            for object_id in (value if isinstance(value, tuple) else (value,)):
+                if kind == 'role':
+                    target = guild.get_role(object_id)
+                    ok = target is not None
+                else:
+                    target = guild.get_channel(object_id)
+                    ok = target is not None and isinstance(target, discord.CategoryChannel) == (kind == 'category')
+                if not ok:
+                    found.append((f.metadata.get('required', False), f"{f.name}: no {kind} {object_id} in {guild.name}"))
+        return found
+
+
+def _log_problems(problems):
+    """Log validation problems. Returns False if any of them is about a required ID"""
+    for required, message in problems:
+        logger.log(logging.ERROR if required else logging.WARNING, "Config: %s", message)
+    return not any(required for required, _ in problems)
+
+
+class ConfigService:
+    """Loads the config once and hot-reloads it when the file changes.
+
+    Readers take `config_service.current` and get a frozen snapshot; a reload
+    builds a complete new snapshot and swaps the reference, so a handler never
+    sees half of an old config and half of a new one.
+    """
+
+    def __init__(self, path=CONFIG_PATH, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._snapshot = None
+        self._mtime = None
+        self._bot = None
+        self._task = None
+
+    @property
+    def current(self):
+        if self._snapshot is None:
+            self.load()
+        return self._snapshot
+
+    def load(self):
+        """(Re)read the config file. A missing or invalid file keeps the previous snapshot"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, 'r') as f:
+                snapshot = BotConfig.from_dict(json.load(f))
+        except FileNotFoundError:
+            logger.warning("%s not found, using built-in defaults", self.path)
+            mtime, snapshot = None, BotConfig()
+        except (OSError, ValueError) as e:
+            # JSONDecodeError is a ValueError too
+            logger.error("Invalid config in %s: %s", self.path, e)
+            CONFIG_LOADS.labels('invalid').inc()
+            if self._snapshot is None:
+                self._snapshot = BotConfig()
+            return False
+
+        self._mtime = mtime
+        guild = self._guild(snapshot)
+        if guild is not None:
+            if not _log_problems(snapshot.problems(guild)) and self._snapshot is not None:
+                logger.error("Rejected config reload, keeping the previous config")
+                CONFIG_LOADS.labels('rejected').inc()
+                return False
+
+        self._snapshot = snapshot
+        CONFIG_LOADS.labels('loaded').inc()
+        return True
+
+    def write_defaults(self):
+        """Create the config file from the built-in defaults if it doesn't exist"""
+        if os.path.exists(self.path):
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(BotConfig().to_dict(), f, indent=2)
+
+    def validate(self, guild):
+        """Log every configured ID that doesn't resolve in the guild. Returns True if all required IDs do"""
+        return _log_problems(self.current.problems(guild))
+
+    def watch(self, bot):
+        """Start polling the config file for changes (safe to call again after reconnects)"""
+        self._bot = bot
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._poll(), name="config-watch")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _guild(self, snapshot):
+        if self._bot is None:
+            return None
+        return self._bot.get_guild(snapshot.guild_id)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                continue
+            if mtime == self._mtime:
+                continue
+            start = time.perf_counter()
+            if self.load():
+                logger.info("Reloaded %s in %.1f ms", self.path, (time.perf_counter() - start) * 1000)
+            else:
+                # Don't retry a broken file until it changes again
+                self._mtime = mtime
+
+
+config_service = ConfigService()
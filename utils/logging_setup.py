@@ -0,0 +1,58 @@
+import atexit
+import json
+import os
+import queue
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Attributes every LogRecord has; anything else came from `extra=` and is structured context
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the `extra=` fields (ticket, channel_id, actor, ...) at the top level"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class _ThreadQueueHandler(QueueHandler):
+    """Hands the raw record to the listener thread. The stock handler formats it on the caller's thread"""
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=logging.INFO, log_path='data/logs/bot.log', max_bytes=10 * 1024 * 1024, backup_count=5):
+    """Route all logging through a queue drained by a listener thread"""
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+    file_handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-8s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_ThreadQueueHandler(log_queue))
+    root.setLevel(level)
+    return listener
@@ -0,0 +1,340 @@
+import re
+import threading
+import time
+import logging
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Metrics are only ever updated from the event loop thread and read by the
+# exporter thread, so plain attribute updates are enough - no locks on the hot path.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return "{" + inner + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        REGISTRY.register(self)
+
+    def labels(self, *values, **kwargs):
+        """Return the child for a set of label values"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        lines.extend(self._samples())
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._children[()].value += amount
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._children[()].value = value
+
+    def reset(self):
+        """Drop all labelled children"""
+        if self.labelnames:
+            self._children = {}
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ('upper_bounds', 'counts', 'sum')
+
+    def __init__(self, upper_bounds):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return _Timer(self._children[()])
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            counts = list(child.counts)
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, ("le", _format_value(float(bound))))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self._metrics):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# === Ticket lifecycle ===
+TICKET_OPERATIONS = Counter(
+    "ucrp_ticket_operations", "Ticket lifecycle operations by outcome", ("operation", "outcome")
+)
+TICKET_OPERATION_SECONDS = Histogram(
+    "ucrp_ticket_operation_seconds", "Ticket lifecycle operation latency", ("operation",)
+)
+OPEN_TICKETS = Gauge(
+    "ucrp_open_tickets", "Currently open tickets per category", ("category",)
+)
+
+# === Transcripts ===
+TRANSCRIPT_MESSAGES = Histogram(
+    "ucrp_transcript_messages", "Messages per generated transcript",
+    buckets=(10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+)
+TRANSCRIPT_BYTES = Histogram(
+    "ucrp_transcript_bytes", "Size of generated transcripts",
+    buckets=(4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+TRANSCRIPT_RENDER_SECONDS = Histogram(
+    "ucrp_transcript_render_seconds", "Time spent rendering transcript HTML"
+)
+
+# === Storage ===
+STORE_SECONDS = Histogram(
+    "ucrp_store_seconds", "JSON load/save duration", ("file", "operation"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+# === Discord HTTP API ===
+DISCORD_REQUESTS = Counter(
+    "ucrp_discord_requests", "Discord HTTP requests by route and status", ("method", "route", "status")
+)
+DISCORD_REQUEST_SECONDS = Histogram(
+    "ucrp_discord_request_seconds", "Discord HTTP request latency", ("method", "route")
+)
+DISCORD_RATE_LIMITS = Counter(
+    "ucrp_discord_rate_limits", "Discord HTTP 429 responses by route", ("method", "route")
+)
+
+
+def track_operation(operation):
+    """Count and time a TicketManager coroutine. The first item of the returned tuple decides the outcome"""
+    def decorator(func):
+        counter_ok = TICKET_OPERATIONS.labels(operation, "success")
+        counter_failed = TICKET_OPERATIONS.labels(operation, "failure")
+        latency = TICKET_OPERATION_SECONDS.labels(operation)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = await func(*args, **kwargs)
+            latency.observe(time.perf_counter() - start)
+            if result and result[0]:
+                counter_ok.inc()
+            else:
+                counter_failed.inc()
+            return result
+        return wrapper
+    return decorator
+
+
+# === Discord HTTP tracing ===
+_SNOWFLAKE = re.compile(r'/\d{15,21}')
+_TOKENS = re.compile(r'/(interactions|webhooks)/(\d+|:id)/[^/]+')
+
+
+def normalize_route(path):
+    """Collapse ids and interaction/webhook tokens so routes have low cardinality"""
+    path = path.split('/api/v', 1)[-1]
+    path = path.split('/', 1)[-1] if path[:1].isdigit() else path
+    path = _SNOWFLAKE.sub('/:id', '/' + path.lstrip('/'))
+    return _TOKENS.sub(r'/\1/:id/:token', path)
+
+
+async def _on_request_start(session, context, params):
+    context.start = time.perf_counter()
+
+
+async def _on_request_end(session, context, params):
+    method = params.method
+    route = normalize_route(params.url.path)
+    status = params.response.status
+    DISCORD_REQUESTS.labels(method, route, status).inc()
+    DISCORD_REQUEST_SECONDS.labels(method, route).observe(time.perf_counter() - context.start)
+    if status == 429:
+        DISCORD_RATE_LIMITS.labels(method, route).inc()
+
+
+async def _on_request_exception(session, context, params):
+    route = normalize_route(params.url.path)
+    DISCORD_REQUESTS.labels(params.method, route, "error").inc()
+
+
+def create_http_trace():
+    """Build an aiohttp TraceConfig that records every Discord HTTP call"""
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(_on_request_start)
+    trace.on_request_end.append(_on_request_end)
+    trace.on_request_exception.append(_on_request_exception)
+    return trace
+
+
+# === Exporter ===
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host='127.0.0.1'):
+    """Serve /metrics from a daemon thread so scrapes never touch the event loop"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True)
+    thread.start()
+    logger.info("Metrics exporter listening on http://%s:%s/metrics", host, port)
+    return server
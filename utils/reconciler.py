@@ -0,0 +1,142 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+
+import discord
+
+from utils.config import config_service
+from utils.ticket_model import Ticket
+
+logger = logging.getLogger(__name__)
+
+ADOPT_GRACE = timedelta(seconds=60)  # Younger channels may still be mid-creation
+_TOPIC_NUMBER = re.compile(r'Ticket #(\d+)')
+
+
+@dataclass
+class ReconcileReport:
+    """What a reconciliation pass changed"""
+
+    channels: int = 0
+    tickets: int = 0
+    stale: list = field(default_factory=list)        # records whose channel is gone, now archived
+    moved: list = field(default_factory=list)        # records whose status/category followed the channel
+    adopted: list = field(default_factory=list)      # ticket channels that had no record
+
+    @property
+    def changed(self):
+        return bool(self.stale or self.moved or self.adopted)
+
+    def summary(self):
+        return (f"{len(self.stale)} stale, {len(self.moved)} moved, {len(self.adopted)} adopted "
+                f"({self.channels} channels, {self.tickets} tickets)")
+
+
+class TicketReconciler:
+    """Repairs drift between the hot ticket set and the guild's ticket channels.
+
+    One pass over the cached guild channels and one over the hot set, with no API
+    calls: records whose channel is gone are archived, records follow their
+    channel between the open and closed categories, and ticket channels without
+    a record are adopted. The pass is synchronous so no handler runs in between.
+    """
+
+    def __init__(self, ticket_manager):
+        self.ticket_manager = ticket_manager
+
+    def reconcile(self, guild: discord.Guild, now: datetime = None):
+        manager = self.ticket_manager
+        config = config_service.current
+        now = now or datetime.now(timezone.utc)
+        report = ReconcileReport()
+        # A guild whose channel cache isn't filled would make every record look stale
+        if getattr(guild, 'unavailable', False) or not any(
+            isinstance(guild.get_channel(category_id), discord.CategoryChannel) for category_id in manager.open_pool.category_ids
+        ):
+            logger.warning("Skipping ticket reconciliation, no ticket category is visible in %s", guild.name)
+            return report
+        tickets = manager.store.hot
+        report.tickets = len(tickets)
+
+        # Pass 1: index live ticket channels and count channels per category
+        live = {}
+        counts = {}
+        for channel in guild.channels:
+            report.channels += 1
+            category_id = getattr(channel, 'category_id', None)
+            if category_id is None:
+                continue
+            counts[category_id] = counts.get(category_id, 0) + 1
+            if category_id in manager.open_pool or category_id in manager.closed_pool:
+                live[channel.id] = channel
+
+        # Pass 2: walk the store against the live channels
+        for ticket in tickets.values():
+            channel = live.pop(ticket.channel_id, None)
+            if channel is None:
+                if ticket.status != 'archived' and guild.get_channel(ticket.channel_id) is None:
+                    ticket.status = 'archived'
+                    ticket.archived_at = datetime.now()
+                    ticket.category_id = None
+                    ticket.reconciled = 'channel_missing'
+                    report.stale.append(ticket.ticket_number)
+                continue
+            actual = 'open' if channel.category_id in manager.open_pool else 'closed'
+            if ticket.status != actual or ticket.category_id != channel.category_id:
+                ticket.status = actual
+                ticket.category_id = channel.category_id
+                manager.store.update(ticket)
+                report.moved.append(ticket.ticket_number)
+
+        # Whatever is left in a ticket category without a record is an orphan (warm pool channels aren't tickets)
+        prefixes = (config.ticket_channel_prefix, f"closed-{config.ticket_channel_prefix}")
+        for channel in live.values():
+            if not channel.name.startswith(prefixes) or now - channel.created_at < ADOPT_GRACE:
+                continue
+            ticket = self._adopt(guild, channel, config)
+            manager.store.add(ticket)
+            manager.state['ticket_counter'] = max(manager.state['ticket_counter'], ticket.ticket_number)
+            report.adopted.append(ticket.ticket_number)
+
+        manager.open_pool.refresh(guild, counts)
+        manager.closed_pool.refresh(guild, counts)
+        if report.changed:
+            manager.store.save()
+            manager.store.demote()
+            manager.save_state(manager.state)
+            manager._seed_open_ticket_gauge(tickets)
+        return report
+
+    def _adopt(self, guild, channel, config):
+        """Build a record for an orphan ticket channel from its topic and permission overwrites"""
+        manager = self.ticket_manager
+        match = _TOPIC_NUMBER.search(getattr(channel, 'topic', None) or '')
+        if match:
+            ticket_number = int(match.group(1))
+        else:
+            manager.state['ticket_counter'] += 1
+            ticket_number = manager.state['ticket_counter']
+
+        # Members with their own overwrite, other than the bot and staff: the first is taken as the owner
+        staff_role_id = config.staff_role_id
+        members = [
+            target for target in channel.overwrites
+            if guild.get_role(target.id) is None and target.id != guild.me.id
+            and not any(role.id == staff_role_id for role in getattr(target, 'roles', []))
+        ]
+        owner = members[0] if members else None
+        status = 'open' if channel.category_id in manager.open_pool else 'closed'
+        return Ticket(
+            ticket_number=ticket_number,
+            channel_id=channel.id,
+            user_id=owner.id if owner else None,
+            user_name=str(owner) if owner else None,
+            status=status,
+            created_at=channel.created_at.astimezone().replace(tzinfo=None),
+            reason="Adopted by reconciliation, no record was found",
+            added_users=[member.id for member in members[1:]],
+            category_id=channel.category_id,
+            closed_at=datetime.now() if status == 'closed' else None,
+            reconciled='adopted'
+        )
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+COALESCED_OPERATIONS = metrics.Counter(
+    "ucrp_ticket_operations_coalesced", "Ticket operations that joined or were refused by one already running", ("operation", "outcome")
+)
+
+
+class TicketBusy(Exception):
+    """Raised when a different operation is already running on the ticket"""
+
+    def __init__(self, running):
+        super().__init__(f"ticket is busy with {running}")
+        self.running = running
+
+
+class SingleFlight:
+    """Runs at most one operation per ticket at a time.
+
+    A caller asking for the operation that is already running on the ticket
+    waits for it and gets the same result; a caller asking for a different one
+    gets TicketBusy immediately. Only the ticket's own entry is ever consulted,
+    so nothing is held across tickets. The operation runs as its own task, so a
+    caller that goes away doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._flights = {}  # key -> (operation, task)
+
+    def running(self, key):
+        """The operation currently running on a ticket, or None"""
+        flight = self._flights.get(key)
+        return flight[0] if flight else None
+
+    async def do(self, key, operation, factory):
+        """Run `factory()` as `operation` on `key`, or join the identical operation already running"""
+        flight = self._flights.get(key)
+        if flight is not None:
+            running, task = flight
+            if running != operation:
+                COALESCED_OPERATIONS.labels(operation, "refused").inc()
+                raise TicketBusy(running)
+            COALESCED_OPERATIONS.labels(operation, "shared").inc()
+            logger.debug("Joined %s already running on %s", operation, key)
+        else:
+            task = asyncio.ensure_future(factory())
+            self._flights[key] = (operation, task)
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        flight = self._flights.get(key)
+        if flight is not None and flight[1] is task:
+            del self._flights[key]
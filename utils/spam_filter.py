@@ -0,0 +1,182 @@
+import time
+from array import array
+from collections import OrderedDict, deque
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Verdicts returned by SpamFilter.check
+USER_FLOOD = "user_flood"
+CHANNEL_FLOOD = "channel_flood"
+DUPLICATE_SPAM = "duplicate_spam"
+
+
+class CountMinSketch:
+    """Fixed-size approximate counter for hashed keys"""
+
+    def __init__(self, width=65536, depth=4):
+        # Width must be a power of two so the index is a cheap mask
+        self.width = 1 << (width - 1).bit_length()
+        self.depth = depth
+        self._mask = self.width - 1
+        self._seeds = [0x9E3779B1 * (i + 1) for i in range(depth)]
+        self._rows = [array('I', bytes(4 * self.width)) for _ in range(depth)]
+
+    def _indexes(self, key_hash):
+        mask = self._mask
+        return [((key_hash ^ seed) * 0x85EBCA6B >> 7) & mask for seed in self._seeds]
+
+    def add(self, key_hash):
+        """Increment a key and return its new estimated count"""
+        estimate = None
+        for row, index in zip(self._rows, self._indexes(key_hash)):
+            value = row[index] + 1
+            row[index] = value
+            if estimate is None or value < estimate:
+                estimate = value
+        return estimate
+
+    def estimate(self, key_hash):
+        """Return the estimated count for a key"""
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key_hash)))
+
+    def clear(self):
+        """Reset all counters"""
+        self._rows = [array('I', bytes(4 * self.width)) for _ in range(self.depth)]
+
+
+class _UserState:
+    __slots__ = ('timestamps', 'last_seen', 'flagged_until')
+
+    def __init__(self, size):
+        self.timestamps = deque(maxlen=size)
+        self.last_seen = 0.0
+        self.flagged_until = 0.0
+
+
+class SpamFilter:
+    """Sliding-window flood and duplicate-content detection with bounded memory"""
+
+    def __init__(
+        self,
+        user_burst=6,
+        user_window=5.0,
+        channel_burst=25,
+        channel_window=5.0,
+        duplicate_threshold=5,
+        duplicate_window=30.0,
+        duplicate_min_length=16,
+        idle_ttl=300.0,
+        max_users=20000,
+        max_channels=2000,
+        flag_cooldown=60.0
+    ):
+        self.user_burst = user_burst
+        self.user_window = user_window
+        self.channel_burst = channel_burst
+        self.channel_window = channel_window
+        self.duplicate_threshold = duplicate_threshold
+        self.duplicate_window = duplicate_window
+        self.duplicate_min_length = duplicate_min_length
+        self.idle_ttl = idle_ttl
+        self.max_users = max_users
+        self.max_channels = max_channels
+        self.flag_cooldown = flag_cooldown
+
+        # Least recently active entries sit at the front so eviction is O(1)
+        self._users = OrderedDict()
+        self._channels = OrderedDict()
+
+        # Two rotating sketches give a sliding window of one to two periods
+        self._current = CountMinSketch()
+        self._previous = CountMinSketch()
+        self._rotated_at = None
+
+    def check(self, user_id, channel_id, content, now=None):
+        """Record a message and return a verdict, or None if the message looks fine"""
+        if now is None:
+            now = time.monotonic()
+
+        self._evict_idle(now)
+        verdict = None
+
+        # Per-user rate
+        user = self._users.get(user_id)
+        if user is None:
+            user = _UserState(self.user_burst)
+            self._users[user_id] = user
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        user.last_seen = now
+        stamps = user.timestamps
+        stamps.append(now)
+        if len(stamps) == stamps.maxlen and now - stamps[0] <= self.user_window:
+            verdict = USER_FLOOD
+
+        # Per-channel rate
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = deque(maxlen=self.channel_burst)
+            self._channels[channel_id] = channel
+            if len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        else:
+            self._channels.move_to_end(channel_id)
+        channel.append(now)
+        if verdict is None and len(channel) == channel.maxlen and now - channel[0] <= self.channel_window:
+            # Start a fresh window so a flood is reported once, not per message
+            channel.clear()
+            verdict = CHANNEL_FLOOD
+
+        # Duplicate content from the same user, across channels. Keyed per user so
+        # members who happen to repeat a common phrase aren't caught by each other
+        if content and len(content) >= self.duplicate_min_length:
+            self._rotate_sketches(now)
+            key_hash = hash((user_id, ' '.join(content.lower().split()))) & 0xFFFFFFFF
+            count = self._current.add(key_hash) + self._previous.estimate(key_hash)
+            if verdict is None and count >= self.duplicate_threshold:
+                verdict = DUPLICATE_SPAM
+
+        # Only report a user once per cooldown so callers don't re-punish
+        if verdict is not None and verdict != CHANNEL_FLOOD:
+            if now < user.flagged_until:
+                return None
+            user.flagged_until = now + self.flag_cooldown
+
+        return verdict
+
+    def forget(self, user_id):
+        """Drop all state for a user"""
+        self._users.pop(user_id, None)
+
+    def stats(self):
+        """Return the current amount of tracked state"""
+        return {
+            'users': len(self._users),
+            'channels': len(self._channels)
+        }
+
+    def _rotate_sketches(self, now):
+        if self._rotated_at is None:
+            self._rotated_at = now
+        elif now - self._rotated_at >= self.duplicate_window:
+            self._previous, self._current = self._current, self._previous
+            self._current.clear()
+            self._rotated_at = now
+
+    def _evict_idle(self, now):
+        cutoff = now - self.idle_ttl
+        users = self._users
+        while users:
+            state = next(iter(users.values()))
+            if state.last_seen > cutoff:
+                break
+            users.popitem(last=False)
+        channels = self._channels
+        while channels:
+            stamps = next(iter(channels.values()))
+            if stamps and stamps[-1] > cutoff:
+                break
+            channels.popitem(last=False)
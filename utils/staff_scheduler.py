@@ -0,0 +1,134 @@
+import heapq
+import itertools
+import logging
+import time
+
+import discord
+
+from utils import metrics
+from utils.config import config_service
+
+logger = logging.getLogger(__name__)
+
+STAFF_LOAD = metrics.Gauge(
+    "ucrp_staff_open_tickets", "Open tickets assigned to available staff, summed"
+)
+STAFF_AVAILABLE = metrics.Gauge(
+    "ucrp_staff_available", "Staff members online and taking tickets"
+)
+ASSIGNMENTS = metrics.Counter(
+    "ucrp_ticket_assignments", "Tickets assigned to staff by reason", ("reason",)
+)
+
+
+def is_available(member):
+    """Staff take tickets unless they show as offline (invisible counts as offline).
+
+    Without `staff_presence` the bot gets no presences and every member reads
+    as offline, so availability is left to the staff role alone.
+    """
+    if not config_service.current.staff_presence:
+        return True
+    return getattr(member, 'status', discord.Status.online) is not discord.Status.offline
+
+
+class StaffScheduler:
+    """Assigns new tickets to the least-loaded available staff member.
+
+    Available staff sit in a min-heap keyed by (open tickets, last assignment
+    time), so ties go to whoever has waited longest for a ticket. Changing a
+    staffer's load pushes a fresh entry and marks the old one dead instead of
+    searching the heap for it; dead entries are skipped when they surface and
+    the heap is rebuilt once they outnumber the live ones. Assigning, releasing
+    and going on or offline are all O(log staff).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}       # member id -> live heap entry [load, last_assigned, seq, member id, alive]
+        self._seq = itertools.count()
+        self._total = 0          # Sum of the live entries' loads, for the gauge
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, member_id):
+        return member_id in self._entries
+
+    def load(self, member_id):
+        entry = self._entries.get(member_id)
+        return entry[0] if entry else 0
+
+    def loads(self):
+        return {member_id: entry[0] for member_id, entry in self._entries.items()}
+
+    def rebuild(self, staff, tickets):
+        """Start over from the available `staff` members and the open tickets assigned to them"""
+        loads = {member.id: 0 for member in staff if is_available(member)}
+        for ticket in tickets:
+            if ticket.status == 'open' and ticket.assigned_to in loads:
+                loads[ticket.assigned_to] += 1
+        previous = {member_id: entry[1] for member_id, entry in self._entries.items()}
+        self._heap = []
+        self._entries = {}
+        self._total = 0
+        for member_id, load in loads.items():
+            self._push(member_id, load, previous.get(member_id, 0.0))
+        self._update_gauges()
+
+    def add(self, member_id, load=0):
+        """A staff member became available, with `load` open tickets already assigned"""
+        if member_id not in self._entries:
+            self._push(member_id, load, 0.0)
+            self._update_gauges()
+
+    def remove(self, member_id):
+        """A staff member went offline or lost the staff role"""
+        entry = self._entries.pop(member_id, None)
+        if entry is not None:
+            entry[4] = False
+            self._total -= entry[0]
+            self._compact()
+            self._update_gauges()
+
+    def assign(self, reason='new'):
+        """Give one ticket to the least-loaded available staff member; returns their id, or None if nobody is available"""
+        while self._heap:
+            entry = self._heap[0]
+            if entry[4]:
+                break
+            heapq.heappop(self._heap)
+        else:
+            return None
+        load, _, _, member_id, _ = entry
+        entry[4] = False
+        self._push(member_id, load + 1, time.time())
+        ASSIGNMENTS.labels(reason).inc()
+        self._update_gauges()
+        return member_id
+
+    def release(self, member_id):
+        """One of the staff member's tickets stopped being open"""
+        entry = self._entries.get(member_id)
+        if entry is None or entry[0] == 0:
+            return
+        entry[4] = False
+        self._push(member_id, entry[0] - 1, entry[1])
+        self._update_gauges()
+
+    def _push(self, member_id, load, last_assigned):
+        entry = [load, last_assigned, next(self._seq), member_id, True]
+        previous = self._entries.get(member_id)
+        self._total += load - (previous[0] if previous else 0)
+        self._entries[member_id] = entry
+        heapq.heappush(self._heap, entry)
+        self._compact()
+
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [entry for entry in self._heap if entry[4]]
+            heapq.heapify(self._heap)
+
+    def _update_gauges(self):
+        STAFF_AVAILABLE.set(len(self._entries))
+        STAFF_LOAD.set(self._total)
@@ -0,0 +1,327 @@
+"""Streaming export of ticket records and transcript messages as NDJSON or CSV.
+
+    python -m utils.ticket_export --kind messages --format csv --since 2026-01-01 -o messages.csv
+
+Everything is a chain of generators: archive lines and hot tickets are read one
+at a time, each ticket becomes a row (or its transcript is read a line at a
+time into one row per message; transcripts saved as HTML by older versions are
+parsed in chunks), and rows are written as they come. Nothing is collected,
+so memory stays flat however large the export is; the only per-ticket state is
+the store's archive offset index.
+
+Tickets are exported archive first, in file order, then the hot set by ticket
+number. Every row carries a cursor (see `iter_tickets`); passing the cursor of
+the last completely exported ticket to `--cursor` carries on after it.
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import html
+import io
+import json
+import logging
+import os
+import re
+import sys
+from datetime import datetime
+
+from utils.ticket_store import COLD_PATH, HOT_PATH, SNAPSHOT_PATH, TicketStore
+from utils.transcript_generator import read_transcript
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('tickets', 'messages')
+FORMATS = ('ndjson', 'csv')
+CHUNK_SIZE = 64 * 1024      # Characters of a legacy HTML transcript read at a time
+YIELD_EVERY = 200           # Rows written between yields to the event loop in `export_to_file`
+
+TICKET_COLUMNS = (
+    'ticket_number', 'channel_id', 'status', 'user_id', 'assigned_to', 'created_at', 'closed_at',
+    'closed_by', 'reopened_at', 'archived_at', 'added_user_count', 'transcript_file', 'cursor',
+)
+MESSAGE_COLUMNS = (
+    'ticket_number', 'message_index', 'author_id', 'author_name', 'timestamp',
+    'content_length', 'attachments', 'embeds', 'cursor',
+)
+COLUMNS = {'tickets': TICKET_COLUMNS, 'messages': MESSAGE_COLUMNS}
+
+# HTML transcripts written before author ids were recorded only show this timestamp format
+_LEGACY_TIMESTAMP = "%m/%d/%Y %I:%M %p"
+
+_MESSAGE_START = re.compile(r'<div class="message"[ >]')
+_AUTHOR_ID = re.compile(r'^[^>]*data-author-id="(\d+)"')
+_TIMESTAMP = re.compile(r'^[^>]*data-timestamp="([^"]*)"')
+_USERNAME = re.compile(r'<span class="username">(.*?)</span>', re.S)
+_LEGACY_TIME = re.compile(r'<span class="timestamp">(.*?)</span>', re.S)
+_CONTENT = re.compile(r'<div class="message-text">(.*?)</div>', re.S)
+
+
+# --- Cursors ---
+def _parse_cursor(cursor):
+    """Return (archive offset, ticket number or None) for a cursor string.
+
+    "a:<offset>" is a position in the archive; "h:<offset>:<number>" is past the
+    archive (which ended at <offset> then) and past hot ticket <number>.
+    """
+    if not cursor:
+        return 0, None
+    try:
+        parts = cursor.split(':')
+        if parts[0] == 'a' and len(parts) == 2:
+            return int(parts[1]), None
+        if parts[0] == 'h' and len(parts) == 3:
+            return int(parts[1]), int(parts[2])
+    except ValueError:
+        pass
+    raise ValueError(f"invalid export cursor {cursor!r}")
+
+
+def iter_tickets(store, since=None, until=None, cursor=None):
+    """Yield (cursor, ticket) for every ticket created in [since, until), resuming after `cursor`.
+
+    The cursor yielded with a ticket resumes right after it. Tickets archived
+    after a hot-phase cursor was issued are picked up from the archive's tail
+    on resume, so nothing is skipped or exported twice.
+    """
+    offset, after = _parse_cursor(cursor)
+
+    def wanted(ticket):
+        return (since is None or ticket.created_at >= since) and (until is None or ticket.created_at < until)
+
+    tail = []
+    if after is None:
+        for offset, ticket in store.scan_archive(offset):
+            if ticket is not None and wanted(ticket):
+                yield f"a:{offset}", ticket
+    else:
+        # Only what was archived since the cursor was issued, so this stays small
+        tail = [t for _, t in store.scan_archive(offset) if t is not None and t.ticket_number > after]
+
+    # The hot set is bounded by the guild's channels; sort its numbers, not copies of its tickets
+    entries = sorted(
+        [(t.ticket_number, t.key, t) for t in tail]
+        + [(t.ticket_number, t.key, None) for t in list(store.hot.values()) if after is None or t.ticket_number > after]
+    )
+    for number, key, ticket in entries:
+        # A hot ticket archived while the export runs is read from the archive instead
+        ticket = ticket or store.hot.get(key) or store.get(key)
+        if ticket is not None and wanted(ticket):
+            yield f"h:{offset}:{number}", ticket
+
+
+# --- Rows ---
+def ticket_rows(tickets):
+    for cursor, t in tickets:
+        yield {
+            'ticket_number': t.ticket_number,
+            'channel_id': t.channel_id,
+            'status': t.status,
+            'user_id': t.user_id,
+            'assigned_to': t.assigned_to,
+            'created_at': _iso(t.created_at),
+            'closed_at': _iso(t.closed_at),
+            'closed_by': t.closed_by,
+            'reopened_at': _iso(t.reopened_at),
+            'archived_at': _iso(t.archived_at),
+            'added_user_count': len(t.added_users),
+            'transcript_file': t.transcript_file,
+            'cursor': cursor,
+        }
+
+
+def message_rows(tickets):
+    for cursor, t in tickets:
+        if not t.transcript_file or not os.path.exists(t.transcript_file):
+            continue
+        if t.transcript_file.endswith('.html'):
+            messages = iter_html_transcript(t.transcript_file)
+        else:
+            messages = iter_structured_transcript(t.transcript_file)
+        for index, message in enumerate(messages):
+            message['ticket_number'] = t.ticket_number
+            message['message_index'] = index
+            message['cursor'] = cursor
+            yield message
+
+
+def iter_structured_transcript(path):
+    """Yield one dict per message of a structured transcript, a line at a time"""
+    records = read_transcript(path)
+    next(records, None)   # Header
+    for record in records:
+        if record.get('type', 'default') != 'default':
+            continue
+        author = record.get('author', {})
+        yield {
+            'author_id': author.get('id'),
+            'author_name': author.get('name'),
+            'timestamp': record.get('ts'),
+            'content_length': len(record.get('content', '')),
+            'attachments': len(record.get('attachments', ())),
+            'embeds': len(record.get('embeds', ())),
+        }
+
+
+def iter_html_transcript(path, chunk_size=CHUNK_SIZE):
+    """Yield one dict per message of a transcript saved as HTML, reading it `chunk_size` characters at a time.
+
+    Transcripts are our own markup, so each message is cut out at the next
+    message's opening tag and its fields are picked out with patterns; only
+    the message being read is ever held, besides the chunk.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        buffer = ''          # The page header, then the message read so far
+        in_header = True
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parts = _MESSAGE_START.split(buffer + chunk)
+            buffer = parts.pop()
+            if parts:
+                for block in parts[1:] if in_header else parts:
+                    yield _message(block)
+                in_header = False
+            elif in_header:
+                buffer = buffer[-64:]   # Enough to hold an opening tag cut by the chunk boundary
+    if not in_header:
+        yield _message(buffer)
+
+
+def _message(block):
+    author_id = _AUTHOR_ID.match(block)
+    timestamp = _TIMESTAMP.match(block)
+    name = _USERNAME.search(block)
+    content = _CONTENT.search(block)
+    if timestamp:
+        timestamp = html.unescape(timestamp.group(1))
+    else:
+        legacy = _LEGACY_TIME.search(block)
+        timestamp = legacy and html.unescape(legacy.group(1)).strip()
+        try:
+            timestamp = timestamp and datetime.strptime(timestamp, _LEGACY_TIMESTAMP).isoformat()
+        except ValueError:
+            pass
+    return {
+        'author_id': int(author_id.group(1)) if author_id else None,
+        'author_name': html.unescape(name.group(1)).strip() if name else None,
+        'timestamp': timestamp or None,
+        'content_length': len(html.unescape(content.group(1))) if content else 0,
+        'attachments': block.count('<div class="attachment">'),
+        'embeds': block.count('<div class="embed">'),
+    }
+
+
+# --- Writers ---
+def export_rows(store, kind='tickets', since=None, until=None, cursor=None):
+    """The row generator for one export"""
+    if kind not in KINDS:
+        raise ValueError(f"unknown export kind {kind!r}")
+    tickets = iter_tickets(store, since, until, cursor)
+    return ticket_rows(tickets) if kind == 'tickets' else message_rows(tickets)
+
+
+class ExportWriter:
+    """Writes rows to a text stream and remembers the cursor of the last complete ticket"""
+
+    def __init__(self, out, fmt, columns):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown export format {fmt!r}")
+        self.out = out
+        self.fmt = fmt
+        self.rows = 0
+        self.completed = None   # Cursor to resume from: every row of this ticket has been written
+        self.current = None
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(out, columns, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, row):
+        if row['cursor'] != self.current:
+            self.completed, self.current = self.current, row['cursor']
+        if self.fmt == 'csv':
+            self._csv.writerow(row)
+        else:
+            self.out.write(json.dumps(row, separators=(',', ':')) + "\n")
+        self.rows += 1
+
+    def finish(self):
+        """Call once every row is written; the last ticket is complete too"""
+        if self.current is not None:
+            self.completed = self.current
+
+
+async def export_to_file(store, path, kind='tickets', fmt='ndjson', since=None, until=None, cursor=None, max_bytes=None):
+    """Write a gzipped export to `path`, yielding to the event loop as it goes.
+
+    Stops after the ticket that takes the compressed file past `max_bytes`.
+    Returns (rows written, resume cursor or None when the export is complete).
+    """
+    rows = export_rows(store, kind, since, until, cursor)
+    with open(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as gz, \
+            io.TextIOWrapper(gz, encoding='utf-8', newline='') as out:
+        writer = ExportWriter(out, fmt, COLUMNS[kind])
+        for row in rows:
+            if max_bytes is not None and row['cursor'] != writer.current and raw.tell() >= max_bytes:
+                return writer.rows, writer.current
+            writer.write(row)
+            if writer.rows % YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+        writer.finish()
+    return writer.rows, None
+
+
+# --- Helpers ---
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _date(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD[THH:MM], got {value!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kind', choices=KINDS, default='tickets')
+    parser.add_argument('--format', choices=FORMATS, default='ndjson')
+    parser.add_argument('--since', type=_date, help="only tickets created at or after this date")
+    parser.add_argument('--until', type=_date, help="only tickets created before this date")
+    parser.add_argument('--cursor', help="resume after the ticket this cursor was printed for")
+    parser.add_argument('-o', '--output', help="output file (default stdout; .gz is compressed)")
+    parser.add_argument('--hot', default=HOT_PATH)
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH)
+    parser.add_argument('--archive', default=COLD_PATH)
+    args = parser.parse_args(argv)
+
+    # Read-only: an unmigrated store is upgraded in memory, never rewritten from here
+    store = TicketStore(hot_path=args.hot, cold_path=args.archive, snapshot_path=args.snapshot, read_only=True)
+    if args.output is None:
+        out = sys.stdout
+    elif args.output.endswith('.gz'):
+        out = gzip.open(args.output, 'wt', encoding='utf-8', newline='')
+    else:
+        out = open(args.output, 'w', encoding='utf-8', newline='')
+
+    writer = ExportWriter(out, args.format, COLUMNS[args.kind])
+    try:
+        for row in export_rows(store, args.kind, args.since, args.until, args.cursor):
+            writer.write(row)
+        writer.finish()
+    except (KeyboardInterrupt, BrokenPipeError):
+        print(f"interrupted after {writer.rows} rows; resume with --cursor {writer.completed}"
+              if writer.completed else "interrupted before the first ticket was complete", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"exported {writer.rows} rows; next time resume with --cursor {writer.completed}"
+          if writer.completed else "exported 0 rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+
+class TicketIndex:
+    """Tickets ordered by creation time, per status and per owner.
+
+    Every list holds (created_at, ticket_number, key) tuples kept sorted, so a
+    page is a bisect to the cursor plus a slice: O(log n + page size) however
+    many tickets there are. A cursor is simply the sort key of the last ticket
+    on the previous page. Updating a ticket removes its old entry and inserts
+    the new one.
+    """
+
+    def __init__(self):
+        self._status = defaultdict(list)
+        self._owner = defaultdict(list)
+        self._entries = {}  # key -> (sort key, status, owner), to find the old entry on update
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def build(self, tickets):
+        """Index many tickets at once; one sort per list instead of an insert per ticket"""
+        for ticket in tickets:
+            self._entries[ticket.key] = entry = (_sort_key(ticket), ticket.status, ticket.user_id)
+            self._status[entry[1]].append(entry[0])
+            self._owner[entry[2]].append(entry[0])
+        for lists in (self._status, self._owner):
+            for keys in lists.values():
+                keys.sort()
+
+    def put(self, ticket):
+        entry = (_sort_key(ticket), ticket.status, ticket.user_id)
+        if self._entries.get(ticket.key) == entry:
+            return
+        self.remove(ticket.key)
+        self._entries[ticket.key] = entry
+        insort(self._status[entry[1]], entry[0])
+        insort(self._owner[entry[2]], entry[0])
+
+    def remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _delete(self._status[entry[1]], entry[0])
+        _delete(self._owner[entry[2]], entry[0])
+
+    def count(self, status=None, user_id=None):
+        return len(self._list(status, user_id))
+
+    def page(self, status=None, user_id=None, cursor=None, limit=10, newest_first=True):
+        """Return (keys, next cursor or None) for one page after `cursor`.
+
+        With both `status` and `user_id` the owner's list is filtered, which is
+        still bounded by that one user's tickets.
+        """
+        keys = self._list(status if user_id is None else None, user_id)
+        if status is not None and user_id is not None:
+            keys = [k for k in keys if self._entries[k[2]][1] == status]
+        if newest_first:
+            end = len(keys) if cursor is None else bisect_left(keys, cursor)
+            start = max(0, end - limit)
+            page = keys[start:end][::-1]
+            more = start > 0
+        else:
+            start = 0 if cursor is None else bisect_right(keys, cursor)
+            page = keys[start:start + limit]
+            more = start + limit < len(keys)
+        return [k[2] for k in page], (page[-1] if page and more else None)
+
+    def _list(self, status, user_id):
+        if user_id is not None:
+            return self._owner.get(user_id, [])
+        if status is not None:
+            return self._status.get(status, [])
+        raise ValueError("page by status or by owner")
+
+
+def _sort_key(ticket):
+    return (ticket.created_at, ticket.ticket_number, ticket.key)
+
+
+def _delete(keys, sort_key):
+    i = bisect_left(keys, sort_key)
+    if i < len(keys) and keys[i] == sort_key:
+        del keys[i]
@@ -1,80 +1,126 @@
+import asyncio
 import discord
 import json
 import logging
-from datetime import datetime
+import os
+import time
+from datetime import datetime, timedelta
 from utils.transcript_generator import TranscriptGenerator
+from utils import metrics
+from utils.admission import AdmissionControl
+from utils.analytics import TicketAnalytics
+from utils.audit_log import AuditLog
+from utils.category_pool import CategoryPool
+from utils.config import config_service
+from utils.single_flight import SingleFlight, TicketBusy
+from utils.staff_scheduler import StaffScheduler
+from utils.ticket_model import Ticket
+from utils.ticket_store import TicketStore
+from utils.tracing import span
+from utils.transcript_delivery import Recipient, TranscriptDelivery
+from utils.warm_pool import WarmChannelPool
 
 logger = logging.getLogger(__name__)
 
+_BUSY_VERBS = {'close': 'closed', 'delete': 'deleted', 'reopen': 'reopened', 'archive': 'archived'}
+
+
+def _busy_message(running):
+    return f"This ticket is being {_BUSY_VERBS.get(running, running)} right now, try again in a moment."
+
 class TicketManager:
     def __init__(self):
         self.transcript_generator = TranscriptGenerator()
+        self.transcript_delivery = TranscriptDelivery()
+        self.audit_log = AuditLog()
+        self._background = set()  # Transcript deliveries and pool refills still running
+        self.store = TicketStore(binary=config_service.current.ticket_store_format == 'binary')
+        self.store.demote()  # Archived tickets left in the hot set by older versions
+        self.state = self.load_state()
+        self.open_pool = CategoryPool('open', self.state, self.save_state)
+        self.closed_pool = CategoryPool('closed', self.state, self.save_state)
+        self.warm_pool = WarmChannelPool(self.open_pool)
+        self.operations = SingleFlight()  # Close/delete/reopen/archive in flight, per channel id
+        self.admission = AdmissionControl()  # Per-user and guild-wide limits on ticket creation
+        self.staff = StaffScheduler()  # Filled by refresh_staff once the guild is available
+        self.analytics = TicketAnalytics()
+        if not self.analytics.loaded:
+            # One-time backfill; from here on the aggregates follow lifecycle events
+            self.analytics.rebuild(self.store.all())
+            self.analytics.flush()
+        self._seed_open_ticket_gauge()
+
+    def _seed_open_ticket_gauge(self, tickets=None):
+        """Initialise the open-ticket gauge from stored tickets"""
+        default_category = config_service.current.ticket_categories[0]
+        metrics.OPEN_TICKETS.reset()
+        for ticket in (tickets if tickets is not None else self.store.hot).values():
+            if ticket.status == 'open':
+                metrics.OPEN_TICKETS.labels(category=str(ticket.category_id or default_category)).inc()
         
-    def load_config(self):
-        """Load configuration from file"""
+    def load_state(self):
+        """Load the ticket counter and overflow categories from file"""
         try:
-            with open('data/config.json', 'r') as f:
-                return json.load(f)
+            start = time.perf_counter()
+            with span('load_state'), open('data/state.json', 'r') as f:
+                state = json.load(f)
+            metrics.STORE_SECONDS.labels('state', 'load').observe(time.perf_counter() - start)
+            return state
+        except FileNotFoundError:
+            return self._migrate_state()
         except Exception as e:
-            logger.error(f"Error loading config: {e}")
-            return {
-                "ticket_category": 1392114253103759401,
-                "closed_category": 1392114561590493324,
-                "ticket_counter": 0
-            }
+            logger.error("Error loading state: %s", e)
+            return self._migrate_state()
     
-    def save_config(self, config):
-        """Save configuration to file"""
+    def _migrate_state(self):
+        """Seed the counter from the legacy config key, never below the highest stored ticket number"""
+        counter = max((t.ticket_number for t in self.store.all()), default=0)
         try:
-            with open('data/config.json', 'w') as f:
-                json.dump(config, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving config: {e}")
+            with open(config_service.path, 'r') as f:
+                counter = max(counter, json.load(f).get('ticket_counter', 0))
+        except (OSError, ValueError):
+            pass
+        return {'ticket_counter': counter}
     
-    def load_tickets(self):
-        """Load tickets from file"""
+    def save_state(self, state):
+        """Save the ticket counter and overflow categories to file"""
         try:
-            with open('data/tickets.json', 'r') as f:
-                return json.load(f)
+            start = time.perf_counter()
+            with span('save_state'), open('data/state.json', 'w') as f:
+                json.dump(state, f, indent=2)
+            metrics.STORE_SECONDS.labels('state', 'save').observe(time.perf_counter() - start)
         except Exception as e:
-            logger.error(f"Error loading tickets: {e}")
-            return {}
-    
-    def save_tickets(self, tickets):
-        """Save tickets to file"""
-        try:
-            with open('data/tickets.json', 'w') as f:
-                json.dump(tickets, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving tickets: {e}")
+            logger.error("Error saving state: %s", e)
     
+    @metrics.track_operation('create_ticket')
     async def create_ticket(self, guild: discord.Guild, user: discord.Member, reason: str = None):
         """Create a new ticket channel"""
         try:
-            # Load configuration
-            config = self.load_config()
-            tickets = self.load_tickets()
-            
+            config = config_service.current
             # Check if user already has an open ticket
-            user_tickets = [t for t in tickets.values() if t.get('user_id') == user.id and t.get('status') == 'open']
+            user_tickets = [t for t in self.store.hot.values() if t.user_id == user.id and t.status == 'open']
             if user_tickets:
                 return None, "You already have an open ticket!"
             
-            # Get ticket category
-            category = guild.get_channel(config['ticket_category'])
-            if not category or not isinstance(category, discord.CategoryChannel):
-                return None, "Ticket category not found!"
+            # Take a pre-created channel if one is ready, else reserve a slot in the least-full ticket category
+            self.warm_pool.record_creation()
+            channel = self.warm_pool.claim(guild)
+            category = None
+            if channel is None:
+                category = await self.open_pool.acquire(guild)
+                if category is None:
+                    return None, "Ticket category not found or full!"
             
             # Increment ticket counter
-            config['ticket_counter'] += 1
-            ticket_number = config['ticket_counter']
+            self.state['ticket_counter'] += 1
+            ticket_number = self.state['ticket_counter']
             
             # Create ticket channel with username (not display name)
             # Clean username for channel name (remove spaces, special chars)
             clean_username = ''.join(c for c in user.name if c.isalnum() or c in '-_').lower()
             if not clean_username:
                 clean_username = f"user{user.id}"
-            channel_name = f"ticket-{clean_username}"
+            channel_name = f"{config.ticket_channel_prefix}{clean_username}"
             
             # Set up permissions
             overwrites = {
@@ -95,7 +141,7 @@ class TicketManager:
             }
             
             # Add staff role permissions
-            staff_role = guild.get_role(1346488365608079452)  # Staff role ID
+            staff_role = guild.get_role(config.staff_role_id)
             if staff_role:
                 overwrites[staff_role] = discord.PermissionOverwrite(
                     read_messages=True,
@@ -105,47 +151,79 @@ class TicketManager:
                     embed_links=True
                 )
             
+            topic = f"Support ticket for {user.display_name} | Ticket #{ticket_number:04d}"
+            if channel is not None:
+                # Turn the warm channel into the ticket with a single edit
+                try:
+                    await channel.edit(name=channel_name, topic=topic, overwrites=overwrites)
+                    category_id = channel.category_id
+                except discord.NotFound:
+                    await self.open_pool.release(guild, channel.category_id)
+                    channel = None
+                except discord.HTTPException as e:
+                    logger.warning("Failed to claim warm pool channel, creating one instead: %s", e, extra={'channel_id': channel.id})
+                    self.warm_pool.give_back(channel)
+                    channel = None
+                if channel is None:
+                    category = await self.open_pool.acquire(guild)
+                    if category is None:
+                        return None, "Ticket category not found or full!"
+            
             # Create the channel
-            channel = await guild.create_text_channel(
-                name=channel_name,
-                category=category,
-                overwrites=overwrites,
-                topic=f"Support ticket for {user.display_name} | Ticket #{ticket_number:04d}"
+            if channel is None:
+                try:
+                    channel = await guild.create_text_channel(
+                        name=channel_name,
+                        category=category,
+                        overwrites=overwrites,
+                        topic=topic
+                    )
+                except Exception:
+                    await self.open_pool.release(guild, category.id)
+                    raise
+                category_id = category.id
+            if config.warm_pool_size > 0:
+                self._spawn(self.warm_pool.refill(guild, shrink=False))
+            
+            # Save ticket data before the next await, so the reconciler never sees the channel untracked
+            ticket = Ticket(
+                ticket_number=ticket_number,
+                channel_id=channel.id,
+                user_id=user.id,
+                user_name=str(user),
+                status='open',
+                created_at=datetime.now(),
+                reason=reason,
+                category_id=category_id,
+                assigned_to=self.staff.assign()
             )
+            self.store.add(ticket)
+            self.analytics.opened(ticket)
             
-            # Save ticket data
-            tickets[str(channel.id)] = {
-                'ticket_number': ticket_number,
-                'user_id': user.id,
-                'user_name': str(user),
-                'channel_id': channel.id,
-                'status': 'open',
-                'created_at': datetime.now().isoformat(),
-                'reason': reason,
-                'added_users': []
-            }
+            self.save_state(self.state)
+            self.store.save()
+            metrics.OPEN_TICKETS.labels(category=str(category_id)).inc()
             
-            self.save_config(config)
-            self.save_tickets(tickets)
-            
-            logger.info(f"Created ticket #{ticket_number:04d} for {user} in {channel.name}")
+            logger.info(
+                "Created ticket #%04d for %s in %s", ticket_number, user, channel.name,
+                extra={'ticket': ticket_number, 'channel_id': channel.id, 'actor': user.id}
+            )
             return channel, None
             
         except Exception as e:
-            logger.error(f"Error creating ticket: {e}")
+            logger.exception("Error creating ticket: %s", e, extra={'actor': user.id})
             return None, f"An error occurred while creating the ticket: {str(e)}"
     
     async def add_user_to_ticket(self, channel: discord.TextChannel, user: discord.Member, added_by: discord.Member):
         """Add a user to a ticket"""
         try:
-            tickets = self.load_tickets()
-            ticket_data = tickets.get(str(channel.id))
+            ticket_data = self.store.hot.get(str(channel.id))
             
-            if not ticket_data or ticket_data.get('status') != 'open':
+            if not ticket_data or ticket_data.status != 'open':
                 return False, "This is not an active ticket channel!"
             
             # Check if user is already in the ticket
-            if user.id in ticket_data.get('added_users', []):
+            if user.id in ticket_data.added_users:
                 return False, f"{user.mention} is already added to this ticket!"
             
             # Add permissions for the user
@@ -158,163 +236,212 @@ class TicketManager:
             )
             
             # Update ticket data
-            if 'added_users' not in ticket_data:
-                ticket_data['added_users'] = []
-            ticket_data['added_users'].append(user.id)
+            ticket_data.added_users.append(user.id)
+            self.store.save()
             
-            tickets[str(channel.id)] = ticket_data
-            self.save_tickets(tickets)
-            
-            logger.info(f"Added {user} to ticket {channel.name} by {added_by}")
+            logger.info(
+                "Added %s to ticket %s by %s", user, channel.name, added_by,
+                extra={'ticket': ticket_data.ticket_number, 'channel_id': channel.id, 'actor': added_by.id}
+            )
             return True, None
             
         except Exception as e:
-            logger.error(f"Error adding user to ticket: {e}")
+            logger.exception("Error adding user to ticket: %s", e, extra={'channel_id': channel.id, 'actor': added_by.id})
             return False, f"An error occurred: {str(e)}"
     
+    @metrics.track_operation('close_ticket')
     async def close_ticket(self, channel: discord.TextChannel, closed_by: discord.Member):
         """Close a ticket and move it to closed category"""
         try:
-            config = self.load_config()
-            tickets = self.load_tickets()
-            ticket_data = tickets.get(str(channel.id))
+            return await self.operations.do(channel.id, 'close', lambda: self._close_ticket(channel, closed_by))
+        except TicketBusy as e:
+            return False, _busy_message(e.running)
+    
+    async def _close_ticket(self, channel, closed_by):
+        try:
+            ticket_data = self.store.hot.get(str(channel.id))
             
             if not ticket_data:
                 return False, "This is not a ticket channel!"
             
-            if ticket_data.get('status') == 'closed':
+            if ticket_data.status == 'closed':
                 return False, "This ticket is already closed!"
             
             # Generate transcript
             transcript_file = await self.transcript_generator.generate_transcript(channel)
             
-            # Get closed category
-            closed_category = channel.guild.get_channel(config['closed_category'])
-            if not closed_category or not isinstance(closed_category, discord.CategoryChannel):
-                return False, "Closed tickets category not found!"
+            # Reserve a slot in the least-full closed category
+            closed_category = await self.closed_pool.acquire(channel.guild)
+            if closed_category is None:
+                return False, "Closed tickets category not found or full!"
             
             # Move channel to closed category
-            await channel.edit(category=closed_category)
+            open_category_id = channel.category_id
+            try:
+                await channel.edit(category=closed_category)
+            except Exception:
+                await self.closed_pool.release(channel.guild, closed_category.id)
+                raise
+            await self.open_pool.release(channel.guild, open_category_id)
             
             # Update channel name
             new_name = f"closed-{channel.name}"
             await channel.edit(name=new_name)
             
             # Remove permissions for ticket creator and added users
-            ticket_owner = channel.guild.get_member(ticket_data['user_id'])
+            ticket_owner = channel.guild.get_member(ticket_data.user_id)
             if ticket_owner:
                 await channel.set_permissions(ticket_owner, read_messages=False)
             
-            for user_id in ticket_data.get('added_users', []):
+            for user_id in ticket_data.added_users:
                 user = channel.guild.get_member(user_id)
                 if user:
                     await channel.set_permissions(user, read_messages=False)
             
             # Update ticket data
-            ticket_data['status'] = 'closed'
-            ticket_data['closed_at'] = datetime.now().isoformat()
-            ticket_data['closed_by'] = str(closed_by)
-            ticket_data['transcript_file'] = transcript_file
-            
-            tickets[str(channel.id)] = ticket_data
-            self.save_tickets(tickets)
-            
-            logger.info(f"Closed ticket {channel.name} by {closed_by}")
+            ticket_data.status = 'closed'
+            ticket_data.category_id = closed_category.id
+            ticket_data.closed_at = datetime.now()
+            ticket_data.closed_by = closed_by.id
+            ticket_data.closed_by_name = str(closed_by)
+            ticket_data.transcript_file = transcript_file
+            self.store.update(ticket_data)
+            staff_role_id = config_service.current.staff_role_id
+            self.analytics.closed(ticket_data, by_staff=any(role.id == staff_role_id for role in getattr(closed_by, 'roles', ())))
+            self.store.save()
+            metrics.OPEN_TICKETS.labels(category=str(open_category_id)).dec()
+            self.staff.release(ticket_data.assigned_to)
+            
+            logger.info(
+                "Closed ticket %s by %s", channel.name, closed_by,
+                extra={'ticket': ticket_data.ticket_number, 'channel_id': channel.id, 'actor': closed_by.id}
+            )
             return True, transcript_file
             
         except Exception as e:
-            logger.error(f"Error closing ticket: {e}")
+            logger.exception("Error closing ticket: %s", e, extra={'channel_id': channel.id, 'actor': closed_by.id})
             return False, f"An error occurred: {str(e)}"
     
+    @metrics.track_operation('delete_ticket')
     async def delete_ticket(self, channel: discord.TextChannel, deleted_by: discord.Member):
         """Delete a ticket channel"""
         try:
-            tickets = self.load_tickets()
-            ticket_data = tickets.get(str(channel.id))
+            return await self.operations.do(channel.id, 'delete', lambda: self._delete_ticket(channel, deleted_by))
+        except TicketBusy as e:
+            return False, _busy_message(e.running), None
+    
+    async def _delete_ticket(self, channel, deleted_by):
+        try:
+            ticket_data = self.store.hot.get(str(channel.id))
             
             if not ticket_data:
                 return False, "This is not a ticket channel!", None
             
             # Generate transcript if not already generated
-            transcript_file = ticket_data.get('transcript_file')
+            transcript_file = ticket_data.transcript_file
             if not transcript_file:
                 transcript_file = await self.transcript_generator.generate_transcript(channel)
             
             # Get ticket owner info
-            ticket_owner = channel.guild.get_member(ticket_data['user_id'])
-            
-            # Log to deletion log channel
-            log_channel = channel.guild.get_channel(1395449524570423387)
-            if log_channel and transcript_file:
-                try:
-                    log_embed = discord.Embed(
-                        title="🗑️ Ticket Deleted",
-                        description=f"Ticket `{channel.name}` has been deleted",
-                        color=0xff6b6b,
-                        timestamp=datetime.now()
-                    )
-                    log_embed.add_field(
-                        name="📋 Ticket Details",
-                        value=f"**Ticket Owner:** {ticket_owner.mention if ticket_owner else 'Unknown User'}\n**Deleted By:** {deleted_by.mention}\n**Ticket ID:** {ticket_data.get('ticket_id', 'Unknown')}",
-                        inline=False
-                    )
-                    log_embed.add_field(
-                        name="📝 Original Reason",
-                        value=ticket_data.get('reason', 'No reason provided')[:1000],
-                        inline=False
-                    )
-                    
-                    with open(transcript_file, 'rb') as f:
-                        file = discord.File(f, filename=f"transcript-{channel.name}.html")
-                        await log_channel.send(embed=log_embed, file=file)
-                except Exception as e:
-                    logger.error(f"Failed to log ticket deletion: {e}")
-            
-            # Send transcript to ticket owner if possible
-            if ticket_owner and transcript_file:
-                try:
-                    embed = discord.Embed(
-                        title="🗂️ Ticket Transcript",
-                        description=f"Your ticket `{channel.name}` has been deleted. Here's the transcript:",
-                        color=0xff6b6b
-                    )
-                    with open(transcript_file, 'rb') as f:
-                        file = discord.File(f, filename=f"transcript-{channel.name}.html")
-                        await ticket_owner.send(embed=embed, file=file)
-                except:
-                    pass  # Ignore if unable to DM user
+            ticket_owner = channel.guild.get_member(ticket_data.user_id)
+            
+            # Log the deletion with the transcript attached, then send it on to the owner and optionally the added users
+            config = config_service.current
+            filename = f"transcript-{channel.name}.html"
+            transcript_html = await self.transcript_generator.html_for(transcript_file)
+            uploaded = None
+            if channel.guild.get_channel(config.log_channel_id):
+                log_embed = discord.Embed(
+                    title="🗑️ Ticket Deleted",
+                    description=f"Ticket `{channel.name}` has been deleted",
+                    color=0xff6b6b,
+                    timestamp=datetime.now()
+                )
+                log_embed.add_field(
+                    name="📋 Ticket Details",
+                    value=f"**Ticket Owner:** {ticket_owner.mention if ticket_owner else 'Unknown User'}\n**Deleted By:** {deleted_by.mention}\n**Ticket Number:** #{ticket_data.ticket_number:04d}",
+                    inline=False
+                )
+                log_embed.add_field(
+                    name="📝 Original Reason",
+                    value=(ticket_data.reason or 'No reason provided')[:1000],
+                    inline=False
+                )
+                uploaded = self.audit_log.submit(log_embed, transcript_html, filename)
+            recipients = []
+            if ticket_owner:
+                recipients.append(Recipient('owner', ticket_owner, discord.Embed(
+                    title="🗂️ Ticket Transcript",
+                    description=f"Your ticket `{channel.name}` has been deleted. Here's the transcript:",
+                    color=0xff6b6b
+                )))
+            if config.dm_transcript_to_added_users:
+                for user_id in ticket_data.added_users:
+                    member = channel.guild.get_member(user_id)
+                    if member:
+                        recipients.append(Recipient('added_user', member, discord.Embed(
+                            title="🗂️ Ticket Transcript",
+                            description=f"The ticket `{channel.name}` you were added to has been deleted. Here's the transcript:",
+                            color=0xff6b6b
+                        )))
+            if transcript_html and recipients:
+                # DMs wait for the batched log upload to reuse its URL, so they don't hold up the delete
+                self._spawn(self._deliver_transcript(transcript_html, filename, recipients, uploaded, channel.id))
             
             # Remove ticket from data
-            del tickets[str(channel.id)]
-            self.save_tickets(tickets)
-            
-            # Delete the channel
+            self.store.discard(channel.id)
+            self.store.save()
+            if ticket_data.status == 'open':
+                metrics.OPEN_TICKETS.labels(category=str(channel.category_id)).dec()
+                self.staff.release(ticket_data.assigned_to)
+            
+            # Delete the channel and give its category slot back
+            category_id = channel.category_id
             await channel.delete()
+            pool = self.open_pool if category_id in self.open_pool else self.closed_pool
+            await pool.release(channel.guild, category_id)
             
-            logger.info(f"Deleted ticket {channel.name} by {deleted_by}")
+            logger.info(
+                "Deleted ticket %s by %s", channel.name, deleted_by,
+                extra={'ticket': ticket_data.ticket_number, 'channel_id': channel.id, 'actor': deleted_by.id}
+            )
             return True, None, transcript_file
             
         except Exception as e:
-            logger.error(f"Error deleting ticket: {e}")
+            logger.exception("Error deleting ticket: %s", e, extra={'channel_id': channel.id, 'actor': deleted_by.id})
             return False, f"An error occurred: {str(e)}", None
     
+    async def _deliver_transcript(self, transcript_file, filename, recipients, uploaded, channel_id):
+        try:
+            await self.transcript_delivery.deliver(transcript_file, filename, recipients, uploaded=uploaded)
+        except Exception as e:
+            logger.error("Failed to deliver transcript %s: %s", transcript_file, e, extra={'channel_id': channel_id})
+    
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def drain(self, timeout: float = 30.0):
+        """Wait for background transcript deliveries and pool refills, e.g. before shutting down"""
+        if self._background:
+            await asyncio.wait(set(self._background), timeout=timeout)
+    
     def get_ticket_info(self, channel_id: int):
         """Get ticket information"""
-        tickets = self.load_tickets()
-        return tickets.get(str(channel_id))
+        return self.store.get(channel_id)
     
     async def remove_user_from_ticket(self, channel: discord.TextChannel, user_to_remove: discord.Member, remover: discord.Member):
         """Remove a user from a ticket channel"""
         try:
             # Get ticket info
-            tickets = self.load_tickets()
-            ticket_info = tickets.get(str(channel.id))
+            ticket_info = self.store.hot.get(str(channel.id))
             
             if not ticket_info:
                 return False, "This is not a ticket channel!"
             
             # Check if trying to remove the ticket owner
-            if user_to_remove.id == ticket_info.get('user_id'):
+            if user_to_remove.id == ticket_info.user_id:
                 return False, "Cannot remove the ticket owner from their own ticket!"
             
             # Check if user has access to the channel
@@ -326,40 +453,51 @@ class TicketManager:
             await channel.set_permissions(user_to_remove, overwrite=None)
             
             # Remove from added_users list if present
-            if 'added_users' in ticket_info and user_to_remove.id in ticket_info['added_users']:
-                ticket_info['added_users'].remove(user_to_remove.id)
-                tickets[str(channel.id)] = ticket_info
-                self.save_tickets(tickets)
+            if user_to_remove.id in ticket_info.added_users:
+                ticket_info.added_users.remove(user_to_remove.id)
+                self.store.save()
             
-            logger.info(f"User {user_to_remove} removed from ticket {channel.name} by {remover}")
+            logger.info(
+                "User %s removed from ticket %s by %s", user_to_remove, channel.name, remover,
+                extra={'ticket': ticket_info.ticket_number, 'channel_id': channel.id, 'actor': remover.id}
+            )
             return True, "User removed successfully"
             
         except Exception as e:
-            logger.error(f"Error removing user from ticket: {e}")
+            logger.exception("Error removing user from ticket: %s", e, extra={'channel_id': channel.id, 'actor': remover.id})
             return False, f"An error occurred: {str(e)}"
     
+    @metrics.track_operation('reopen_ticket')
     async def reopen_ticket(self, channel: discord.TextChannel, reopener: discord.Member):
         """Reopen a closed ticket"""
         try:
-            # Load configuration
-            config = self.load_config()
-            tickets = self.load_tickets()
-            
+            return await self.operations.do(channel.id, 'reopen', lambda: self._reopen_ticket(channel, reopener))
+        except TicketBusy as e:
+            return False, _busy_message(e.running)
+    
+    async def _reopen_ticket(self, channel, reopener):
+        try:
             # Get ticket info
-            ticket_info = tickets.get(str(channel.id))
+            ticket_info = self.store.hot.get(str(channel.id))
             if not ticket_info:
                 return False, "This is not a ticket channel!"
             
-            if ticket_info.get('status') != 'closed':
+            if ticket_info.status != 'closed':
                 return False, "This ticket is not closed!"
             
-            # Get categories
-            open_category = channel.guild.get_channel(config['ticket_category'])
-            if not open_category or not isinstance(open_category, discord.CategoryChannel):
-                return False, "Open ticket category not found!"
+            # Reserve a slot in the least-full ticket category
+            open_category = await self.open_pool.acquire(channel.guild)
+            if open_category is None:
+                return False, "Open ticket category not found or full!"
             
             # Move channel back to open category
-            await channel.edit(category=open_category)
+            closed_category_id = channel.category_id
+            try:
+                await channel.edit(category=open_category)
+            except Exception:
+                await self.open_pool.release(channel.guild, open_category.id)
+                raise
+            await self.closed_pool.release(channel.guild, closed_category_id)
             
             # Remove "closed-" prefix from channel name if present
             new_name = channel.name
@@ -368,7 +506,7 @@ class TicketManager:
                 await channel.edit(name=new_name)
             
             # Get the original ticket owner
-            ticket_owner = channel.guild.get_member(ticket_info['user_id'])
+            ticket_owner = channel.guild.get_member(ticket_info.user_id)
             if ticket_owner:
                 # Restore owner's permissions
                 await channel.set_permissions(
@@ -380,7 +518,7 @@ class TicketManager:
                 )
             
             # Restore permissions for added users
-            for user_id in ticket_info.get('added_users', []):
+            for user_id in ticket_info.added_users:
                 user = channel.guild.get_member(user_id)
                 if user:
                     await channel.set_permissions(
@@ -392,17 +530,281 @@ class TicketManager:
                     )
             
             # Update ticket status
-            ticket_info['status'] = 'open'
-            ticket_info['reopened_at'] = datetime.now().isoformat()
-            ticket_info['reopened_by'] = reopener.id
-            tickets[str(channel.id)] = ticket_info
-            
+            ticket_info.status = 'open'
+            ticket_info.category_id = open_category.id
+            ticket_info.reopened_at = datetime.now()
+            ticket_info.reopened_by = reopener.id
+            ticket_info.assigned_to = self.staff.assign('reopen')
+            self.store.update(ticket_info)
+            self.analytics.reopened(ticket_info)
             # Save tickets data
-            self.save_tickets(tickets)
+            self.store.save()
+            metrics.OPEN_TICKETS.labels(category=str(open_category.id)).inc()
             
-            logger.info(f"Ticket {channel.name} reopened by {reopener}")
+            logger.info(
+                "Ticket %s reopened by %s", channel.name, reopener,
+                extra={'ticket': ticket_info.ticket_number, 'channel_id': channel.id, 'actor': reopener.id}
+            )
             return True, "Ticket reopened successfully"
             
         except Exception as e:
-            logger.error(f"Error reopening ticket: {e}")
+            logger.exception("Error reopening ticket: %s", e, extra={'channel_id': channel.id, 'actor': reopener.id})
+            return False, f"An error occurred: {str(e)}"
+    
+    def refresh_staff(self, guild: discord.Guild):
+        """Rebuild staff loads from the staff role's members and the open tickets assigned to them"""
+        staff_role_id = config_service.current.staff_role_id
+        staff = [m for m in guild.members if any(role.id == staff_role_id for role in m.roles)]
+        self.staff.rebuild(staff, self.store.hot.values())
+    
+    async def staff_available(self, guild: discord.Guild, member: discord.Member):
+        """A staff member came online: start assigning to them and pick up tickets nobody got"""
+        if member.id in self.staff:
+            return []
+        tickets = [t for t in self.store.hot.values() if t.status == 'open']
+        self.staff.add(member.id, sum(1 for t in tickets if t.assigned_to == member.id))
+        # Tickets created while nobody was available, or left with staff who went offline then
+        unassigned = [t for t in tickets if t.assigned_to not in self.staff]
+        return await self._reassign(guild, unassigned, 'backlog')
+    
+    async def staff_unavailable(self, guild: discord.Guild, member: discord.Member):
+        """A staff member went offline: hand their open tickets to whoever is least loaded"""
+        if member.id not in self.staff:
+            return []
+        self.staff.remove(member.id)
+        tickets = [t for t in self.store.hot.values() if t.status == 'open' and t.assigned_to == member.id]
+        return await self._reassign(guild, tickets, 'rebalance', previous=member)
+    
+    async def _reassign(self, guild, tickets, reason, previous=None):
+        reassigned = []
+        for ticket in tickets:
+            staff_id = self.staff.assign(reason)
+            if staff_id is None:
+                break
+            ticket.assigned_to = staff_id
+            reassigned.append(ticket)
+        if not reassigned:
+            return reassigned
+        self.store.save()
+        
+        for ticket in reassigned:
+            channel = guild.get_channel(ticket.channel_id)
+            if channel is None:
+                continue
+            note = f"{previous.mention} went offline, so " if previous else ""
+            try:
+                await channel.send(f"👤 {note}this ticket is now assigned to <@{ticket.assigned_to}>.")
+            except discord.HTTPException as e:
+                logger.warning("Failed to announce reassignment: %s", e, extra={'ticket': ticket.ticket_number, 'channel_id': channel.id})
+        logger.info("Reassigned %d open tickets (%s)", len(reassigned), reason, extra={'actor': previous.id if previous else None})
+        return reassigned
+    
+    def find_ticket_by_number(self, ticket_number: int):
+        """Return the ticket with a ticket number, including archived ones"""
+        return self.store.by_number(ticket_number)
+    
+    def archivable_tickets(self, now: datetime = None):
+        """Channel ids of closed tickets past the archive grace period, oldest first"""
+        hours = config_service.current.archive_after_hours
+        if hours <= 0:
+            return []
+        cutoff = (now or datetime.now()) - timedelta(hours=hours)
+        due = []
+        for ticket in self.store.hot.values():
+            if ticket.status != 'closed' or not ticket.closed_at:
+                continue
+            if ticket.closed_at <= cutoff:
+                due.append((ticket.closed_at, ticket.channel_id))
+        due.sort()
+        return [channel_id for _, channel_id in due]
+    
+    async def archive_expired_tickets(self, guild: discord.Guild, throttle: float = 2.0):
+        """Archive up to `archive_batch_size` expired closed tickets, pausing between channel deletions"""
+        archived = 0
+        for channel_id in self.archivable_tickets()[:config_service.current.archive_batch_size]:
+            if archived:
+                await asyncio.sleep(throttle)
+            success, error = await self.archive_ticket(guild, channel_id)
+            if success:
+                archived += 1
+            else:
+                logger.warning("Could not archive ticket channel %s: %s", channel_id, error, extra={'channel_id': channel_id})
+        return archived
+    
+    @metrics.track_operation('archive_ticket')
+    async def archive_ticket(self, guild: discord.Guild, channel_id: int):
+        """Make sure a closed ticket has a transcript, then delete its channel and keep only the record"""
+        try:
+            return await self.operations.do(channel_id, 'archive', lambda: self._archive_ticket(guild, channel_id))
+        except TicketBusy as e:
+            return False, _busy_message(e.running)
+    
+    async def _archive_ticket(self, guild, channel_id):
+        try:
+            ticket_data = self.store.hot.get(str(channel_id))
+            
+            if not ticket_data or ticket_data.status != 'closed':
+                return False, "This ticket is not closed!"
+            
+            channel = guild.get_channel(channel_id)
+            
+            # Generate transcript if the stored one is missing
+            transcript_file = ticket_data.transcript_file
+            if not transcript_file or not os.path.exists(transcript_file):
+                if channel is None:
+                    logger.warning("Archiving ticket #%04d without a transcript, its channel is gone", ticket_data.ticket_number, extra={'ticket': ticket_data.ticket_number, 'channel_id': channel_id})
+                    transcript_file = None
+                else:
+                    transcript_file = await self.transcript_generator.generate_transcript(channel)
+                    if not transcript_file:
+                        return False, "Failed to generate transcript!"
+            
+            # Delete the channel and give its category slot back
+            if channel is not None:
+                category_id = channel.category_id
+                await channel.delete(reason=f"Archived closed ticket #{ticket_data.ticket_number:04d}")
+                await self.closed_pool.release(guild, category_id)
+            
+            # Move the record to the cold archive
+            ticket_data.status = 'archived'
+            ticket_data.archived_at = datetime.now()
+            ticket_data.transcript_file = transcript_file
+            ticket_data.category_id = None
+            self.store.demote([str(channel_id)])
+            
+            if guild.get_channel(config_service.current.log_channel_id):
+                embed = discord.Embed(
+                    title="📦 Ticket Archived",
+                    description=f"Closed ticket #{ticket_data.ticket_number:04d} had its channel removed after the grace period",
+                    color=0x95a5a6,
+                    timestamp=datetime.now()
+                )
+                embed.add_field(
+                    name="📋 Ticket Details",
+                    value=f"**Ticket Owner:** {f'<@{ticket_data.user_id}>' if ticket_data.user_id else 'Unknown User'}\n**Closed By:** {ticket_data.closed_by_name or 'Unknown'}\n**Transcript:** {'kept' if transcript_file else 'none'}",
+                    inline=False
+                )
+                self.audit_log.submit(embed)
+            
+            logger.info(
+                "Archived ticket #%04d", ticket_data.ticket_number,
+                extra={'ticket': ticket_data.ticket_number, 'channel_id': channel_id}
+            )
+            return True, None
+            
+        except Exception as e:
+            logger.exception("Error archiving ticket: %s", e, extra={'channel_id': channel_id})
             return False, f"An error occurred: {str(e)}"
+    
+    @metrics.track_operation('reopen_archived_ticket')
+    async def reopen_archived_ticket(self, guild: discord.Guild, ticket_number: int, reopener: discord.Member):
+        """Recreate a channel for an archived ticket, seeded with its transcript"""
+        try:
+            # Archived tickets have no channel, so they are keyed by number
+            return await self.operations.do(('archived', ticket_number), 'reopen', lambda: self._reopen_archived_ticket(guild, ticket_number, reopener))
+        except TicketBusy as e:
+            return None, _busy_message(e.running)
+    
+    async def _reopen_archived_ticket(self, guild, ticket_number, reopener):
+        try:
+            config = config_service.current
+            ticket_info = self.find_ticket_by_number(ticket_number)
+            
+            if not ticket_info:
+                return None, f"Ticket #{ticket_number:04d} not found!"
+            
+            if ticket_info.status != 'archived':
+                return None, f"Ticket #{ticket_number:04d} is not archived!"
+            
+            # Reserve a slot in the least-full ticket category
+            category = await self.open_pool.acquire(guild)
+            if category is None:
+                return None, "Ticket category not found or full!"
+            
+            ticket_owner = guild.get_member(ticket_info.user_id)
+            member_overwrite = discord.PermissionOverwrite(
+                read_messages=True,
+                send_messages=True,
+                attach_files=True,
+                embed_links=True
+            )
+            overwrites = {
+                guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                guild.me: discord.PermissionOverwrite(
+                    read_messages=True,
+                    send_messages=True,
+                    manage_messages=True,
+                    attach_files=True,
+                    embed_links=True
+                )
+            }
+            if ticket_owner:
+                overwrites[ticket_owner] = member_overwrite
+            for user_id in ticket_info.added_users:
+                user = guild.get_member(user_id)
+                if user:
+                    overwrites[user] = member_overwrite
+            staff_role = guild.get_role(config.staff_role_id)
+            if staff_role:
+                overwrites[staff_role] = discord.PermissionOverwrite(
+                    read_messages=True,
+                    send_messages=True,
+                    manage_messages=True,
+                    attach_files=True,
+                    embed_links=True
+                )
+            
+            owner_name = ticket_owner.name if ticket_owner else (ticket_info.user_name or '')
+            clean_username = ''.join(c for c in owner_name if c.isalnum() or c in '-_').lower() or f"user{ticket_info.user_id}"
+            try:
+                channel = await guild.create_text_channel(
+                    name=f"{config.ticket_channel_prefix}{clean_username}",
+                    category=category,
+                    overwrites=overwrites,
+                    topic=f"Support ticket for {ticket_owner.display_name if ticket_owner else owner_name} | Ticket #{ticket_number:04d}"
+                )
+            except Exception:
+                await self.open_pool.release(guild, category.id)
+                raise
+            
+            # Seed the channel with the archived conversation
+            embed = discord.Embed(
+                title="📂 Archived Ticket Reopened",
+                description=f"Ticket #{ticket_number:04d} was reopened by {reopener.mention}. The earlier conversation is in the transcript.",
+                color=0x00ff88
+            )
+            embed.add_field(name="📝 Original Reason", value=(ticket_info.reason or 'No reason provided')[:1000], inline=False)
+            # Always uploaded afresh: attachment URLs expire, so a link kept from an
+            # earlier reopen would be dead by the time the ticket is reopened again
+            transcript_html = await self.transcript_generator.html_for(ticket_info.transcript_file)
+            if transcript_html:
+                with open(transcript_html, 'rb') as f:
+                    await channel.send(embed=embed, file=discord.File(f, filename=self.transcript_generator.html_filename(ticket_info.transcript_file)))
+            else:
+                embed.add_field(name="🗂️ Transcript", value="No transcript was saved for this ticket.", inline=False)
+                await channel.send(embed=embed)
+            
+            # Move the record to the new channel
+            self.store.discard(ticket_info.key)
+            ticket_info.previous_channel_id = ticket_info.channel_id
+            ticket_info.channel_id = channel.id
+            ticket_info.category_id = category.id
+            ticket_info.status = 'open'
+            ticket_info.transcript_url = None
+            ticket_info.reopened_at = datetime.now()
+            ticket_info.reopened_by = reopener.id
+            ticket_info.assigned_to = self.staff.assign('reopen')
+            self.store.add(ticket_info)
+            self.analytics.reopened(ticket_info)
+            self.store.save()
+            metrics.OPEN_TICKETS.labels(category=str(category.id)).inc()
+            
+            logger.info(
+                "Archived ticket #%04d reopened by %s in %s", ticket_number, reopener, channel.name,
+                extra={'ticket': ticket_number, 'channel_id': channel.id, 'actor': reopener.id}
+            )
+            return channel, None
+            
+        except Exception as e:
+            logger.exception("Error reopening archived ticket: %s", e, extra={'actor': reopener.id})
+            return None, f"An error occurred: {str(e)}"
@@ -0,0 +1,144 @@
+import operator
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Optional
+
+SCHEMA_VERSION = 2
+
+STATUSES = ('open', 'closed', 'archived')
+
+# Version 1 stored `closed_by` as str(member) and `reopened_by` as an id; the
+# names live on as closed_by_name so nothing is lost in the upgrade.
+
+
+@dataclass(slots=True)
+class Ticket:
+    """A ticket record. Timestamps are naive local datetimes, as the bot has always written them"""
+
+    ticket_number: int
+    channel_id: int
+    status: str
+    created_at: datetime
+    user_id: Optional[int] = None     # None for channels adopted without an identifiable owner
+    user_name: Optional[str] = None
+    reason: Optional[str] = None
+    added_users: list = field(default_factory=list)
+    category_id: Optional[int] = None
+    closed_at: Optional[datetime] = None
+    closed_by: Optional[int] = None
+    closed_by_name: Optional[str] = None
+    transcript_file: Optional[str] = None
+    transcript_url: Optional[str] = None   # No longer written; attachment URLs expire
+    reopened_at: Optional[datetime] = None
+    reopened_by: Optional[int] = None
+    archived_at: Optional[datetime] = None
+    previous_channel_id: Optional[int] = None
+    reconciled: Optional[str] = None
+    assigned_to: Optional[int] = None   # Staff member the ticket was assigned to
+
+    @property
+    def key(self):
+        """The store key: the ticket channel's id as a string"""
+        return str(self.channel_id)
+
+    def to_dict(self):
+        """Compact form: fields at their default are left out"""
+        data = {}
+        for name, value in zip(_NAMES, _values(self)):
+            if value is not None:
+                data[name] = value.isoformat() if name in _DATES else value
+        if not self.added_users:
+            del data['added_users']
+        return data
+
+    def to_tuple(self):
+        """Positional form for the binary snapshot; timestamps as ISO strings, which unpickle far faster than datetimes"""
+        values = list(_values(self))
+        for i in _DATE_SLOTS:
+            if values[i] is not None:
+                values[i] = values[i].isoformat()
+        return tuple(values)
+
+    @classmethod
+    def from_tuple(cls, values):
+        values = list(values)
+        for i in _DATE_SLOTS:
+            if values[i] is not None:
+                values[i] = datetime.fromisoformat(values[i])
+        return cls(*values)
+
+    @classmethod
+    def from_dict(cls, data, version=SCHEMA_VERSION):
+        """Build and validate a ticket, upgrading older schema versions. Raises ValueError on drift"""
+        if not isinstance(data, dict):
+            raise ValueError(f"ticket must be an object, got {type(data).__name__}")
+        if version < 2:
+            data = _upgrade_v1(data)
+
+        values = {}
+        for name, value in data.items():
+            kind = _TYPES.get(name)
+            if kind is None:
+                unknown = sorted(set(data) - _TYPES.keys())
+                raise ValueError(f"unknown ticket fields: {', '.join(unknown)}")
+            if value is not None and (kind is list or type(value) is not kind):
+                try:
+                    value = _PARSERS[kind](value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{name}: invalid value {value!r}") from None
+            values[name] = value
+        missing = [name for name in _REQUIRED if values.get(name) is None]
+        if missing:
+            raise ValueError(f"missing ticket fields: {', '.join(missing)}")
+        if values['status'] not in STATUSES:
+            raise ValueError(f"status: unknown status {values['status']!r}")
+        if values.get('added_users') is None:
+            values['added_users'] = []
+        return cls(**values)
+
+
+def _int(value):
+    if isinstance(value, bool):
+        raise TypeError
+    return int(value)
+
+
+def _str(value):
+    if not isinstance(value, str):
+        raise TypeError
+    return value
+
+
+def _datetime(value):
+    return datetime.fromisoformat(value)
+
+
+def _id_list(value):
+    return [_int(v) for v in value]
+
+
+def _upgrade_v1(data):
+    data = dict(data)
+    closed_by = data.get('closed_by')
+    if isinstance(closed_by, str):
+        data['closed_by'] = int(closed_by) if closed_by.isdigit() else None
+        data['closed_by_name'] = closed_by
+    # Written by nothing, read by an old delete log; the ticket number is what was meant
+    data.pop('ticket_id', None)
+    return data
+
+
+_FIELDS = fields(Ticket)
+_NAMES = tuple(f.name for f in _FIELDS)
+_values = operator.attrgetter(*_NAMES)
+_REQUIRED = ('ticket_number', 'channel_id', 'status', 'created_at')
+_TYPES = {f.name: int for f in _FIELDS}
+_TYPES.update({
+    'user_name': str, 'status': str, 'reason': str, 'closed_by_name': str,
+    'transcript_file': str, 'transcript_url': str, 'reconciled': str,
+    'created_at': datetime, 'closed_at': datetime, 'reopened_at': datetime, 'archived_at': datetime,
+    'added_users': list,
+})
+_DATES = frozenset(name for name, kind in _TYPES.items() if kind is datetime)
+_DATE_SLOTS = tuple(i for i, name in enumerate(_NAMES) if name in _DATES)
+_PARSERS = {int: _int, str: _str, datetime: _datetime, list: _id_list}
@@ -0,0 +1,445 @@
+import asyncio
+import gc
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from contextlib import contextmanager
+
+from utils import metrics
+from utils.ticket_index import TicketIndex
+from utils.ticket_model import SCHEMA_VERSION, Ticket
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+HOT_PATH = 'data/tickets.json'
+SNAPSHOT_PATH = 'data/tickets.bin'
+COLD_PATH = 'data/tickets_archive.ndjson'
+REJECTED_PATH = 'data/tickets_rejected.ndjson'
+
+
+class TicketStore:
+    """Ticket records split into a hot set kept in memory and a cold, append-only archive.
+
+    The hot set holds every ticket that still has a channel (open or closed) and is
+    persisted to data/tickets.json, so it is bounded by the guild's channel count
+    rather than by lifetime tickets:
+
+        {"schema": 2, "tickets": [{"ticket_number": 12, "channel_id": 1395..., ...}, ...]}
+
+    With `binary=True` the hot set is saved as a pickled snapshot of field tuples in
+    data/tickets.bin instead, which is several times faster to load and save; whichever
+    of the two files is newer is loaded, so switching formats needs no migration.
+
+    Archived tickets move to data/tickets_archive.ndjson, one line per record version:
+
+        {"v": 2, "t": {...ticket...}}
+        {"k": "1395...", "d": 1}               (removed, e.g. promoted back to hot)
+
+    The id -> offset index over the archive, and the ticket number -> id map
+    next to it, are only built when history is first queried; until then the
+    archive is never read. The listing index (by status,
+    owner and creation time, see TicketIndex) is built by `build_listing()` in a
+    worker thread, started when the bot loads, and kept up to date from then on.
+    `page()` before that finishes builds it on the spot.
+
+    With `read_only` loading never writes: an older schema is upgraded in memory
+    only and rejected records are just logged. Tools reading the data next to a
+    running bot (the export CLI) use it; the store must not be modified then.
+    """
+
+    def __init__(self, hot_path=HOT_PATH, cold_path=COLD_PATH, binary=False, snapshot_path=SNAPSHOT_PATH, read_only=False):
+        self.hot_path = hot_path
+        self.cold_path = cold_path
+        self.snapshot_path = snapshot_path
+        self.binary = binary
+        self.read_only = read_only
+        self.hot = self._load_hot()
+        self._index = None
+        self._numbers = None   # ticket number -> key of its latest archive line, built with _index
+        self._listing = None
+        self._listing_task = None
+        self._touched = None   # key -> ticket (None if removed) changed while the listing is built
+
+    # --- Hot set ---
+    def _load_hot(self):
+        start = time.perf_counter()
+        tickets = None
+        if _mtime(self.snapshot_path) > _mtime(self.hot_path):
+            tickets = self._load_snapshot()
+        if tickets is None:
+            tickets = self._load_json()
+        metrics.STORE_SECONDS.labels('tickets', 'load').observe(time.perf_counter() - start)
+        return tickets
+
+    def _load_snapshot(self):
+        try:
+            with span('load_tickets'), _gc_paused():
+                with open(self.snapshot_path, 'rb') as f:
+                    version, rows = pickle.load(f)
+                if version != SCHEMA_VERSION:
+                    raise ValueError(f"snapshot has schema {version}, expected {SCHEMA_VERSION}")
+                return {ticket.key: ticket for ticket in map(Ticket.from_tuple, rows)}
+        except Exception as e:
+            logger.error("Error loading ticket snapshot %s, falling back to %s: %s", self.snapshot_path, self.hot_path, e)
+            return None
+
+    def _load_json(self):
+        try:
+            with span('load_tickets'), _gc_paused():
+                with open(self.hot_path, 'r') as f:
+                    data = json.load(f)
+                return self._parse(data)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error("Error loading tickets: %s", e)
+            return {}
+
+    def _parse(self, data):
+        if isinstance(data, dict) and 'schema' in data:
+            version, records = data['schema'], data['tickets']
+        else:
+            # Schema 1: a bare object of channel id -> record
+            version, records = 1, list(data.values())
+
+        tickets = {}
+        for record in records:
+            try:
+                ticket = Ticket.from_dict(record, version)
+            except ValueError as e:
+                if self.read_only:
+                    logger.error("Skipping invalid ticket record (%s): %s", e, record)
+                    continue
+                logger.error("Rejected invalid ticket record (%s), kept in %s: %s", e, REJECTED_PATH, record)
+                _append_rejected(record)
+                continue
+            tickets[ticket.key] = ticket
+
+        if version < SCHEMA_VERSION and self.read_only:
+            logger.warning("%s has schema %d, read as %d without upgrading it", self.hot_path, version, SCHEMA_VERSION)
+        elif version < SCHEMA_VERSION:
+            backup = f"{self.hot_path}.v{version}.bak"
+            shutil.copyfile(self.hot_path, backup)
+            self.hot = tickets
+            self.save()
+            logger.info("Upgraded %s from schema %d to %d (backup in %s)", self.hot_path, version, SCHEMA_VERSION, backup)
+        return tickets
+
+    def save(self):
+        """Persist the hot set"""
+        try:
+            start = time.perf_counter()
+            with span('save_tickets'), _gc_paused():
+                if self.binary:
+                    rows = [t.to_tuple() for t in self.hot.values()]
+                    with open(self.snapshot_path, 'wb') as f:
+                        pickle.dump((SCHEMA_VERSION, rows), f, protocol=pickle.HIGHEST_PROTOCOL)
+                else:
+                    # One dumps() and one write; json.dump() writes every token separately
+                    data = json.dumps({'schema': SCHEMA_VERSION, 'tickets': [t.to_dict() for t in self.hot.values()]}, separators=(',', ':'))
+                    with open(self.hot_path, 'w') as f:
+                        f.write(data)
+            metrics.STORE_SECONDS.labels('tickets', 'save').observe(time.perf_counter() - start)
+        except Exception as e:
+            logger.error("Error saving tickets: %s", e)
+
+    def add(self, ticket):
+        self.hot[ticket.key] = ticket
+        self._listed(ticket)
+
+    def update(self, ticket):
+        """Re-index a ticket whose status changed in place"""
+        self._listed(ticket)
+
+    # --- Lookups across both partitions ---
+    def get(self, key):
+        """Return a ticket by channel id, looking in the archive if it isn't hot"""
+        key = str(key)
+        ticket = self.hot.get(key)
+        if ticket is None:
+            ticket = self._read_cold(key)
+        return ticket
+
+    def by_number(self, ticket_number):
+        """Return the ticket with a ticket number, hot first, reading at most one archive line"""
+        for ticket in self.hot.values():
+            if ticket.ticket_number == ticket_number:
+                return ticket
+        self._load_index()
+        key = self._numbers.get(ticket_number)
+        # Removed lines leave the number behind; _read_cold() finds nothing for those
+        return self._read_cold(key) if key is not None else None
+
+    def find(self, predicate):
+        """Return the first ticket matching predicate, hot tickets first"""
+        for ticket in self.hot.values():
+            if predicate(ticket):
+                return ticket
+        for ticket in self.history():
+            if predicate(ticket):
+                return ticket
+        return None
+
+    def history(self):
+        """Yield every archived ticket, in one sequential read of the archive"""
+        for _, ticket in self.scan_archive():
+            if ticket is not None:
+                yield ticket
+
+    def scan_archive(self, start=0):
+        """Yield (offset after the line, ticket) for each archive line from byte `start` on.
+
+        The ticket is None for lines that were superseded or removed, so callers
+        can still track their position. Lines are read one at a time.
+        """
+        index = self._load_index()
+        try:
+            with open(self.cold_path, 'rb') as f:
+                f.seek(start)
+                offset = start
+                for line in f:
+                    ticket = None
+                    record = json.loads(line)
+                    if 'd' not in record and index.get(record.get('k') or str(record['t']['channel_id'])) == offset:
+                        try:
+                            ticket = Ticket.from_dict(record['t'], record.get('v', 1))
+                        except ValueError as e:
+                            logger.error("Skipping invalid archived ticket at offset %d: %s", offset, e)
+                    offset += len(line)
+                    yield offset, ticket
+        except FileNotFoundError:
+            return
+
+    def all(self):
+        """Yield every ticket, hot and archived"""
+        yield from list(self.hot.values())
+        yield from self.history()
+
+    # --- Listing ---
+    def page(self, status=None, user_id=None, cursor=None, limit=10, newest_first=True):
+        """Return (tickets, next cursor or None): one page by status or owner, ordered by creation time.
+
+        `cursor` is the value returned with the previous page, or a `(datetime,)`
+        tuple to start from a date. Costs O(log n + limit) once the index exists.
+        """
+        keys, cursor = self._listing_index().page(status, user_id, cursor, limit, newest_first)
+        tickets = [self.hot.get(key) or self._read_cold(key) for key in keys]
+        return [t for t in tickets if t is not None], cursor
+
+    def count(self, status=None, user_id=None):
+        return self._listing_index().count(status, user_id)
+
+    def build_listing(self):
+        """Start building the listing index in a worker thread; returns the task, or None once built"""
+        if self._listing is None and self._listing_task is None:
+            self._listing_task = asyncio.create_task(self._build_listing())
+        return self._listing_task
+
+    async def listing_ready(self):
+        """Wait until `page()` no longer has to build the listing index on the event loop"""
+        task = self.build_listing()
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def _build_listing(self):
+        # The thread reads only the archive, up to its current end, and never this
+        # object's state; changes made meanwhile are collected in _touched and
+        # replayed on top once it is done
+        self._touched = {}
+        try:
+            start = time.perf_counter()
+            with span('index_listing'):
+                size = _size(self.cold_path)
+                listing, (index, numbers) = await asyncio.to_thread(_index_archive, self.cold_path, size, set(self.hot))
+                if self._listing is not None:
+                    return   # page() got there first
+                listing.build(t for t in self.hot.values() if t.key not in self._touched and t.key not in listing)
+                for key, ticket in self._touched.items():
+                    listing.remove(key)
+                    if ticket is not None:
+                        listing.put(ticket)
+            if self._index is None and _size(self.cold_path) == size:
+                self._index, self._numbers = index, numbers
+            self._listing = listing
+            metrics.STORE_SECONDS.labels('tickets', 'index').observe(time.perf_counter() - start)
+        except Exception as e:
+            logger.error("Error building the ticket listing index, it will be built on first use: %s", e)
+        finally:
+            self._touched = None
+            self._listing_task = None
+
+    def _listing_index(self):
+        if self._listing is None:
+            start = time.perf_counter()
+            with span('index_listing'):
+                listing = TicketIndex()
+                listing.build(self.hot.values())
+                listing.build(t for t in self.history() if t.key not in self.hot)
+            metrics.STORE_SECONDS.labels('tickets', 'index').observe(time.perf_counter() - start)
+            self._listing = listing
+        return self._listing
+
+    def _listed(self, ticket):
+        if self._listing is not None:
+            self._listing.put(ticket)
+        elif self._touched is not None:
+            self._touched[ticket.key] = ticket
+
+    def _unlisted(self, key):
+        if self._listing is not None:
+            self._listing.remove(key)
+        elif self._touched is not None:
+            self._touched[key] = None
+
+    # --- Moving records between partitions ---
+    def demote(self, keys=None):
+        """Move archived tickets (or the given keys) from the hot set to the archive"""
+        if keys is None:
+            keys = [key for key, ticket in self.hot.items() if ticket.status == 'archived']
+        tickets = [self.hot.pop(key) for key in keys if key in self.hot]
+        if not tickets:
+            return 0
+        self._append([{'v': SCHEMA_VERSION, 't': ticket.to_dict()} for ticket in tickets])
+        for ticket in tickets:
+            self._listed(ticket)
+        self.save()
+        return len(tickets)
+
+    def discard(self, key):
+        """Remove a ticket from whichever partition holds it"""
+        key = str(key)
+        self._unlisted(key)
+        if self.hot.pop(key, None) is not None:
+            return True
+        if key in self._load_index():
+            self._append([{'k': key, 'd': 1}])
+            return True
+        return False
+
+    # --- Archive file ---
+    def _append(self, lines):
+        start = time.perf_counter()
+        with span('append_archive'), open(self.cold_path, 'ab') as f:
+            for line in lines:
+                offset = f.tell()
+                f.write(json.dumps(line, separators=(',', ':')).encode('utf-8') + b"\n")
+                if self._index is not None:
+                    if 'd' in line:
+                        self._index.pop(line['k'], None)
+                    else:
+                        key = str(line['t']['channel_id'])
+                        self._index[key] = offset
+                        self._numbers[line['t']['ticket_number']] = key
+        metrics.STORE_SECONDS.labels('archive', 'append').observe(time.perf_counter() - start)
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+        start = time.perf_counter()
+        with span('index_archive'):
+            index, self._numbers = _read_offsets(self.cold_path)
+        metrics.STORE_SECONDS.labels('archive', 'index').observe(time.perf_counter() - start)
+        self._index = index
+        return index
+
+    def _read_cold(self, key):
+        offset = self._load_index().get(key)
+        if offset is None:
+            return None
+        with open(self.cold_path, 'rb') as f:
+            f.seek(offset)
+            record = json.loads(f.readline())
+        try:
+            return Ticket.from_dict(record['t'], record.get('v', 1))
+        except ValueError as e:
+            logger.error("Skipping invalid archived ticket %s: %s", key, e)
+            return None
+
+
+def _read_offsets(path, size=None):
+    """(key -> offset of the live line for every archived ticket, ticket number -> key), reading at most `size` bytes"""
+    index = {}
+    numbers = {}
+    try:
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if size is not None and offset + len(line) > size:
+                    break
+                record = json.loads(line)
+                if 'd' in record:
+                    index.pop(record['k'], None)
+                else:
+                    key = record.get('k') or str(record['t']['channel_id'])
+                    index[key] = offset
+                    try:
+                        numbers[int(record['t']['ticket_number'])] = key
+                    except (KeyError, TypeError, ValueError):
+                        pass   # Rejected by Ticket.from_dict when read anyway
+                offset += len(line)
+    except FileNotFoundError:
+        pass
+    return index, numbers
+
+
+def _index_archive(path, size, skip):
+    """(listing of the archived tickets not in `skip`, _read_offsets()) from the first `size` bytes; runs in a thread"""
+    offsets = _read_offsets(path, size)
+    index = offsets[0]
+    listing = TicketIndex()
+
+    def archived():
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if offset + len(line) > size:
+                    break
+                record = json.loads(line)
+                key = 'd' not in record and (record.get('k') or str(record['t']['channel_id']))
+                if key and key not in skip and index.get(key) == offset:
+                    try:
+                        yield Ticket.from_dict(record['t'], record.get('v', 1))
+                    except ValueError as e:
+                        logger.error("Skipping invalid archived ticket at offset %d: %s", offset, e)
+                offset += len(line)
+
+    try:
+        listing.build(archived())
+    except FileNotFoundError:
+        pass
+    return listing, offsets
+
+
+@contextmanager
+def _gc_paused():
+    """Bulk loads allocate hundreds of thousands of objects and none of them are garbage; skip the cyclic collector meanwhile"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _append_rejected(record):
+    with open(REJECTED_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, default=str) + "\n")
@@ -0,0 +1,203 @@
+import contextvars
+import random
+import time
+import logging
+from collections import deque
+from functools import wraps
+
+import discord
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Discord invalidates an interaction that isn't acknowledged within 3 seconds
+ACK_DEADLINE = 3.0
+# Handlers slower than this are always logged and kept
+SLOW_HANDLER_THRESHOLD = 1.0
+# Share of healthy traces kept in the ring buffer
+SAMPLE_RATE = 0.1
+BUFFER_SIZE = 256
+
+_current_trace = contextvars.ContextVar('ucrp_current_trace', default=None)
+_buffer = deque(maxlen=BUFFER_SIZE)
+
+SLOW_INTERACTIONS = metrics.Counter(
+    "ucrp_slow_interactions", "Interaction handlers that were slow or expired", ("handler", "reason")
+)
+
+
+class Trace:
+    __slots__ = (
+        'handler', 'interaction_id', 'user_id', 'channel_id', 'created_at',
+        'started', 'started_wall', 'acked', 'finished', 'spans', 'error', 'expired'
+    )
+
+    def __init__(self, handler, interaction):
+        self.handler = handler
+        self.interaction_id = interaction.id
+        self.user_id = interaction.user.id if interaction.user else None
+        self.channel_id = interaction.channel_id
+        self.created_at = interaction.created_at.timestamp()
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        self.acked = None
+        self.finished = None
+        self.spans = []
+        self.error = None
+        self.expired = False
+
+    def add_span(self, kind, name, start, end, **fields):
+        span = {
+            'kind': kind,
+            'name': name,
+            'start_ms': round((start - self.started) * 1000, 2),
+            'duration_ms': round((end - start) * 1000, 2)
+        }
+        span.update(fields)
+        self.spans.append(span)
+
+    @property
+    def duration(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def time_to_ack(self):
+        return None if self.acked is None else self.acked - self.started
+
+    def to_dict(self):
+        time_to_ack = self.time_to_ack
+        return {
+            'handler': self.handler,
+            'interaction_id': self.interaction_id,
+            'user_id': self.user_id,
+            'channel_id': self.channel_id,
+            'started_at': self.started_wall,
+            # Time between Discord creating the interaction and the handler starting
+            'queue_ms': round((self.started_wall - self.created_at) * 1000, 2),
+            'time_to_ack_ms': None if time_to_ack is None else round(time_to_ack * 1000, 2),
+            'duration_ms': round(self.duration * 1000, 2),
+            'expired': self.expired,
+            'error': self.error,
+            'spans': self.spans
+        }
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add_span('store', self.name, self.start, time.perf_counter())
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name):
+    """Time a block as part of the current interaction trace, if there is one"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+def traced(func):
+    """Trace a button, modal or app command handler that receives a discord.Interaction"""
+    handler_name = func.__qualname__
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        interaction = next((arg for arg in args if isinstance(arg, discord.Interaction)), None)
+        if interaction is None:
+            return await func(*args, **kwargs)
+
+        trace = Trace(handler_name, interaction)
+        token = _current_trace.set(trace)
+        try:
+            return await func(*args, **kwargs)
+        except discord.NotFound as e:
+            # 10062: Unknown interaction - we missed the acknowledgement deadline
+            if e.code == 10062:
+                trace.expired = True
+            trace.error = repr(e)
+            raise
+        except Exception as e:
+            trace.error = repr(e)
+            raise
+        finally:
+            _current_trace.reset(token)
+            trace.finished = time.perf_counter()
+            _finish(trace)
+
+    return wrapper
+
+
+def _finish(trace):
+    if trace.acked is not None and trace.started_wall + trace.time_to_ack - trace.created_at > ACK_DEADLINE:
+        trace.expired = True
+
+    reason = None
+    if trace.expired:
+        reason = 'expired'
+    elif trace.duration > SLOW_HANDLER_THRESHOLD:
+        reason = 'slow'
+    elif trace.error:
+        reason = 'error'
+
+    if reason:
+        SLOW_INTERACTIONS.labels(trace.handler, reason).inc()
+        data = trace.to_dict()
+        _buffer.append(data)
+        logger.warning("Slow interaction %s (%s)", trace.handler, reason, extra={'trace': data})
+    elif random.random() < SAMPLE_RATE:
+        _buffer.append(trace.to_dict())
+
+
+def dump(slow_only=False):
+    """Return the buffered traces, newest last"""
+    traces = list(_buffer)
+    if slow_only:
+        traces = [t for t in traces if t['expired'] or t['error'] or t['duration_ms'] > SLOW_HANDLER_THRESHOLD * 1000]
+    return traces
+
+
+# === Discord HTTP spans ===
+async def _on_request_start(session, context, params):
+    context.trace_start = time.perf_counter()
+
+
+async def _on_request_end(session, context, params):
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    end = time.perf_counter()
+    route = metrics.normalize_route(params.url.path)
+    trace.add_span('discord', f"{params.method} {route}", context.trace_start, end, status=params.response.status)
+    if trace.acked is None and route.startswith('/interactions/') and route.endswith('/callback'):
+        trace.acked = end
+
+
+def install_http_trace(trace_config):
+    """Record Discord HTTP calls made while handling a traced interaction"""
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    return trace_config
@@ -0,0 +1,171 @@
+import gzip
+import hashlib
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import logging
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Persistent button custom_ids that mean the same thing on every run
+STABLE_CUSTOM_IDS = {'create_ticket', 'close_ticket', 'add_user', 'remove_user', 'delete_ticket'}
+_MENTION = re.compile(r'^<@!?(\d+)>$')
+
+FORMAT_VERSION = 1
+
+
+class TrafficRecorder:
+    """Opt-in recorder of anonymized interactions and messages for offline replay.
+
+    Records are newline-delimited JSON in a gzip file, written by a background thread:
+
+        {"t": 12.345, "e": "i", "k": "component", "cid": "close_ticket", "u": 3, "c": 7, "ck": "ticket", "s": 1}
+        {"t": 12.9, "e": "i", "k": "modal", "u": 3, "c": 7, "ck": "other", "f": [{"n": 42}]}
+        {"t": 13.2, "e": "m", "u": 5, "c": 2, "ck": "monitored", "n": 17, "h": "9f2c01ab", "a": 0}
+
+    `t` is seconds since recording started. User and channel ids are replaced by
+    small per-recording pseudonyms and message content by its length and a salted hash,
+    so a recording contains nothing that identifies people or what they wrote.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._salt = secrets.token_bytes(16)
+        self._pseudonyms = {}
+        self._started = time.monotonic()
+        self._queue = queue.SimpleQueue()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, name="traffic-recorder", daemon=True)
+        self._thread.start()
+        self._put({'e': 'header', 'v': FORMAT_VERSION, 'started_at': time.time()})
+        logger.info("Recording anonymized traffic to %s", path)
+
+    @classmethod
+    def from_env(cls, variable="RECORD_TRAFFIC"):
+        """Return a recorder if the environment variable names an output file"""
+        path = os.getenv(variable)
+        return cls(path) if path else None
+
+    # --- Recording ---
+    def record_interaction(self, interaction, channel_kind, is_staff):
+        data = interaction.data or {}
+        record = {
+            'e': 'i',
+            'u': self._pseudonym(interaction.user.id),
+            'c': self._pseudonym(interaction.channel_id),
+            'ck': channel_kind
+        }
+        if is_staff:
+            record['s'] = 1
+
+        if interaction.type == discord.InteractionType.component:
+            record['k'] = 'component'
+            custom_id = data.get('custom_id')
+            if custom_id in STABLE_CUSTOM_IDS:
+                record['cid'] = custom_id
+            else:
+                record['label'] = self._component_label(interaction.message, custom_id)
+        elif interaction.type == discord.InteractionType.modal_submit:
+            record['k'] = 'modal'
+            record['f'] = [self._field(component) for row in data.get('components', []) for component in row.get('components', [])]
+        elif interaction.type == discord.InteractionType.application_command:
+            record['k'] = 'command'
+            record['name'] = data.get('name')
+            record['opts'] = {option['name']: self._option(option) for option in data.get('options', [])}
+        else:
+            return
+        self._put(record)
+
+    def record_message(self, message, channel_kind, is_staff):
+        content = message.content or ""
+        record = {
+            'e': 'm',
+            'u': self._pseudonym(message.author.id),
+            'c': self._pseudonym(message.channel.id),
+            'ck': channel_kind,
+            'n': len(content),
+            'h': self._hash(content),
+            'a': len(message.attachments)
+        }
+        if is_staff:
+            record['s'] = 1
+        self._put(record)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    # --- Anonymization ---
+    def _pseudonym(self, real_id):
+        if real_id is None:
+            return None
+        pseudonym = self._pseudonyms.get(real_id)
+        if pseudonym is None:
+            pseudonym = self._pseudonyms[real_id] = len(self._pseudonyms) + 1
+        return pseudonym
+
+    def _hash(self, content):
+        return hashlib.blake2b(content.encode('utf-8'), key=self._salt, digest_size=4).hexdigest()
+
+    def _field(self, component):
+        value = component.get('value') or ""
+        field = {'n': len(value)}
+        stripped = value.strip()
+        if stripped.upper() == "DELETE":
+            # Confirmation keywords carry no personal data and decide what the handler does
+            field['v'] = stripped
+        else:
+            match = _MENTION.match(stripped)
+            if match or stripped.isdigit():
+                field['ref'] = self._pseudonym(int(match.group(1) if match else stripped))
+        return field
+
+    def _option(self, option):
+        # Option types 6/7/9 are user, channel and mentionable ids
+        if option.get('type') in (6, 7, 9):
+            return {'ref': self._pseudonym(int(option['value']))}
+        value = option.get('value')
+        if isinstance(value, bool):
+            return {'v': value}
+        return {'n': len(str(value))}
+
+    @staticmethod
+    def _component_label(message, custom_id):
+        if message is None:
+            return None
+        for row in message.components:
+            for component in getattr(row, 'children', []):
+                if getattr(component, 'custom_id', None) == custom_id:
+                    return component.label
+        return None
+
+    # --- Output ---
+    def _put(self, record):
+        record.setdefault('t', round(time.monotonic() - self._started, 4))
+        self._queue.put(record)
+
+    def _writer(self):
+        with gzip.open(self.path, 'at', encoding='utf-8') as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                f.write(json.dumps(record, separators=(',', ':')) + "\n")
+                # Flush whenever the queue runs dry so a crash loses little
+                if self._queue.empty():
+                    f.flush()
+
+
+def load_recording(path):
+    """Yield the records of a recording, skipping the header"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('e') != 'header':
+                yield record
@@ -0,0 +1,131 @@
+import asyncio
+import io
+import logging
+from dataclasses import dataclass
+
+import discord
+
+from utils import metrics
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+RETRIES = 3           # Attempts per recipient
+RETRY_BACKOFF = 1.0   # Seconds before the second attempt, doubled after each failure
+UPLOAD_WAIT = 10.0    # Seconds to wait for an upload made elsewhere before uploading again
+
+TRANSCRIPT_DELIVERIES = metrics.Counter(
+    "ucrp_transcript_deliveries", "Transcript deliveries by recipient kind and outcome", ("recipient", "outcome")
+)
+
+
+@dataclass
+class Recipient:
+    """Somewhere a transcript goes: a channel or a member (DM) and the embed that goes with it"""
+
+    kind: str            # 'log', 'owner' or 'added_user', for metrics and logs
+    destination: discord.abc.Messageable
+    embed: discord.Embed
+
+
+class TranscriptDelivery:
+    """Sends one transcript to several recipients at once, uploading the file only once.
+
+    The file is read into memory a single time. The first recipient uploads it
+    (or `uploaded`, an upload already on its way such as the audit log's, resolves
+    to its URL); the others are sent concurrently and wait only for that upload,
+    then get an embed linking to the uploaded attachment. If the upload fails for
+    good, the next recipient uploads the shared bytes itself. Each send is retried
+    on transient errors; a member with closed DMs is not retried.
+    """
+
+    def __init__(self, retries=RETRIES, backoff=RETRY_BACKOFF, upload_wait=UPLOAD_WAIT):
+        self.retries = retries
+        self.backoff = backoff
+        self.upload_wait = upload_wait
+
+    async def deliver(self, transcript_file, filename, recipients, uploaded=None):
+        """Send to every recipient; returns {kind: [outcome, ...]} with 'uploaded', 'linked' or 'failed'"""
+        with span('read_transcript'), open(transcript_file, 'rb') as f:
+            data = f.read()
+
+        outcomes = {}
+        upload = _Upload()
+        first = 0
+        waiters = []
+        if uploaded is not None:
+            first = 1
+            waiters.append(self._wait_for_upload(uploaded, upload))
+        results = await asyncio.gather(*waiters, *(self._send(recipient, data, filename, upload, first + i) for i, recipient in enumerate(recipients)))
+        results = results[first:]
+        for recipient, outcome in zip(recipients, results):
+            TRANSCRIPT_DELIVERIES.labels(recipient.kind, outcome).inc()
+            outcomes.setdefault(recipient.kind, []).append(outcome)
+        return outcomes
+
+    async def _wait_for_upload(self, uploaded, upload):
+        try:
+            url = await asyncio.wait_for(asyncio.shield(uploaded), timeout=self.upload_wait)
+        except (asyncio.TimeoutError, discord.HTTPException):
+            url = None
+        upload.done(0, url)
+
+    async def _send(self, recipient, data, filename, upload, position):
+        # Wait for every recipient ahead in line to either upload or give up
+        url = await upload.wait(position)
+        if url is not None:
+            embed = recipient.embed.copy()
+            embed.add_field(name="🗂️ Transcript", value=f"[Download {filename}]({url})", inline=False)
+            return await self._attempt(recipient, lambda: recipient.destination.send(embed=embed), upload, position, 'linked')
+
+        async def send_file():
+            return await recipient.destination.send(embed=recipient.embed, file=discord.File(io.BytesIO(data), filename=filename))
+        return await self._attempt(recipient, send_file, upload, position, 'uploaded')
+
+    async def _attempt(self, recipient, send, upload, position, outcome):
+        delay = self.backoff
+        for attempt in range(1, self.retries + 1):
+            try:
+                message = await send()
+            except discord.Forbidden:
+                logger.info("Can't send transcript to %s %s, DMs are closed or access is missing", recipient.kind, recipient.destination)
+                break
+            except (discord.HTTPException, OSError, asyncio.TimeoutError) as e:
+                if attempt == self.retries or (isinstance(e, discord.HTTPException) and 400 <= e.status < 500 and e.status != 429):
+                    logger.warning("Failed to send transcript to %s %s after %d attempt(s): %s", recipient.kind, recipient.destination, attempt, e)
+                    break
+                await asyncio.sleep(delay)
+                delay *= 2
+            else:
+                if outcome == 'uploaded':
+                    upload.done(position, message.attachments[0].url if message.attachments else None)
+                else:
+                    upload.skip(position)
+                return outcome
+        upload.skip(position)
+        return 'failed'
+
+
+class _Upload:
+    """The first successful upload's URL, handed down the line of recipients in order"""
+
+    def __init__(self):
+        self.url = None
+        self._turn = 0
+        self._changed = asyncio.Event()
+
+    async def wait(self, position):
+        while self.url is None and self._turn < position:
+            await self._changed.wait()
+        return self.url
+
+    def done(self, position, url):
+        if url is not None and self.url is None:
+            self.url = url
+        self.skip(position)
+
+    def skip(self, position):
+        """This recipient is finished without producing a URL; let the next one upload"""
+        self._turn = max(self._turn, position + 1)
+        self._changed.set()
+        self._changed.clear()
@@ -0,0 +1,166 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from collections import deque
+
+import discord
+
+from utils import metrics
+from utils.config import config_service
+
+logger = logging.getLogger(__name__)
+
+POOL_PREFIX = 'pool-'
+POOL_TOPIC = "Unclaimed ticket channel"
+RATE_HALF_LIFE = 600.0   # Seconds for the creation-rate estimate to halve once tickets stop coming
+COVER_SECONDS = 120.0    # Keep enough channels ready for this long at the recent creation rate
+
+WARM_POOL_CHANNELS = metrics.Gauge(
+    "ucrp_warm_pool_channels", "Pre-created ticket channels ready to be claimed"
+)
+WARM_POOL_CLAIMS = metrics.Counter(
+    "ucrp_warm_pool_claims", "Ticket creations by whether a warm channel was ready", ("outcome",)
+)
+
+
+class WarmChannelPool:
+    """Pre-created, hidden channels in the ticket categories, claimed by new tickets.
+
+    Claiming a channel costs one edit (name, topic and overwrites together)
+    instead of a channel creation on the user's critical path. The pool is
+    refilled in the background to a target that follows the recent creation
+    rate (an exponentially decayed count of claims), between one channel and
+    `warm_pool_size` from the config, which also turns the pool off at 0.
+
+    Pool channels are recognised by their `pool-` name, so after a restart
+    they are adopted back rather than left behind; the reconciler leaves them
+    alone since they don't carry the ticket prefix.
+    """
+
+    def __init__(self, category_pool):
+        self.category_pool = category_pool
+        self._channels = deque()
+        self._names = itertools.count(1)
+        self._rate = 0.0          # Ticket creations per second, decayed
+        self._rate_at = None
+        self._adopted = False
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._channels)
+
+    def __contains__(self, channel_id):
+        return any(channel.id == channel_id for channel in self._channels)
+
+    # --- Sizing ---
+    def rate(self, now=None):
+        if self._rate_at is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return self._rate * 0.5 ** ((now - self._rate_at) / RATE_HALF_LIFE)
+
+    def record_creation(self, now=None):
+        """Count a ticket creation towards the rate estimate, claimed or not"""
+        now = time.monotonic() if now is None else now
+        self._rate = self.rate(now) + math.log(2) / RATE_HALF_LIFE
+        self._rate_at = now
+
+    def target(self, now=None):
+        limit = config_service.current.warm_pool_size
+        if limit <= 0:
+            return 0
+        return max(1, min(limit, math.ceil(self.rate(now) * COVER_SECONDS)))
+
+    # --- Claiming ---
+    def claim(self, guild):
+        """Take a ready channel out of the pool, or None if there is none"""
+        while self._channels:
+            channel = self._channels.popleft()
+            if guild.get_channel(channel.id) is not None:
+                WARM_POOL_CLAIMS.labels("hit").inc()
+                WARM_POOL_CHANNELS.set(len(self._channels))
+                return channel
+        if config_service.current.warm_pool_size > 0:
+            WARM_POOL_CLAIMS.labels("miss").inc()
+        WARM_POOL_CHANNELS.set(0)
+        return None
+
+    def give_back(self, channel):
+        """Return a claimed channel whose edit failed without changing it"""
+        self._channels.appendleft(channel)
+        WARM_POOL_CHANNELS.set(len(self._channels))
+
+    # --- Background upkeep ---
+    async def refill(self, guild, target=None, shrink=True):
+        """Adopt leftover pool channels once, then create or remove channels to meet the target.
+
+        `target` overrides the demand-based size, e.g. to fill the pool ahead of an expected rush.
+        Refills right after a claim pass `shrink=False`: during a rush the rate estimate lags
+        behind, and deleting channels that are about to be claimed would only cost more calls.
+        """
+        async with self._lock:
+            if not self._adopted:
+                self._adopt(guild)
+            target = self.target() if target is None else target
+            while len(self._channels) < target:
+                if not await self._create(guild):
+                    break
+            # Shrink slowly once the rate drops, one channel per refill
+            if shrink and len(self._channels) > target:
+                await self._remove(guild, self._channels.pop())
+            WARM_POOL_CHANNELS.set(len(self._channels))
+
+    def _adopt(self, guild):
+        known = {channel.id for channel in self._channels}
+        for category_id in self.category_pool.category_ids:
+            category = guild.get_channel(category_id)
+            if not isinstance(category, discord.CategoryChannel):
+                continue
+            for channel in category.channels:
+                if channel.name.startswith(POOL_PREFIX) and channel.id not in known:
+                    self._channels.append(channel)
+        self._adopted = True
+        if self._channels:
+            logger.info("Adopted %d warm pool channels", len(self._channels))
+
+    async def _create(self, guild):
+        category = await self.category_pool.acquire(guild)
+        if category is None:
+            return False
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            guild.me: discord.PermissionOverwrite(
+                read_messages=True,
+                send_messages=True,
+                manage_messages=True,
+                attach_files=True,
+                embed_links=True
+            )
+        }
+        try:
+            channel = await guild.create_text_channel(
+                name=f"{POOL_PREFIX}{next(self._names)}",
+                category=category,
+                overwrites=overwrites,
+                topic=POOL_TOPIC
+            )
+        except discord.HTTPException as e:
+            await self.category_pool.release(guild, category.id)
+            logger.warning("Failed to create a warm pool channel: %s", e)
+            return False
+        self._channels.append(channel)
+        return True
+
+    async def _remove(self, guild, channel):
+        category_id = channel.category_id
+        try:
+            await channel.delete(reason="Shrinking the warm ticket channel pool")
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            self._channels.append(channel)
+            logger.warning("Failed to remove a warm pool channel: %s", e, extra={'channel_id': channel.id})
+            return
+        await self.category_pool.release(guild, category_id)
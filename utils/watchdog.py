@@ -0,0 +1,145 @@
+import asyncio
+import math
+import sys
+import threading
+import time
+import traceback
+import logging
+from collections import deque
+from datetime import datetime
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_SECONDS = metrics.Histogram(
+    "ucrp_event_loop_lag_seconds", "Event loop scheduling lag",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+LOOP_LAG_QUANTILES = metrics.Gauge(
+    "ucrp_event_loop_lag_quantile_seconds", "Event loop lag percentiles over the recent window", ("quantile",)
+)
+LOOP_STALLS = metrics.Counter(
+    "ucrp_event_loop_stalls", "Times the event loop was blocked past the stall threshold"
+)
+GATEWAY_LATENCY = metrics.Gauge(
+    "ucrp_gateway_latency_seconds", "Discord gateway heartbeat latency (bot.latency)"
+)
+
+
+class LoopWatchdog:
+    """Measures event loop lag and dumps the blocking stack when the loop stalls"""
+
+    def __init__(self, bot, interval=0.1, stall_threshold=0.5, window=600, log_path='data/diagnostics.log'):
+        self.bot = bot
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.log_path = log_path
+        self.samples = deque(maxlen=window)
+        self.running = False
+
+        self._loop_thread_id = None
+        self._last_tick = None
+        self._task = None
+        self._thread = None
+        self._stalled_since = None
+
+    def start(self):
+        """Start the probe task on the running loop and the monitor thread"""
+        if self.running:
+            return
+        self.running = True
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.perf_counter()
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info("Event loop watchdog started")
+
+    def stop(self):
+        self.running = False
+        if self._task:
+            self._task.cancel()
+
+    def percentiles(self):
+        """Return lag percentiles (in seconds) over the recent window"""
+        samples = sorted(self.samples)
+        if not samples:
+            return {}
+        last = len(samples) - 1
+        return {
+            'p50': samples[int(last * 0.50)],
+            'p90': samples[int(last * 0.90)],
+            'p99': samples[int(last * 0.99)],
+            'max': samples[-1]
+        }
+
+    def note(self, event, **fields):
+        """Write a diagnostics entry together with the current lag and gateway figures"""
+        fields['lag'] = {k: round(v * 1000, 2) for k, v in self.percentiles().items()}
+        fields['gateway_latency_ms'] = self._gateway_latency_ms()
+        self._write(event, fields)
+
+    async def _probe(self):
+        interval = self.interval
+        ticks = 0
+        while self.running:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            self._last_tick = now
+            lag = max(0.0, now - expected)
+            self.samples.append(lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+            ticks += 1
+            if ticks * interval >= 1.0:
+                ticks = 0
+                for name, value in self.percentiles().items():
+                    LOOP_LAG_QUANTILES.labels(quantile=name).set(value)
+                latency = self.bot.latency
+                if math.isfinite(latency):
+                    GATEWAY_LATENCY.set(latency)
+
+    def _monitor(self):
+        # Runs on its own thread so it still works while the loop is blocked
+        while self.running:
+            time.sleep(self.interval / 2)
+            blocked_for = time.perf_counter() - self._last_tick - self.interval
+            if blocked_for >= self.stall_threshold:
+                if self._stalled_since is None:
+                    self._stalled_since = self._last_tick
+                    LOOP_STALLS.inc()
+                    self._write('loop_stall', {
+                        'blocked_ms': round(blocked_for * 1000, 2),
+                        'gateway_latency_ms': self._gateway_latency_ms(),
+                        'stack': self._loop_stack()
+                    })
+            elif self._stalled_since is not None:
+                stalled_for = self._last_tick - self._stalled_since
+                self._stalled_since = None
+                self._write('loop_recovered', {'stalled_ms': round(stalled_for * 1000, 2)})
+
+    def _loop_stack(self):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        return traceback.format_stack(frame)
+
+    def _gateway_latency_ms(self):
+        latency = self.bot.latency
+        return round(latency * 1000, 2) if math.isfinite(latency) else None
+
+    def _write(self, event, fields):
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(f"=== {datetime.now().isoformat()} {event} ===\n")
+                for key, value in fields.items():
+                    if key == 'stack':
+                        f.write("stack (most recent call last):\n")
+                        f.write(''.join(value))
+                    else:
+                        f.write(f"{key}: {value}\n")
+                f.write("\n")
+        except Exception as e:
+            logger.error("Failed to write diagnostics: %s", e)
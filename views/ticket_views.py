@@ -1,12 +1,12 @@
 import discord
 from discord.ext import commands
 import logging
+from utils.admission import Rejected
+from utils.config import config_service
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
-# Staff role ID for permissions
-STAFF_ROLE_ID = 1346488365608079452
-
 class TicketPanelView(discord.ui.View):
     def __init__(self, ticket_manager):
         super().__init__(timeout=None)
@@ -18,9 +18,17 @@ class TicketPanelView(discord.ui.View):
         emoji="🎫",
         custom_id="create_ticket"
     )
+    @traced
     async def create_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Handle ticket creation button"""
         
+        # Turn away cooldowns and spam before showing the modal
+        try:
+            self.ticket_manager.admission.check_user(interaction.user.id)
+        except Rejected as e:
+            await interaction.response.send_message(f"⏳ {e}", ephemeral=True)
+            return
+        
         # Create modal for ticket reason
         modal = TicketReasonModal(self.ticket_manager)
         await interaction.response.send_modal(modal)
@@ -39,9 +47,28 @@ class TicketReasonModal(discord.ui.Modal):
         )
         self.add_item(self.reason_input)
     
+    @traced
     async def on_submit(self, interaction: discord.Interaction):
         """Handle modal submission"""
-        await interaction.response.defer(ephemeral=True)
+        
+        # Wait for guild-wide capacity, in line with everyone else if there is none
+        async def queued(position):
+            await interaction.response.send_message(
+                f"⏳ Lots of tickets are being opened right now. You're **#{position}** in line, "
+                "your ticket will be created automatically.",
+                ephemeral=True
+            )
+        
+        try:
+            await self.ticket_manager.admission.admit(interaction.user.id, queued)
+        except Rejected as e:
+            if interaction.response.is_done():
+                await interaction.followup.send(f"❌ {e}", ephemeral=True)
+            else:
+                await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+            return
+        if not interaction.response.is_done():
+            await interaction.response.defer(ephemeral=True)
         
         reason = self.reason_input.value
         
@@ -63,6 +90,13 @@ class TicketReasonModal(discord.ui.Modal):
             color=0x00ff88
         )
         embed.add_field(name="📝 Issue", value=reason, inline=False)
+        ticket_info = self.ticket_manager.get_ticket_info(channel.id)
+        assigned_to = ticket_info.assigned_to if ticket_info else None
+        embed.add_field(
+            name="🧑‍💼 Assigned Staff",
+            value=f"<@{assigned_to}>" if assigned_to else "The next available staff member",
+            inline=False
+        )
         embed.add_field(
             name="📋 What happens next?",
             value="• Our support team will be with you shortly\n• Please provide any additional details\n• Use the buttons below to manage your ticket",
@@ -81,7 +115,7 @@ class TicketReasonModal(discord.ui.Modal):
             ephemeral=True
         )
         
-        logger.info(f"Ticket created for {interaction.user} in {channel.name}")
+        logger.info("Ticket created for %s in %s", interaction.user, channel.name, extra={'channel_id': channel.id, 'actor': interaction.user.id})
 
 class TicketControlView(discord.ui.View):
     def __init__(self, ticket_manager):
@@ -90,7 +124,8 @@ class TicketControlView(discord.ui.View):
     
     def _is_staff_member(self, member: discord.Member) -> bool:
         """Check if user is a staff member"""
-        return any(role.id == STAFF_ROLE_ID for role in member.roles)
+        staff_role_id = config_service.current.staff_role_id
+        return any(role.id == staff_role_id for role in member.roles)
     
     @discord.ui.button(
         label="Add User",
@@ -98,6 +133,7 @@ class TicketControlView(discord.ui.View):
         emoji="➕",
         custom_id="add_user"
     )
+    @traced
     async def add_user(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Add a user to the ticket"""
         
@@ -122,6 +158,7 @@ class TicketControlView(discord.ui.View):
         emoji="🔒",
         custom_id="close_ticket"
     )
+    @traced
     async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Close the ticket"""
         
@@ -131,7 +168,7 @@ class TicketControlView(discord.ui.View):
             await interaction.response.send_message("❌ This is not a ticket channel!", ephemeral=True)
             return
         
-        is_ticket_owner = interaction.user.id == ticket_info.get('user_id')
+        is_ticket_owner = interaction.user.id == ticket_info.user_id
         is_staff = self._is_staff_member(interaction.user)
         
         if not (is_ticket_owner or is_staff):
@@ -140,13 +177,18 @@ class TicketControlView(discord.ui.View):
         
         await interaction.response.defer()
         
-        # Close the ticket
+        # Close the ticket; a click while the close is already running shares its result
+        joined = self.ticket_manager.operations.running(interaction.channel.id) == 'close'
         success, result = await self.ticket_manager.close_ticket(interaction.channel, interaction.user)
         
         if not success:
             await interaction.followup.send(f"❌ {result}")
             return
         
+        if joined:
+            await interaction.followup.send("🔒 This ticket has been closed.", ephemeral=True)
+            return
+        
         # Send closure message
         embed = discord.Embed(
             title="🔒 Ticket Closed",
@@ -165,7 +207,7 @@ class TicketControlView(discord.ui.View):
         
         await interaction.followup.send(embed=embed, view=delete_view)
         
-        logger.info(f"Ticket {interaction.channel.name} closed by {interaction.user}")
+        logger.info("Ticket %s closed by %s", interaction.channel.name, interaction.user, extra={'channel_id': interaction.channel.id, 'actor': interaction.user.id})
     
     @discord.ui.button(
         label="Remove User",
@@ -173,6 +215,7 @@ class TicketControlView(discord.ui.View):
         emoji="➖",
         custom_id="remove_user"
     )
+    @traced
     async def remove_user(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Remove a user from the ticket"""
         
@@ -196,6 +239,7 @@ class TicketControlView(discord.ui.View):
         emoji="🗑️",
         custom_id="delete_ticket"
     )
+    @traced
     async def delete_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Delete the ticket"""
         
@@ -223,6 +267,7 @@ class DeleteConfirmationModal(discord.ui.Modal):
         )
         self.add_item(self.confirmation_input)
     
+    @traced
     async def on_submit(self, interaction: discord.Interaction):
         if self.confirmation_input.value.upper() != "DELETE":
             await interaction.response.send_message("❌ Confirmation failed. Deletion cancelled.", ephemeral=True)
@@ -261,6 +306,7 @@ class UserActionModal(discord.ui.Modal):
         )
         self.add_item(self.user_input)
     
+    @traced
     async def on_submit(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         
@@ -357,13 +403,15 @@ class DeleteTicketView(discord.ui.View):
     
     def _is_staff_member(self, member: discord.Member) -> bool:
         """Check if user is a staff member"""
-        return any(role.id == STAFF_ROLE_ID for role in member.roles)
+        staff_role_id = config_service.current.staff_role_id
+        return any(role.id == staff_role_id for role in member.roles)
     
     @discord.ui.button(
         label="Reopen Ticket",
         style=discord.ButtonStyle.success,
         emoji="🔓"
     )
+    @traced
     async def reopen_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Reopen the closed ticket"""
         
@@ -374,13 +422,18 @@ class DeleteTicketView(discord.ui.View):
         
         await interaction.response.defer()
         
-        # Reopen the ticket
+        # Reopen the ticket; a click while the reopen is already running shares its result
+        joined = self.ticket_manager.operations.running(interaction.channel.id) == 'reopen'
         success, error = await self.ticket_manager.reopen_ticket(interaction.channel, interaction.user)
         
         if not success:
             await interaction.followup.send(f"❌ {error}")
             return
         
+        if joined:
+            await interaction.followup.send("🔓 This ticket has been reopened.", ephemeral=True)
+            return
+        
         # Send reopen message
         embed = discord.Embed(
             title="🔓 Ticket Reopened",
@@ -399,13 +452,14 @@ class DeleteTicketView(discord.ui.View):
         
         await interaction.followup.send(embed=embed, view=control_view)
         
-        logger.info(f"Ticket {interaction.channel.name} reopened by {interaction.user}")
+        logger.info("Ticket %s reopened by %s", interaction.channel.name, interaction.user, extra={'channel_id': interaction.channel.id, 'actor': interaction.user.id})
     
     @discord.ui.button(
         label="Delete Ticket",
         style=discord.ButtonStyle.danger,
         emoji="🗑️"
     )
+    @traced
     async def delete_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Delete the closed ticket"""
         
@@ -417,3 +471,58 @@ class DeleteTicketView(discord.ui.View):
         # Show confirmation modal
         modal = DeleteConfirmationModal(self.ticket_manager)
         await interaction.response.send_modal(modal)
+
+class TicketListView(discord.ui.View):
+    """Ephemeral ticket list, one page at a time, for a status or for one member's history"""
+    
+    PAGE_SIZE = 10
+    STATUS_EMOJI = {'open': "🟢", 'closed': "🔒", 'archived': "📦"}
+    
+    def __init__(self, ticket_manager, title, status=None, user_id=None, start=None, newest_first=True):
+        super().__init__(timeout=600)
+        self.store = ticket_manager.store
+        self.title = title
+        self.status = status
+        self.user_id = user_id
+        self.newest_first = newest_first
+        # Cursors the visited pages started from, so Previous is a pop rather than a backwards scan
+        self._cursors = [start]
+        self._next = None
+    
+    def render(self):
+        """Build the embed for the current page and update the buttons"""
+        tickets, self._next = self.store.page(self.status, self.user_id, self._cursors[-1], self.PAGE_SIZE, self.newest_first)
+        self.previous_page.disabled = len(self._cursors) == 1
+        self.next_page.disabled = self._next is None
+        
+        lines = []
+        for ticket in tickets:
+            where = f"<#{ticket.channel_id}>" if ticket.status != 'archived' else "channel archived"
+            owner = f"<@{ticket.user_id}>" if ticket.user_id else "Unknown User"
+            line = f"{self.STATUS_EMOJI.get(ticket.status, '')} **#{ticket.ticket_number:04d}** {where} • {owner} • <t:{int(ticket.created_at.timestamp())}:R>"
+            if ticket.assigned_to and ticket.status == 'open':
+                line += f" • 🧑‍💼 <@{ticket.assigned_to}>"
+            lines.append(line)
+        
+        embed = discord.Embed(
+            title=self.title,
+            description="\n".join(lines) or "No tickets found.",
+            color=0x00aaff
+        )
+        total = self.store.count(self.status if self.user_id is None else None, self.user_id)
+        embed.set_footer(text=f"Page {len(self._cursors)} • {total} tickets")
+        return embed
+    
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="◀️")
+    @traced
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self._cursors) > 1:
+            self._cursors.pop()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+    
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, emoji="▶️")
+    @traced
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self._next is not None:
+            self._cursors.append(self._next)
+        await interaction.response.edit_message(embed=self.render(), view=self)